@@ -0,0 +1,302 @@
+"""
+Benchmark HTTP em processo da API UPath.
+
+Executa o `app` real de main.py por um cliente ASGI (httpx), sem servidor,
+contra um SQLite temporário (padrão) ou o banco de --database-url.
+
+    cd App
+    python -m benchmarks.run                           # roda e imprime
+    python -m benchmarks.run --save benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.2
+
+Com --compare o processo sai com código 1 se algum cenário piorar além do
+limite (p95 maior ou throughput menor) ou tiver erros.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+CENARIOS = ("register", "login", "perfil_me", "perfil_home", "admin_login_2fa", "admin_stats")
+
+SENHA = "Bench!1234"
+ADMIN_USERNAME = "bench-admin"
+ADMIN_SENHA = "BenchAdmin!1"
+
+def _configurar_ambiente(database_url: Optional[str]) -> str:
+    # Precisa acontecer antes de importar core.config (Settings lê o ambiente na importação)
+    if not database_url:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='upath-bench-'), 'bench.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("DB_STARTUP_CHECK", "false")
+    os.environ.setdefault("CLEANUP_ENABLED", "false")
+    return database_url
+
+def _percentil(ordenados: List[float], p: float) -> float:
+    if not ordenados:
+        return 0.0
+    indice = min(len(ordenados) - 1, max(0, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+def _resumo(latencias: List[float], erros: int, duracao: float) -> Dict[str, Any]:
+    ordenados = sorted(latencias)
+    return {
+        "requests": len(latencias) + erros,
+        "errors": erros,
+        "duration_s": round(duracao, 3),
+        "throughput_rps": round(len(latencias) / duracao, 2) if duracao > 0 else 0.0,
+        "mean_ms": round(statistics.fmean(ordenados) * 1000, 2) if ordenados else 0.0,
+        "p50_ms": round(_percentil(ordenados, 50) * 1000, 2),
+        "p95_ms": round(_percentil(ordenados, 95) * 1000, 2),
+        "p99_ms": round(_percentil(ordenados, 99) * 1000, 2),
+        "max_ms": round(ordenados[-1] * 1000, 2) if ordenados else 0.0,
+    }
+
+async def _executar(
+    operacao: Callable[[int], Awaitable[bool]], total: int, concorrencia: int
+) -> Dict[str, Any]:
+    """
+    `concorrencia` workers consomem `total` execuções de `operacao(i)`
+    """
+    contador = itertools.count()
+    latencias: List[float] = []
+    erros = 0
+
+    async def worker():
+        nonlocal erros
+        while True:
+            i = next(contador)
+            if i >= total:
+                return
+            inicio = time.perf_counter()
+            try:
+                ok = await operacao(i)
+            except Exception:
+                ok = False
+            if ok:
+                latencias.append(time.perf_counter() - inicio)
+            else:
+                erros += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concorrencia)))
+    return _resumo(latencias, erros, time.perf_counter() - inicio)
+
+class Bench:
+    def __init__(self, client, prefixo: str, concorrencia: int):
+        self.client = client
+        self.prefixo = prefixo
+        self.concorrencia = concorrencia
+        self.usuarios: List[Dict[str, Any]] = []
+        self.execucao = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+        # Email de cadastro único entre aquecimento e medição (o índice do loop se repete)
+        self._cadastros = itertools.count()
+
+    def url(self, caminho: str) -> str:
+        return f"{self.prefixo}{caminho}"
+
+    async def preparar(self, usuarios: int, linhas_admin: int) -> None:
+        from core.database import SessionLocal, create_tables
+        from core.security import get_password_hash
+        from models.admin import Admin, User, AccessHistory
+        from services.agregados_service import reconstruir, trava
+        import models.auth, models.email  # noqa: F401  (tabelas)
+
+        create_tables()
+
+        db = SessionLocal()
+        try:
+            if not db.query(Admin).filter(Admin.username == ADMIN_USERNAME).first():
+                db.add(Admin(
+                    username=ADMIN_USERNAME,
+                    email="bench-admin@bench.upath.com.br",
+                    password=get_password_hash(ADMIN_SENHA),
+                    pin=get_password_hash("0000"),
+                    name="Bench Admin",
+                ))
+            # Volume para o dashboard admin
+            existentes = db.query(User).count()
+            for i in range(existentes, linhas_admin):
+                db.add(User(name=f"Bench {i}", email=f"bench-user-{i}@bench.upath.com.br", active=i % 3 != 0))
+            db.commit()
+            if db.query(AccessHistory).count() < linhas_admin:
+                ids = [u.id for u in db.query(User.id).limit(linhas_admin).all()]
+                db.add_all(AccessHistory(user_id=ids[i % len(ids)]) for i in range(linhas_admin))
+                db.commit()
+                # Carga via ORM não passa pelo buffer de acessos: agregados recalculados
+                with trava(db, exclusiva=True):
+                    reconstruir(db)
+                    db.commit()
+        finally:
+            db.close()
+
+        # Contas de estudante usadas por login/perfil
+        for i in range(usuarios):
+            email = f"bench-{self.execucao}-{i}@bench.upath.com.br"
+            r = await self.client.post(self.url("/auth/register"), json={
+                "nome": "Bench Estudante", "email": email, "senha": SENHA, "confirmar_senha": SENHA,
+            })
+            if r.status_code != 200:
+                raise RuntimeError(f"Falha ao registrar usuário de benchmark: {r.status_code} {r.text}")
+            r = await self.client.post(self.url("/auth/login"), json={"email": email, "senha": SENHA})
+            r.raise_for_status()
+            self.usuarios.append({"email": email, "token": r.json()["data"]["access_token"]})
+
+        self.admin_token = await self._admin_login()
+
+    async def _admin_login(self) -> Optional[str]:
+        from sqlalchemy import select
+        from core.database import AsyncSessionLocal
+        from models.auth import AdminSession
+
+        r = await self.client.post(self.url("/admin/login"), json={
+            "username": ADMIN_USERNAME, "password": ADMIN_SENHA,
+        })
+        if r.status_code != 200:
+            return None
+        session_id = r.json()["token"]
+
+        # O PIN iria por email: lido direto da sessão
+        async with AsyncSessionLocal() as db:
+            pin = await db.scalar(select(AdminSession.pin_code).where(AdminSession.session_id == session_id))
+
+        r = await self.client.post(self.url("/admin/verify-2fa"), json={"session_id": session_id, "pin": pin})
+        return r.json()["token"] if r.status_code == 200 else None
+
+    def _auth(self, i: int) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.usuarios[i % len(self.usuarios)]['token']}"}
+
+    async def register(self, i: int) -> bool:
+        r = await self.client.post(self.url("/auth/register"), json={
+            "nome": "Bench", "email": f"bench-reg-{self.execucao}-{next(self._cadastros)}@bench.upath.com.br",
+            "senha": SENHA, "confirmar_senha": SENHA,
+        })
+        return r.status_code == 200
+
+    async def login(self, i: int) -> bool:
+        usuario = self.usuarios[i % len(self.usuarios)]
+        r = await self.client.post(self.url("/auth/login"), json={"email": usuario["email"], "senha": SENHA})
+        return r.status_code == 200
+
+    async def perfil_me(self, i: int) -> bool:
+        r = await self.client.get(self.url("/perfil/me"), headers=self._auth(i))
+        return r.status_code == 200
+
+    async def perfil_home(self, i: int) -> bool:
+        r = await self.client.get(self.url("/perfil/home"), headers=self._auth(i))
+        return r.status_code == 200
+
+    async def admin_login_2fa(self, i: int) -> bool:
+        return await self._admin_login() is not None
+
+    async def admin_stats(self, i: int) -> bool:
+        r = await self.client.get(
+            self.url("/admin/stats"), headers={"Authorization": f"Bearer {self.admin_token}"}
+        )
+        return r.status_code == 200
+
+def comparar(atual: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Regressões do resultado atual em relação ao baseline
+    """
+    falhas = []
+    for nome, res in atual["scenarios"].items():
+        if res["errors"]:
+            falhas.append(f"{nome}: {res['errors']} erro(s)")
+        base = baseline.get("scenarios", {}).get(nome)
+        if not base:
+            continue
+        if base["p95_ms"] and res["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            falhas.append(f"{nome}: p95 {res['p95_ms']}ms > baseline {base['p95_ms']}ms (+{threshold:.0%})")
+        if base["throughput_rps"] and res["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            falhas.append(
+                f"{nome}: throughput {res['throughput_rps']} rps < baseline {base['throughput_rps']} rps (-{threshold:.0%})"
+            )
+    return falhas
+
+async def executar(args) -> Dict[str, Any]:
+    import httpx
+    from main import app
+    from core.database import dispose_engines
+    from core.hashing import hashing_service
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        bench = Bench(client, args.prefix, args.concurrency)
+        await bench.preparar(max(args.concurrency, 4), args.admin_rows)
+
+        resultados: Dict[str, Any] = {}
+        for nome in args.scenarios:
+            operacao = getattr(bench, nome)
+            # Aquecimento: JIT de caches, pools e imports preguiçosos
+            await _executar(operacao, min(args.concurrency, args.requests), args.concurrency)
+            resultados[nome] = await _executar(operacao, args.requests, args.concurrency)
+            r = resultados[nome]
+            print(
+                f"{nome:<16} {r['throughput_rps']:>9.1f} rps  p50 {r['p50_ms']:>8.1f}ms  "
+                f"p95 {r['p95_ms']:>8.1f}ms  p99 {r['p99_ms']:>8.1f}ms  erros {r['errors']}"
+            )
+
+    hashing_service.shutdown()
+    await dispose_engines()
+
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "database": args.database_url.split("://")[0],
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "scenarios": resultados,
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark HTTP em processo da API UPath")
+    parser.add_argument("--database-url", help="Banco de teste (padrão: SQLite temporário)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200, help="Requisições por cenário")
+    parser.add_argument("--scenarios", nargs="+", choices=CENARIOS, default=list(CENARIOS))
+    parser.add_argument("--admin-rows", type=int, default=1000, help="Usuários/acessos semeados para o dashboard")
+    parser.add_argument("--prefix", default="/api/api", help="Prefixo das rotas (routers incluídos com /api)")
+    parser.add_argument("--save", help="Grava o resultado como baseline JSON")
+    parser.add_argument("--compare", help="Baseline JSON para comparação")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Regressão tolerada (0.2 = 20%%)")
+    parser.add_argument("--output", help="Grava o resultado desta execução em JSON")
+    args = parser.parse_args(argv)
+
+    args.database_url = _configurar_ambiente(args.database_url)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    resultado = asyncio.run(executar(args))
+
+    for caminho in filter(None, (args.save, args.output)):
+        with open(caminho, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"💾 Resultado gravado em {caminho}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        falhas = comparar(resultado, baseline, args.threshold)
+        if falhas:
+            print("❌ Regressões em relação ao baseline:")
+            for falha in falhas:
+                print(f"   - {falha}")
+            return 1
+        print(f"✅ Sem regressões além de {args.threshold:.0%} em relação a {args.compare}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+
+from core.cache import Cache
+from core.config import settings
+from core.metrics import counter, gauge, histogram
+
+logger = logging.getLogger(__name__)
+
+AI_REQUEST_DURATION = histogram(
+    "upath_ai_request_duration_seconds",
+    "Duração das chamadas ao serviço de IA (por tentativa)",
+    ("path",),
+)
+AI_REQUESTS = counter(
+    "upath_ai_requests_total",
+    "Respostas do cliente de IA por origem (servico, cache, cache_expirado, fallback, erro)",
+    ("origin",),
+)
+
+# Status HTTP que valem nova tentativa
+STATUS_RETENTAVEIS = {429, 502, 503, 504}
+
+class AIServiceError(Exception):
+    """Serviço de IA falhou e não havia cache nem fallback"""
+    pass
+
+class AIServiceUnavailableError(AIServiceError):
+    """Circuito aberto: chamada não enviada"""
+    pass
+
+class AIServiceClientError(AIServiceError):
+    """
+    Serviço recusou a requisição (4xx): erro de quem chamou, não conta
+    como falha do serviço nem é mascarado por cache ou fallback
+    """
+
+    def __init__(self, status_code: int, mensagem: str):
+        super().__init__(mensagem)
+        self.status_code = status_code
+
+class CircuitBreaker:
+    """
+    fechado -> (N falhas seguidas) -> aberto -> (reset_seconds) -> meio_aberto.
+    No meio_aberto uma única chamada de teste passa; sucesso fecha o
+    circuito, falha reabre.
+    """
+
+    FECHADO = "fechado"
+    ABERTO = "aberto"
+    MEIO_ABERTO = "meio_aberto"
+
+    def __init__(self, threshold: Optional[int] = None, reset_seconds: Optional[float] = None):
+        self.threshold = threshold or settings.AI_SERVICE_BREAKER_THRESHOLD
+        self.reset_seconds = reset_seconds if reset_seconds is not None else settings.AI_SERVICE_BREAKER_RESET_SECONDS
+        self.estado = self.FECHADO
+        self.falhas = 0
+        self.aberto_em = 0.0
+        self.aberturas = 0
+        self._teste_em: Optional[float] = None
+
+    def permitir(self) -> bool:
+        if self.estado == self.FECHADO:
+            return True
+        if self.estado == self.ABERTO and time.monotonic() - self.aberto_em >= self.reset_seconds:
+            self.estado = self.MEIO_ABERTO
+            self._teste_em = None
+        if self.estado == self.MEIO_ABERTO:
+            agora = time.monotonic()
+            # Chamada de teste cancelada sem resultado não trava o circuito
+            if self._teste_em is None or agora - self._teste_em >= self.reset_seconds:
+                self._teste_em = agora
+                return True
+        return False
+
+    def sucesso(self) -> None:
+        if self.estado != self.FECHADO:
+            logger.info("✅ Serviço de IA respondeu, circuito fechado")
+        self.estado = self.FECHADO
+        self.falhas = 0
+        self._teste_em = None
+
+    def falha(self) -> None:
+        self.falhas += 1
+        if self.estado == self.MEIO_ABERTO or self.falhas >= self.threshold:
+            if self.estado != self.ABERTO:
+                self.aberturas += 1
+                logger.warning(
+                    f"⚠️ Serviço de IA indisponível ({self.falhas} falhas), circuito aberto por {self.reset_seconds}s"
+                )
+            self.estado = self.ABERTO
+            self.aberto_em = time.monotonic()
+            self._teste_em = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "estado": self.estado,
+            "falhas_consecutivas": self.falhas,
+            "aberturas": self.aberturas,
+        }
+
+@dataclass
+class AIResultado:
+    dados: Any
+    origem: str  # servico | cache | cache_expirado | fallback
+
+class AIClient:
+    """
+    Cliente compartilhado do serviço de IA: conexões keep-alive em pool
+    (httpx.AsyncClient), timeout por chamada, retentativas com backoff e
+    jitter, circuit breaker e cache de respostas pela carga da requisição.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url or settings.AI_SERVICE_URL
+        self.retries = settings.AI_SERVICE_RETRIES
+        self.breaker = CircuitBreaker()
+        self.cache = Cache("ia", settings.AI_SERVICE_CACHE_TTL_SECONDS)
+        self.cache_expirado = Cache("ia_expirado", settings.AI_SERVICE_STALE_TTL_SECONDS)
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Pool pertence ao event loop em execução
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(
+                    settings.AI_SERVICE_TIMEOUT_SECONDS, connect=settings.AI_SERVICE_CONNECT_TIMEOUT_SECONDS
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.AI_SERVICE_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.AI_SERVICE_MAX_CONNECTIONS,
+                ),
+                transport=self._transport,
+            )
+            self._client_loop = loop
+        return self._client
+
+    @staticmethod
+    def chave(path: str, payload: Any) -> str:
+        corpo = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(f"{path}|{corpo}".encode()).hexdigest()
+
+    async def _enviar(self, path: str, payload: Any, timeout: Optional[float]) -> Any:
+        client = self._get_client()
+        ultimo_erro: Optional[Exception] = None
+        for tentativa in range(self.retries + 1):
+            if tentativa:
+                # Backoff exponencial com jitter completo
+                await asyncio.sleep(random.uniform(0, 0.1 * 2 ** tentativa))
+            try:
+                with AI_REQUEST_DURATION.time(path):
+                    resposta = await client.post(
+                        path, json=payload, timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+                    )
+                if resposta.status_code in STATUS_RETENTAVEIS:
+                    ultimo_erro = AIServiceError(f"Serviço de IA respondeu {resposta.status_code}")
+                    continue
+                resposta.raise_for_status()
+                return resposta.json()
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status < 500:
+                    # 4xx: requisição inválida, repetir não adianta
+                    raise AIServiceClientError(status, f"Serviço de IA recusou a requisição ({status})") from e
+                raise AIServiceError(f"Serviço de IA respondeu {status}") from e
+            except (httpx.TransportError, ValueError) as e:
+                ultimo_erro = e
+        raise AIServiceError(f"Serviço de IA falhou após {self.retries + 1} tentativas: {ultimo_erro}")
+
+    async def post(
+        self,
+        path: str,
+        payload: Any,
+        fallback: Any = None,
+        usar_cache: bool = True,
+        timeout: Optional[float] = None,
+    ) -> AIResultado:
+        """
+        Resposta do serviço (ou do cache). Com o serviço fora, serve a
+        última resposta conhecida ou `fallback`; sem nenhum dos dois
+        levanta AIServiceError. Requisição recusada (4xx) levanta
+        AIServiceClientError direto, sem afetar o circuito.
+        """
+        chave = self.chave(path, payload)
+        if usar_cache:
+            dados = await self.cache.get(chave)
+            if dados is not None:
+                AI_REQUESTS.inc("cache")
+                return AIResultado(dados, "cache")
+
+        erro: AIServiceError
+        if self.breaker.permitir():
+            try:
+                dados = await self._enviar(path, payload, timeout)
+                self.breaker.sucesso()
+                if usar_cache:
+                    await self.cache.set(chave, dados)
+                    await self.cache_expirado.set(chave, dados)
+                AI_REQUESTS.inc("servico")
+                return AIResultado(dados, "servico")
+            except AIServiceClientError:
+                AI_REQUESTS.inc("erro")
+                raise
+            except AIServiceError as e:
+                self.breaker.falha()
+                erro = e
+        else:
+            erro = AIServiceUnavailableError("Serviço de IA temporariamente indisponível")
+
+        if usar_cache:
+            dados = await self.cache_expirado.get(chave)
+            if dados is not None:
+                AI_REQUESTS.inc("cache_expirado")
+                return AIResultado(dados, "cache_expirado")
+        if fallback is not None:
+            AI_REQUESTS.inc("fallback")
+            return AIResultado(fallback, "fallback")
+        AI_REQUESTS.inc("erro")
+        raise erro
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.base_url,
+            "circuito": self.breaker.stats(),
+            "cache": self.cache.stats(),
+        }
+
+ai_client = AIClient()
+
+gauge(
+    "upath_ai_circuit_open",
+    "1 quando o circuito do serviço de IA está aberto ou meio aberto",
+    callback=lambda: {(): 0.0 if ai_client.breaker.estado == CircuitBreaker.FECHADO else 1.0},
+)
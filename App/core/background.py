@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+class PeriodicTask:
+    """
+    Executa uma função periodicamente em segundo plano no event loop.
+    Funções síncronas rodam no threadpool para não bloquear o loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        interval_seconds: float,
+        func: Callable[[], Any],
+        run_on_stop: bool = False,
+    ):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.run_on_stop = run_on_stop
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop_ref: Optional[asyncio.AbstractEventLoop] = None
+
+    async def run_once(self) -> Any:
+        if asyncio.iscoroutinefunction(self.func):
+            return await self.func()
+        return await run_in_threadpool(self.func)
+
+    async def _loop(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Tarefa '{self.name}' falhou: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._loop_ref = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._loop(), name=self.name)
+            logger.info(f"⏱️ Tarefa '{self.name}' iniciada (a cada {self.interval_seconds}s)")
+
+    def trigger(self) -> None:
+        """Antecipa a próxima execução (pode ser chamado de qualquer thread)"""
+        if self._wakeup is None or self._loop_ref is None:
+            return
+        try:
+            self._loop_ref.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # Loop já encerrado
+            pass
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        if self.run_on_stop:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Execução final de '{self.name}' falhou: {e}")
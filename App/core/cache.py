@@ -0,0 +1,294 @@
+import json
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from core.config import settings
+from core.metrics import counter
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = counter(
+    "upath_cache_requests_total",
+    "Leituras de cache por namespace e resultado (hit/miss)",
+    ("cache", "result"),
+)
+
+class CacheBackend(ABC):
+    """
+    Armazena valores já serializados (str) com TTL por chave
+    """
+
+    name = ""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete_sync(self, key: str) -> None:
+        """Invalidação a partir de código síncrono (threadpool)"""
+
+    @abstractmethod
+    def get_sync(self, key: str) -> Optional[str]:
+        """Leitura a partir de código síncrono (threadpool)"""
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    LRU em processo com expiração por entrada - cada worker tem o seu.
+    max_ttl limita quanto tempo um worker serve um valor já invalidado em outro.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, max_ttl: int = 0):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        return self.get_sync(key)
+
+    def get_sync(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        if self.max_entries <= 0:
+            return
+        if self.max_ttl:
+            ttl = min(ttl, self.max_ttl)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        self.delete_sync(key)
+
+    def delete_sync(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache compartilhado entre workers. A evicção LRU fica com o Redis
+    (maxmemory-policy allkeys-lru); o TTL vai em cada SET.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "upath:cache", timeout: Optional[float] = None):
+        import redis  # dependência opcional
+        import redis.asyncio as redis_async
+
+        # Cache lento é pior que cache nenhum: cada operação tem timeout curto
+        timeout = settings.CACHE_REDIS_TIMEOUT_SECONDS if timeout is None else timeout
+        opcoes = {"socket_timeout": timeout, "socket_connect_timeout": timeout}
+        self._redis = redis_async.from_url(url, **opcoes)
+        self._redis_sync = redis.Redis.from_url(url, **opcoes)
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self._redis.get(self._key(key))
+        return value.decode() if value is not None else None
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self._redis.set(self._key(key), value, ex=ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(self._key(key))
+
+    def delete_sync(self, key: str) -> None:
+        self._redis_sync.delete(self._key(key))
+
+    def get_sync(self, key: str) -> Optional[str]:
+        value = self._redis_sync.get(self._key(key))
+        return value.decode() if value is not None else None
+
+class FallbackCacheBackend(CacheBackend):
+    """
+    Backend compartilhado com um substituto local: se o Redis cair, as
+    operações seguem no LRU em processo em vez de falhar a requisição.
+    Depois de uma falha o Redis só é tentado de novo após retry_seconds.
+    """
+
+    def __init__(self, primary: CacheBackend, local: CacheBackend, retry_seconds: Optional[float] = None):
+        self.primary = primary
+        self.local = local
+        self.name = f"{primary.name}+{local.name}"
+        self.retry_seconds = settings.CACHE_REDIS_RETRY_SECONDS if retry_seconds is None else retry_seconds
+        self._degradado = False
+        self._proxima_tentativa = 0.0
+
+    def _falhou(self, e: Exception) -> None:
+        if not self._degradado:
+            logger.warning(f"⚠️ Cache compartilhado indisponível, usando cache local: {e}")
+        self._degradado = True
+        self._proxima_tentativa = time.monotonic() + self.retry_seconds
+
+    def _recuperou(self) -> None:
+        if self._degradado:
+            logger.info("✅ Cache compartilhado disponível novamente")
+        self._degradado = False
+
+    def _usar_primario(self) -> bool:
+        return not self._degradado or time.monotonic() >= self._proxima_tentativa
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self._usar_primario():
+            return await self.local.get(key)
+        try:
+            value = await self.primary.get(key)
+            self._recuperou()
+            return value
+        except Exception as e:
+            self._falhou(e)
+            return await self.local.get(key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        if not self._usar_primario():
+            await self.local.set(key, value, ttl)
+            return
+        try:
+            await self.primary.set(key, value, ttl)
+        except Exception as e:
+            self._falhou(e)
+            await self.local.set(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        # Invalida nos dois: entradas locais podem ter sido gravadas durante a queda.
+        # Sempre tenta o Redis (mesmo em espera): um valor velho lá sobreviveria à volta dele.
+        await self.local.delete(key)
+        try:
+            await self.primary.delete(key)
+        except Exception as e:
+            self._falhou(e)
+
+    def delete_sync(self, key: str) -> None:
+        self.local.delete_sync(key)
+        try:
+            self.primary.delete_sync(key)
+        except Exception as e:
+            self._falhou(e)
+
+    def get_sync(self, key: str) -> Optional[str]:
+        if not self._usar_primario():
+            return self.local.get_sync(key)
+        try:
+            value = self.primary.get_sync(key)
+            self._recuperou()
+            return value
+        except Exception as e:
+            self._falhou(e)
+            return self.local.get_sync(key)
+
+def criar_backend(backend: Optional[str] = None) -> CacheBackend:
+    backend = backend or settings.CACHE_BACKEND
+    local = MemoryCacheBackend(settings.CACHE_MAX_ENTRIES, settings.CACHE_MEMORY_MAX_TTL_SECONDS)
+    if backend == "redis":
+        return FallbackCacheBackend(RedisCacheBackend(settings.REDIS_URL), local)
+    return local
+
+_backend: Optional[CacheBackend] = None
+
+def get_cache_backend() -> CacheBackend:
+    global _backend
+    if _backend is None:
+        _backend = criar_backend()
+    return _backend
+
+class Cache:
+    """
+    Cache read-through de um namespace, com TTL e contadores de hit/miss.
+    Valores devem ser serializáveis em JSON; cada leitura devolve uma cópia.
+    """
+
+    def __init__(self, namespace: str, ttl: int, backend: Optional[CacheBackend] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend or get_cache_backend()
+
+    def _key(self, key: Any) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: Any) -> Optional[Any]:
+        return self._decodificar(await self.backend.get(self._key(key)))
+
+    def get_sync(self, key: Any) -> Optional[Any]:
+        return self._decodificar(self.backend.get_sync(self._key(key)))
+
+    def _decodificar(self, raw: Optional[str]) -> Optional[Any]:
+        if raw is None:
+            self.misses += 1
+            CACHE_REQUESTS.inc(self.namespace, "miss")
+            return None
+        self.hits += 1
+        CACHE_REQUESTS.inc(self.namespace, "hit")
+        return json.loads(raw)
+
+    async def set(self, key: Any, value: Any, ttl: Optional[int] = None) -> None:
+        await self.backend.set(self._key(key), json.dumps(value, default=str), ttl or self.ttl)
+
+    async def get_or_load(self, key: Any, loader: Callable[[], Awaitable[Any]]) -> Optional[Any]:
+        """
+        Lê do cache ou carrega (loader) e grava; None não é cacheado
+        """
+        value = await self.get(key)
+        if value is not None:
+            return value
+        value = await loader()
+        if value is not None:
+            await self.set(key, value)
+        return value
+
+    async def invalidate(self, key: Any) -> None:
+        await self.backend.delete(self._key(key))
+
+    def invalidate_sync(self, key: Any) -> None:
+        self.backend.delete_sync(self._key(key))
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -1,85 +1,207 @@
 from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.exc import SQLAlchemyError
+from typing import Any, Dict, Optional
 from core.config import settings
+from core.metrics import (
+    InstrumentedQueuePool, InstrumentedAsyncQueuePool, InstrumentedReadQueuePool, InstrumentedAsyncReadQueuePool
+)
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
-# Log da URL de conexão (com senha mascarada para segurança)
-try:
-    url_parts = settings.DATABASE_URL.split('://')
-    if len(url_parts) > 1:
-        credentials = url_parts[1].split('@')[0]
-        if ':' in credentials:
-            password = credentials.split(':')[1]
-            masked_url = settings.DATABASE_URL.replace(password, '***')
-        else:
-            masked_url = settings.DATABASE_URL
-    else:
-        masked_url = settings.DATABASE_URL
-except:
-    masked_url = settings.DATABASE_URL
-
-logger.info(f"🔗 Tentando conectar com: {masked_url}")
+def mask_database_url(url: str) -> str:
+    """
+    URL de conexão com a senha mascarada, para logs
+    """
+    try:
+        url_parts = url.split('://')
+        if len(url_parts) > 1:
+            credentials = url_parts[1].split('@')[0]
+            if ':' in credentials:
+                password = credentials.split(':')[1]
+                return url.replace(password, '***')
+        return url
+    except Exception:
+        return url
 
 Base = declarative_base()
 
-try:
-    # Criar engine com configurações robustas
-    engine = create_engine(
-        settings.DATABASE_URL,
-        pool_pre_ping=True,
-        echo=True,
-        pool_recycle=3600,
-        connect_args={
-            "connect_timeout": 10
-        }
-    )
-    
-    # Testar conexão imediatamente
-    logger.info("🧪 Testando conexão com banco...")
+# Drivers assíncronos equivalentes aos síncronos da DATABASE_URL
+ASYNC_DRIVERS = {
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def _url_assincrona(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+def get_async_database_url() -> str:
+    """
+    URL do engine assíncrono: ASYNC_DATABASE_URL ou DATABASE_URL com driver async
+    """
+    return settings.ASYNC_DATABASE_URL or _url_assincrona(settings.DATABASE_URL)
+
+def get_async_read_database_url() -> str:
+    """
+    URL assíncrona da réplica ("" quando não há réplica configurada)
+    """
+    if not settings.DATABASE_READ_URL:
+        return ""
+    return settings.ASYNC_DATABASE_READ_URL or _url_assincrona(settings.DATABASE_READ_URL)
+
+def _engine_options(url: str, leitura: bool = False) -> Dict[str, Any]:
+    """
+    Parâmetros de pool vindos do Settings (SQLite não usa QueuePool)
+    """
+    options: Dict[str, Any] = {
+        "pool_pre_ping": True,
+        "echo": settings.DB_ECHO,
+    }
+    if not url.startswith("sqlite"):
+        options.update(
+            poolclass=InstrumentedReadQueuePool if leitura else InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    if url.startswith("mysql"):
+        options["connect_args"] = {"connect_timeout": settings.DB_CONNECT_TIMEOUT}
+    return options
+
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker que cria o engine no primeiro uso"""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None and "bind" not in local_kw:
+            get_engine()
+        return super().__call__(**local_kw)
+
+class _LazyAsyncSessionmaker(async_sessionmaker):
+    """async_sessionmaker que cria o engine assíncrono no primeiro uso"""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None and "bind" not in local_kw:
+            get_async_engine()
+        return super().__call__(**local_kw)
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+
+AsyncSessionLocal = _LazyAsyncSessionmaker(
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_read_engine: Optional[Engine] = None
+_async_read_engine: Optional[AsyncEngine] = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    """
+    Engine síncrono, criado sob demanda (nenhuma conexão é aberta aqui)
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                url = settings.DATABASE_URL
+                logger.info(f"🔗 Criando engine para: {mask_database_url(url)}")
+                _engine = create_engine(url, **_engine_options(url))
+                SessionLocal.configure(bind=_engine)
+    return _engine
+
+def _criar_async_engine(url: str, leitura: bool = False) -> AsyncEngine:
+    options = _engine_options(url, leitura)
+    # connect_timeout é específico do pymysql
+    options.pop("connect_args", None)
+    if "poolclass" in options:
+        options["poolclass"] = InstrumentedAsyncReadQueuePool if leitura else InstrumentedAsyncQueuePool
+    return create_async_engine(url, **options)
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Engine assíncrono, criado sob demanda
+    """
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                _async_engine = _criar_async_engine(get_async_database_url())
+                AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+def get_read_engine() -> Optional[Engine]:
+    """
+    Engine síncrono da réplica de leitura (None sem DATABASE_READ_URL)
+    """
+    global _read_engine
+    if _read_engine is None and settings.DATABASE_READ_URL:
+        with _engine_lock:
+            if _read_engine is None:
+                url = settings.DATABASE_READ_URL
+                logger.info(f"📖 Criando engine de leitura para: {mask_database_url(url)}")
+                _read_engine = create_engine(url, **_engine_options(url, leitura=True))
+    return _read_engine
+
+def get_async_read_engine() -> Optional[AsyncEngine]:
+    """
+    Engine assíncrono da réplica de leitura (None sem DATABASE_READ_URL)
+    """
+    global _async_read_engine
+    if _async_read_engine is None and settings.DATABASE_READ_URL:
+        with _engine_lock:
+            if _async_read_engine is None:
+                _async_read_engine = _criar_async_engine(get_async_read_database_url(), leitura=True)
+    return _async_read_engine
+
+async def dispose_engines() -> None:
+    """
+    Fecha os pools dos engines já criados (shutdown)
+    """
+    for engine in (_engine, _read_engine):
+        if engine is not None:
+            engine.dispose()
+    for async_engine in (_async_engine, _async_read_engine):
+        if async_engine is not None:
+            await async_engine.dispose()
+
+def verificar_banco(detalhado: bool = False) -> Dict[str, Any]:
+    """
+    Probe de prontidão: uma única conexão com SELECT 1 e,
+    opcionalmente, nome do banco, usuário e versão (MySQL)
+    """
+    engine = get_engine()
     with engine.connect() as conn:
-        # Teste básico
-        result = conn.execute(text("SELECT 1"))
-        logger.info("✅ Teste SELECT 1: OK")
-        
-        # Informações do banco
-        db_info = conn.execute(text("SELECT DATABASE(), USER(), VERSION()"))
-        info_data = db_info.fetchone()
-        if info_data:
-            logger.info(f"📊 Banco: {info_data[0]}, Usuário: {info_data[1]}, Versão: {info_data[2]}")
-        else:
-            logger.warning("⚠️ Não foi possível obter informações do banco")
-        
-        # Listar tabelas
-        tables_result = conn.execute(text("SHOW TABLES"))
-        tables = [row[0] for row in tables_result.fetchall()] if tables_result else []
-        logger.info(f"📋 Tabelas existentes: {tables}")
-    
-    logger.info("🎉 Conexão com banco estabelecida com sucesso!")
-    
-except Exception as e:
-    logger.error(f"💥 ERRO CRÍTICO na conexão com banco: {e}")
-    logger.error("💡 Possíveis soluções:")
-    logger.error("   1. Verifique se o MySQL está rodando")
-    logger.error("   2. Verifique se a senha está correta") 
-    logger.error("   3. Verifique se o banco 'upath_db' existe")
-    logger.error("   4. Verifique se o usuário tem privilégios")
-    raise
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        conn.execute(text("SELECT 1"))
+        info: Dict[str, Any] = {"status": "healthy"}
+
+        if detalhado and engine.dialect.name == "mysql":
+            db_data = conn.execute(text("SELECT DATABASE(), USER(), VERSION()")).fetchone()
+            if db_data:
+                info.update(name=db_data[0], user=db_data[1], version=db_data[2])
+    return info
 
 def create_tables():
     try:
         logger.info("🏗️ Criando tabelas...")
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=get_engine())
         logger.info("✅ Tabelas criadas/verificadas com sucesso!")
     except Exception as e:
         logger.error(f"❌ Erro ao criar tabelas: {e}")
         raise
-    
+
 def get_db():
     db = SessionLocal()
     try:
@@ -89,4 +211,21 @@ def get_db():
         db.rollback()
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except SQLAlchemyError as e:
+            logger.error(f"❌ Erro na sessão assíncrona do banco: {e}")
+            await db.rollback()
+            raise
+
+def __getattr__(name: str):
+    # Compatibilidade: `from core.database import engine` cria o engine sob demanda
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
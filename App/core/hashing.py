@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from passlib.context import CryptContext
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Contexto usado dentro dos processos do pool (cada processo tem o seu)
+_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash_worker(password: str) -> str:
+    return _pwd_context.hash(password)
+
+
+def _verify_worker(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return _pwd_context.verify(plain_password, hashed_password)
+    except Exception as e:
+        print(f"Erro ao verificar senha: {str(e)}")
+        return False
+
+
+class HashingBusyError(Exception):
+    """
+    Fila de hashing cheia - o chamador deve responder 503 e tentar depois
+    """
+    pass
+
+
+class HashingService:
+    """
+    Executa bcrypt em um pool de processos dimensionado pelos núcleos,
+    com fila limitada (backpressure) e métricas de fila e latência.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+    ):
+        self.max_workers = max_workers or settings.HASH_POOL_WORKERS or os.cpu_count() or 1
+        self.max_queue = max_queue if max_queue is not None else settings.HASH_QUEUE_MAX
+        self.queue_timeout = (
+            queue_timeout if queue_timeout is not None else settings.HASH_QUEUE_TIMEOUT_SECONDS
+        )
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Métricas
+        self._waiting = 0
+        self._running = 0
+        self._rejected = 0
+        self._completed = 0
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+        self._recent_ms: deque = deque(maxlen=1024)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    logger.info(f"🔐 Iniciando pool de hashing com {self.max_workers} processos")
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        # Semáforo pertence ao event loop em execução
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+            self._slots_loop = loop
+        return self._slots
+
+    async def _submit(self, fn, *args) -> Any:
+        slots = self._get_slots()
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected += 1
+            raise HashingBusyError("Fila de hashing cheia")
+        finally:
+            self._waiting -= 1
+
+        self._running += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._running -= 1
+            self._record(elapsed_ms)
+            slots.release()
+
+    def _record(self, elapsed_ms: float) -> None:
+        self._completed += 1
+        self._total_ms += elapsed_ms
+        self._max_ms = max(self._max_ms, elapsed_ms)
+        self._recent_ms.append(elapsed_ms)
+
+    async def hash(self, password: str) -> str:
+        """
+        Gera hash bcrypt fora do processo da API
+        """
+        return await self._submit(_hash_worker, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verifica senha bcrypt fora do processo da API
+        """
+        return await self._submit(_verify_worker, plain_password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Profundidade da fila e latência (ms) das operações de hash
+        """
+        recent = sorted(self._recent_ms)
+
+        def percentile(p: float) -> float:
+            if not recent:
+                return 0.0
+            return round(recent[min(len(recent) - 1, int(len(recent) * p))], 2)
+
+        return {
+            "workers": self.max_workers,
+            "queue_max": self.max_queue,
+            # Aguardando vaga na fila + aguardando um processo livre
+            "queue_depth": self._waiting + max(0, self._running - self.max_workers),
+            "in_flight": self._running,
+            "rejected": self._rejected,
+            "completed": self._completed,
+            "latency_ms": {
+                "avg": round(self._total_ms / self._completed, 2) if self._completed else 0.0,
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(self._max_ms, 2),
+            },
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+hashing_service = HashingService()
@@ -0,0 +1,58 @@
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Depends, Request, Response
+
+# Perfis de Cache-Control usados pelas rotas
+PRIVADO_REVALIDAR = "private, no-cache"
+PRIVADO_CURTO = "private, max-age=30, must-revalidate"
+
+class NaoModificado(Exception):
+    """
+    Levantada pela dependência de GET condicional quando o If-None-Match
+    corresponde ao ETag atual; o handler em main.py responde 304
+    """
+
+    def __init__(self, etag: str, cache_control: str):
+        self.etag = etag
+        self.cache_control = cache_control
+
+def etag_versao(recurso: str, recurso_id: Any, versao: Any) -> str:
+    # Fraco: identifica a versão da linha, não os bytes da representação
+    return f'W/"{recurso}-{recurso_id}-{versao}"'
+
+def etag_corresponde(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Comparação fraca (RFC 9110): ignora o prefixo W/ dos dois lados
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    alvo = etag.removeprefix("W/")
+    return any(e.strip().removeprefix("W/") == alvo for e in if_none_match.split(","))
+
+def get_condicional(
+    etag_atual: Callable[..., Awaitable[Optional[str]]],
+    cache_control: str = PRIVADO_REVALIDAR,
+) -> Callable[..., Awaitable[Optional[str]]]:
+    """
+    Dependência de GET condicional. `etag_atual` é outra dependência que
+    devolve o ETag a partir de uma consulta barata de versão (ou None se o
+    recurso não existe, deixando o 404 para a rota). Com If-None-Match
+    correspondente a rota nem executa: a resposta é 304.
+    """
+
+    async def verificar(
+        request: Request,
+        response: Response,
+        etag: Optional[str] = Depends(etag_atual),
+    ) -> Optional[str]:
+        response.headers["Cache-Control"] = cache_control
+        if etag is None:
+            return None
+        response.headers["ETag"] = etag
+        if request.method in ("GET", "HEAD") and etag_corresponde(request.headers.get("if-none-match"), etag):
+            raise NaoModificado(etag, cache_control)
+        return etag
+
+    return verificar
@@ -0,0 +1,274 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Métricas em processo no formato de exposição de texto do Prometheus.
+# Cada observação é um lock + algumas somas; a serialização só ocorre no scrape.
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pares = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    tipo = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.tipo}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    tipo = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            valores = list(self._values.items())
+        linhas = self._header()
+        for labels, valor in valores:
+            linhas.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(valor)}")
+        return linhas
+
+class Gauge(_Metric):
+    """
+    Gauge com valores definidos via set() ou lidos no scrape via callback
+    """
+    tipo = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        if self.callback is not None:
+            valores = list(self.callback().items())
+        else:
+            with self._lock:
+                valores = list(self._values.items())
+        linhas = self._header()
+        for labels, valor in valores:
+            linhas.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(valor)}")
+        return linhas
+
+class Histogram(_Metric):
+    tipo = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [contagens por bucket (não cumulativas) + overflow, soma]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        indice = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            serie = self._values.get(labels)
+            if serie is None:
+                serie = ([0] * (len(self.buckets) + 1), [0.0])
+                self._values[labels] = serie
+            serie[0][indice] += 1
+            serie[1][0] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - inicio, *labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            valores = [(labels, list(contagens), soma[0]) for labels, (contagens, soma) in self._values.items()]
+        linhas = self._header()
+        for labels, contagens, soma in valores:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float("inf"),), contagens):
+                acumulado += contagem
+                le = f'le="{_format_value(limite)}"'
+                linhas.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {acumulado}"
+                )
+            sufixo = _format_labels(self.labelnames, labels)
+            linhas.append(f"{self.name}_sum{sufixo} {_format_value(soma)}")
+            linhas.append(f"{self.name}_count{sufixo} {acumulado}")
+        return linhas
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        linhas: List[str] = []
+        for metric in self._metrics:
+            linhas.extend(metric.render())
+        return "\n".join(linhas) + "\n"
+
+REGISTRY = Registry()
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames)) # type: ignore
+
+def gauge(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    callback: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames, callback)) # type: ignore
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets)) # type: ignore
+
+# Séries da aplicação
+
+HTTP_REQUEST_DURATION = histogram(
+    "upath_http_request_duration_seconds",
+    "Latência das requisições HTTP por rota",
+    ("method", "route"),
+)
+HTTP_REQUESTS = counter(
+    "upath_http_requests_total",
+    "Requisições HTTP por rota e status",
+    ("method", "route", "status"),
+)
+
+DB_POOL_CHECKOUT_WAIT = histogram(
+    "upath_db_pool_checkout_wait_seconds",
+    "Espera para obter uma conexão do pool",
+    ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_CHECKOUT_TIMEOUTS = counter(
+    "upath_db_pool_checkout_timeouts_total",
+    "Checkouts que falharam (timeout do pool ou erro de conexão)",
+    ("engine",),
+)
+
+BCRYPT_DURATION = histogram(
+    "upath_bcrypt_duration_seconds",
+    "Duração de hash/verificação bcrypt (async inclui a fila do pool)",
+    ("operation",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5, 5.0),
+)
+
+SMTP_SEND_DURATION = histogram(
+    "upath_smtp_send_duration_seconds",
+    "Duração do envio SMTP (inclui reconexão quando necessária)",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+SMTP_SEND_FAILURES = counter(
+    "upath_smtp_send_failures_total",
+    "Falhas de envio SMTP por tipo de erro",
+    ("error",),
+)
+
+# Pools instrumentados (escolhidos em core.database._engine_options)
+
+_pools: Dict[str, QueuePool] = {}
+
+class _CheckoutTimingMixin:
+    metrics_name = "sync"
+
+    def _do_get(self): # type: ignore
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get() # type: ignore
+        except Exception:
+            DB_POOL_CHECKOUT_TIMEOUTS.inc(self.metrics_name)
+            raise
+        DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - inicio, self.metrics_name)
+        return conexao
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    metrics_name = "sync"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _pools[self.metrics_name] = self
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    metrics_name = "async"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _pools[self.metrics_name] = self
+
+# Pools da réplica de leitura (core.database.get_read_engine)
+
+class InstrumentedReadQueuePool(InstrumentedQueuePool):
+    metrics_name = "sync_leitura"
+
+class InstrumentedAsyncReadQueuePool(InstrumentedAsyncQueuePool):
+    metrics_name = "async_leitura"
+
+def _pool_in_use() -> Dict[LabelValues, float]:
+    return {(nome,): pool.checkedout() for nome, pool in list(_pools.items())}
+
+def _pool_size() -> Dict[LabelValues, float]:
+    return {(nome,): pool.size() for nome, pool in list(_pools.items())}
+
+def _pool_overflow() -> Dict[LabelValues, float]:
+    return {(nome,): max(0, pool.overflow()) for nome, pool in list(_pools.items())}
+
+gauge("upath_db_pool_connections_in_use", "Conexões emprestadas do pool", ("engine",), _pool_in_use)
+gauge("upath_db_pool_size", "Tamanho configurado do pool", ("engine",), _pool_size)
+gauge("upath_db_pool_overflow", "Conexões de overflow abertas", ("engine",), _pool_overflow)
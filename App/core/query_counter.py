@@ -0,0 +1,127 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class QueryStats:
+    """
+    Statements e tempo de banco acumulados em um escopo (ex.: uma requisição)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.time_ms = 0.0
+        self.statements: Counter = Counter()
+
+    def registrar(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.time_ms += elapsed_ms
+        self.statements[statement] += 1
+
+    def repetidos(self, limite: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Statements idênticos executados `limite` vezes ou mais (provável N+1)
+        """
+        limite = limite or settings.QUERY_N1_THRESHOLD
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= limite]
+
+    def resumo(self) -> Dict[str, Any]:
+        return {
+            "queries": self.count,
+            "db_time_ms": round(self.time_ms, 2),
+            "repetidos": [{"sql": sql[:200], "vezes": n} for sql, n in self.repetidos()],
+        }
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+class QueryBudgetExceeded(AssertionError):
+    """Mais statements do que o orçamento declarado para o trecho"""
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Conta os statements executados dentro do bloco (inclusive no threadpool
+    e em AsyncSession, que herdam o contexto)
+    """
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """
+    Orçamento de queries para testes de services/trechos executados
+    no mesmo contexto:
+
+        with query_budget(3):
+            AdminService(db).consultar_historico_acessos()
+    """
+    with track_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        detalhes = "\n".join(f"  {n}x {sql[:200]}" for sql, n in stats.statements.most_common())
+        raise QueryBudgetExceeded(
+            f"{stats.count} queries executadas (orçamento: {max_queries}):\n{detalhes}"
+        )
+
+def assert_query_budget(response: Any, max_queries: int) -> int:
+    """
+    Orçamento por rota, lido do header X-DB-Query-Count (TestClient roda a
+    aplicação em outra thread, fora do contexto do teste)
+    """
+    count = int(response.headers["X-DB-Query-Count"])
+    if count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{response.request.method} {response.request.url.path}: "
+            f"{count} queries executadas (orçamento: {max_queries})"
+        )
+    return count
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+# Listeners na classe Engine: valem para todos os engines, inclusive o
+# sync_engine por trás do engine assíncrono
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_execucao(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _apos_execucao(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    inicios = conn.info.get("query_start")
+    if not inicios:
+        return
+    elapsed_ms = (time.perf_counter() - inicios.pop()) * 1000
+    stats.registrar(statement, elapsed_ms)
+
+def registrar_requisicao(metodo: str, caminho: str, stats: QueryStats) -> None:
+    """
+    Log por requisição; warning para prováveis N+1 e excesso de queries
+    """
+    repetidos = stats.repetidos()
+    for sql, n in repetidos:
+        logger.warning(f"🔁 Provável N+1 em {metodo} {caminho}: {n}x {sql[:200]}")
+
+    if stats.count > settings.QUERY_WARN_THRESHOLD:
+        logger.warning(
+            f"🐢 {metodo} {caminho}: {stats.count} queries em {stats.time_ms:.1f}ms"
+        )
+    else:
+        logger.debug(f"🗄️ {metodo} {caminho}: {stats.count} queries em {stats.time_ms:.1f}ms")
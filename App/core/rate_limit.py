@@ -0,0 +1,245 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import math
+import time
+
+from fastapi import HTTPException, Request, status
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def parse_rule(rule: str) -> Tuple[int, int]:
+    """
+    Converte "limite/segundos" (ex.: "5/60") em (limite, janela)
+    """
+    limite, janela = rule.split("/")
+    return int(limite), int(janela)
+
+def _sliding_estimate(previous: int, current: int, elapsed: float, window: int) -> float:
+    # Contador de janela deslizante: janela anterior ponderada pelo que ainda resta dela
+    return previous * (1 - elapsed / window) + current
+
+def _retry_after(previous: int, current: int, elapsed: float, window: int, limit: int) -> int:
+    if current >= limit or previous == 0:
+        return max(1, math.ceil(window - elapsed))
+    # Momento em que o peso da janela anterior cai o suficiente para liberar 1 tentativa
+    espera = window * (1 - (limit - current) / previous) - elapsed
+    return max(1, math.ceil(espera))
+
+# (chave, limite, janela)
+Regra = Tuple[str, int, int]
+
+class RateLimitBackend(ABC):
+    """
+    Contadores de janela deslizante (aproximação de duas janelas fixas)
+    """
+
+    @abstractmethod
+    async def hit_all(self, regras: Sequence[Regra]) -> Tuple[bool, int, Optional[str]]:
+        """
+        Registra a tentativa em todas as regras somente se todas tiverem cota;
+        tentativa negada não consome nada. Retorna (permitido, retry_after, chave negada).
+        """
+
+    async def hit(self, key: str, limit: int, window: int) -> Tuple[bool, int]:
+        permitido, retry_after, _ = await self.hit_all([(key, limit, window)])
+        return permitido, retry_after
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    Backend em processo - cada worker tem seus próprios contadores.
+    Sem await entre a verificação e o incremento: atômico no event loop.
+    """
+
+    PRUNE_EVERY = 10000
+
+    def __init__(self):
+        # chave -> [índice da janela, contagem atual, contagem anterior, janela]
+        self._counters: Dict[str, List[int]] = {}
+        self._hits = 0
+
+    def _contador(self, key: str, window: int, indice: int) -> List[int]:
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = [indice, 0, 0, window]
+            self._counters[key] = counter
+        elif counter[0] != indice:
+            # Janela avançou: a atual vira anterior (ou zera se pulou mais de uma)
+            counter[2] = counter[1] if counter[0] == indice - 1 else 0
+            counter[1] = 0
+            counter[0] = indice
+        return counter
+
+    async def hit_all(self, regras: Sequence[Regra]) -> Tuple[bool, int, Optional[str]]:
+        agora = time.time()
+        contadores = []
+        for key, limit, window in regras:
+            indice = int(agora // window)
+            elapsed = agora - indice * window
+            counter = self._contador(key, window, indice)
+            _, atual, anterior, _ = counter
+            if _sliding_estimate(anterior, atual, elapsed, window) + 1 > limit:
+                return False, _retry_after(anterior, atual, elapsed, window, limit), key
+            contadores.append(counter)
+
+        for counter in contadores:
+            counter[1] += 1
+        self._hits += 1
+        if self._hits % self.PRUNE_EVERY == 0:
+            self._prune(agora)
+        return True, 0, None
+
+    def _prune(self, agora: float) -> None:
+        # Descarta chaves sem tentativas na janela atual nem na anterior
+        self._counters = {
+            k: c for k, c in self._counters.items() if c[0] >= int(agora // c[3]) - 1
+        }
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Backend compartilhado entre workers (Redis). Verificação de todas as
+    regras e incremento acontecem atomicamente em um único script Lua.
+    """
+
+    # KEYS: pares (janela atual, janela anterior) por regra
+    # ARGV: trincas (limite, janela, decorrido) por regra
+    SCRIPT = """
+    local n = #KEYS / 2
+    for i = 1, n do
+        local atual = tonumber(redis.call('GET', KEYS[2 * i - 1]) or '0')
+        local anterior = tonumber(redis.call('GET', KEYS[2 * i]) or '0')
+        local limite = tonumber(ARGV[3 * i - 2])
+        local janela = tonumber(ARGV[3 * i - 1])
+        local decorrido = tonumber(ARGV[3 * i])
+        if anterior * (1 - decorrido / janela) + atual + 1 > limite then
+            return {0, i, atual, anterior}
+        end
+    end
+    for i = 1, n do
+        redis.call('INCR', KEYS[2 * i - 1])
+        redis.call('EXPIRE', KEYS[2 * i - 1], tonumber(ARGV[3 * i - 1]) * 2)
+    end
+    return {1, 0, 0, 0}
+    """
+
+    def __init__(self, url: str, prefix: str = "upath:rl", timeout: Optional[float] = None):
+        import redis
+        import redis.asyncio as redis_async  # dependência opcional
+
+        # Login não pode ficar pendurado no Redis: timeout curto em cada operação
+        timeout = settings.RATE_LIMIT_REDIS_TIMEOUT_SECONDS if timeout is None else timeout
+        self._redis = redis_async.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._script = self._redis.register_script(self.SCRIPT)
+        self.prefix = prefix
+        # Falhas de conexão/servidor tratadas pelo FallbackRateLimitBackend
+        self.erros = (redis.RedisError, OSError)
+
+    async def hit_all(self, regras: Sequence[Regra]) -> Tuple[bool, int, Optional[str]]:
+        agora = time.time()
+        keys: List[str] = []
+        args: List[float] = []
+        decorridos: List[float] = []
+        for key, limit, window in regras:
+            indice = int(agora // window)
+            elapsed = agora - indice * window
+            keys += [f"{self.prefix}:{key}:{indice}", f"{self.prefix}:{key}:{indice - 1}"]
+            args += [limit, window, elapsed]
+            decorridos.append(elapsed)
+
+        permitido, posicao, atual, anterior = await self._script(keys=keys, args=args)
+        if permitido:
+            return True, 0, None
+        key, limit, window = regras[int(posicao) - 1]
+        retry_after = _retry_after(int(anterior), int(atual), decorridos[int(posicao) - 1], window, limit)
+        return False, retry_after, key
+
+class FallbackRateLimitBackend(RateLimitBackend):
+    """
+    Redis com contadores locais de reserva: com o Redis fora, os limites
+    seguem valendo por worker em vez de derrubar o login. Depois de uma
+    falha o Redis só é tentado de novo após retry_seconds.
+    """
+
+    def __init__(
+        self,
+        primary: RedisRateLimitBackend,
+        local: RateLimitBackend,
+        retry_seconds: Optional[float] = None,
+    ):
+        self.primary = primary
+        self.local = local
+        self.retry_seconds = settings.RATE_LIMIT_REDIS_RETRY_SECONDS if retry_seconds is None else retry_seconds
+        self._degradado = False
+        self._proxima_tentativa = 0.0
+
+    async def hit_all(self, regras: Sequence[Regra]) -> Tuple[bool, int, Optional[str]]:
+        if self._degradado and time.monotonic() < self._proxima_tentativa:
+            return await self.local.hit_all(regras)
+        try:
+            resultado = await self.primary.hit_all(regras)
+        except self.primary.erros as e:
+            if not self._degradado:
+                logger.warning(f"⚠️ Redis do rate limit indisponível, usando contadores locais: {e}")
+            self._degradado = True
+            self._proxima_tentativa = time.monotonic() + self.retry_seconds
+            return await self.local.hit_all(regras)
+        if self._degradado:
+            logger.info("✅ Redis do rate limit disponível novamente")
+            self._degradado = False
+        return resultado
+
+class LoginRateLimiter:
+    """
+    Limites de tentativas de login por IP, por identificador (email/username)
+    e global, verificados antes de qualquer consulta ao banco ou bcrypt
+    """
+
+    def __init__(self, backend: Optional[RateLimitBackend] = None):
+        self._backend = backend
+
+    @property
+    def backend(self) -> RateLimitBackend:
+        if self._backend is None:
+            if settings.RATE_LIMIT_BACKEND == "redis":
+                self._backend = FallbackRateLimitBackend(
+                    RedisRateLimitBackend(settings.REDIS_URL), MemoryRateLimitBackend()
+                )
+            else:
+                self._backend = MemoryRateLimitBackend()
+        return self._backend
+
+    @staticmethod
+    def client_ip(request: Request) -> str:
+        if settings.TRUST_PROXY_HEADERS:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return request.client.host if request.client else "desconhecido"
+
+    async def verificar(self, request: Request, escopo: str, identificador: str) -> None:
+        """
+        Levanta HTTPException 429 com Retry-After quando algum limite estoura
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        regras = [
+            (f"{escopo}:global", settings.LOGIN_RATE_LIMIT_GLOBAL),
+            (f"{escopo}:ip:{self.client_ip(request)}", settings.LOGIN_RATE_LIMIT_IP),
+            (f"{escopo}:id:{identificador.lower().strip()}", settings.LOGIN_RATE_LIMIT_IDENTIFIER),
+        ]
+
+        # Tudo ou nada: tentativa barrada por uma regra não consome a cota das outras
+        permitido, retry_after, chave = await self.backend.hit_all(
+            [(chave, *parse_rule(regra)) for chave, regra in regras]
+        )
+        if not permitido:
+            logger.warning(f"🚫 Limite de login excedido ({chave.split(':')[1]}) em {escopo}") # type: ignore
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Muitas tentativas de login. Tente novamente mais tarde.",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+login_rate_limiter = LoginRateLimiter()
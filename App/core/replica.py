@@ -0,0 +1,242 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from fastapi import Request
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+
+from core.cache import Cache
+from core.config import settings
+from core.database import SessionLocal, AsyncSessionLocal, get_read_engine, get_async_read_engine
+from core.security import usuario_do_header
+
+logger = logging.getLogger(__name__)
+
+# Usuários que escreveram há pouco: leituras fixadas no primário (compartilhado via redis quando configurado)
+leitura_primario = Cache("leitura_primario", settings.READ_YOUR_WRITES_SECONDS)
+
+def _medir_lag(conn: Connection) -> Optional[float]:
+    """
+    Atraso da réplica em segundos. None = replicação parada.
+    Bancos sem réplica nativa (SQLite em testes) contam como sem atraso.
+    """
+    dialeto = conn.dialect.name
+    if dialeto == "mysql":
+        for comando, coluna in (
+            ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+            ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+        ):
+            try:
+                linha = conn.execute(text(comando)).mappings().first()
+            except DBAPIError:
+                continue
+            if linha is None:
+                # Servidor não é réplica (ex.: réplica gerenciada sem status visível)
+                return 0.0
+            lag = linha.get(coluna)
+            return float(lag) if lag is not None else None
+        return 0.0
+    if dialeto == "postgresql":
+        lag = conn.execute(text(
+            "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+        )).scalar()
+        return float(lag or 0)
+    conn.execute(text("SELECT 1"))
+    return 0.0
+
+class ReplicaMonitor:
+    """
+    Estado da réplica por worker: atraso medido a cada READ_REPLICA_CHECK_SECONDS
+    (pela primeira requisição que encontrar a medição vencida) e falhas de
+    conexão. Réplica atrasada ou fora manda as leituras ao primário.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.disponivel = True
+        self.lag: Optional[float] = None
+        self.ultimo_erro: Optional[str] = None
+        self._verificado_em = 0.0
+        self._verificando = False
+        self.leituras_replica = 0
+        self.leituras_primario = 0
+
+    def reservar_verificacao(self) -> bool:
+        """True para quem deve medir agora (uma verificação por vez)"""
+        with self._lock:
+            if self._verificando or time.monotonic() - self._verificado_em < settings.READ_REPLICA_CHECK_SECONDS:
+                return False
+            self._verificando = True
+            return True
+
+    def registrar(self, lag: Optional[float], erro: Optional[Exception] = None) -> None:
+        with self._lock:
+            self._verificando = False
+            self._verificado_em = time.monotonic()
+            self.lag = lag
+            disponivel = erro is None and lag is not None and lag <= settings.READ_REPLICA_MAX_LAG_SECONDS
+            if disponivel != self.disponivel:
+                if disponivel:
+                    logger.info(f"✅ Réplica de leitura disponível (atraso {lag}s)")
+                else:
+                    motivo = erro or (f"atraso {lag}s" if lag is not None else "replicação parada")
+                    logger.warning(f"⚠️ Réplica de leitura fora de uso, leituras no primário: {motivo}")
+            self.disponivel = disponivel
+            self.ultimo_erro = str(erro)[:200] if erro else None
+
+    def verificar(self, engine: Engine) -> None:
+        try:
+            with engine.connect() as conn:
+                lag = _medir_lag(conn)
+        except SQLAlchemyError as e:
+            self.registrar(None, e)
+            return
+        self.registrar(lag)
+
+    async def verificar_async(self, engine) -> None:
+        try:
+            async with engine.connect() as conn:
+                lag = await conn.run_sync(_medir_lag)
+        except SQLAlchemyError as e:
+            self.registrar(None, e)
+            return
+        self.registrar(lag)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "configurada": bool(settings.DATABASE_READ_URL),
+            "disponivel": self.disponivel,
+            "lag_seconds": self.lag,
+            "ultimo_erro": self.ultimo_erro,
+            "leituras_replica": self.leituras_replica,
+            "leituras_primario": self.leituras_primario,
+        }
+
+replica_monitor = ReplicaMonitor()
+
+# Escritas na requisição atual (marcador mutável: vale também no threadpool)
+class _Escritas:
+    __slots__ = ("houve",)
+
+    def __init__(self):
+        self.houve = False
+
+_escritas: ContextVar[Optional[_Escritas]] = ContextVar("escritas_requisicao", default=None)
+
+@contextmanager
+def rastrear_escritas() -> Iterator[_Escritas]:
+    marcador = _Escritas()
+    token = _escritas.set(marcador)
+    try:
+        yield marcador
+    finally:
+        _escritas.reset(token)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _marcar_escrita(conn, cursor, statement, parameters, context, executemany):
+    marcador = _escritas.get()
+    if marcador is not None and not marcador.houve and statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+        marcador.houve = True
+
+def marcar_autor(request: Request, user_id: int) -> None:
+    """
+    Autor da escrita em rotas sem Bearer token (cadastro, login): as próximas
+    leituras dele também vão ao primário
+    """
+    request.state.autor_escrita = user_id
+
+async def fixar_primario(request: Request) -> None:
+    """
+    Read-your-writes: o autor da escrita lê do primário por READ_YOUR_WRITES_SECONDS
+    """
+    usuario = usuario_do_header(request.headers.get("authorization"))
+    user_id = usuario["user_id"] if usuario else getattr(request.state, "autor_escrita", None)
+    if user_id is not None:
+        await leitura_primario.set(user_id, 1)
+
+def _usar_replica_sync(request: Request) -> bool:
+    engine = get_read_engine()
+    if engine is None:
+        return False
+    usuario = usuario_do_header(request.headers.get("authorization"))
+    if usuario and leitura_primario.get_sync(usuario["user_id"]) is not None:
+        return False
+    if replica_monitor.reservar_verificacao():
+        replica_monitor.verificar(engine)
+    return replica_monitor.disponivel
+
+async def _usar_replica_async(request: Request) -> bool:
+    engine = get_async_read_engine()
+    if engine is None:
+        return False
+    usuario = usuario_do_header(request.headers.get("authorization"))
+    if usuario and await leitura_primario.get(usuario["user_id"]) is not None:
+        return False
+    if replica_monitor.reservar_verificacao():
+        await replica_monitor.verificar_async(engine)
+    return replica_monitor.disponivel
+
+def get_read_db(request: Request):
+    """
+    Sessão para rotas somente leitura: réplica quando configurada, em dia e
+    sem escrita recente do usuário; senão o primário (como get_db)
+    """
+    db = None
+    if _usar_replica_sync(request):
+        db = SessionLocal(bind=get_read_engine())
+        try:
+            # Conexão antecipada: réplica fora cai para o primário antes da rota rodar
+            db.connection()
+        except DBAPIError as e:
+            db.close()
+            replica_monitor.registrar(None, e)
+            db = None
+
+    if db is None:
+        db = SessionLocal()
+        replica_monitor.leituras_primario += 1
+    else:
+        replica_monitor.leituras_replica += 1
+
+    try:
+        yield db
+    except SQLAlchemyError as e:
+        logger.error(f"❌ Erro na sessão de leitura: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+async def get_async_read_db(request: Request):
+    """
+    Versão assíncrona de get_read_db
+    """
+    db = None
+    if await _usar_replica_async(request):
+        db = AsyncSessionLocal(bind=get_async_read_engine())
+        try:
+            await db.connection()
+        except DBAPIError as e:
+            await db.close()
+            replica_monitor.registrar(None, e)
+            db = None
+
+    if db is None:
+        db = AsyncSessionLocal()
+        replica_monitor.leituras_primario += 1
+    else:
+        replica_monitor.leituras_replica += 1
+
+    try:
+        yield db
+    except SQLAlchemyError as e:
+        logger.error(f"❌ Erro na sessão assíncrona de leitura: {e}")
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
@@ -1,21 +1,92 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+import hashlib
+import threading
+import time
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from passlib.context import CryptContext
 from core.config import settings
+from core.hashing import hashing_service
+from core.metrics import BCRYPT_DURATION
 
 # Configuração do passlib para hashing seguro
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+class VerifiedTokenCache:
+    """
+    LRU limitado de claims de JWTs já verificados, indexado pelo digest do token.
+    Cada entrada expira no 'exp' do próprio token.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            claims, exp = entry
+            if exp <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return claims
+
+    def set(self, token: str, claims: Dict[str, Any], exp: float) -> None:
+        if self.max_size <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+token_cache = VerifiedTokenCache(settings.JWT_CACHE_SIZE)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verifica senha usando bcrypt
     """
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        with BCRYPT_DURATION.time("verify"):
+            return pwd_context.verify(plain_password, hashed_password)
     except Exception as e:
         print(f"Erro ao verificar senha: {str(e)}")
         return False
@@ -24,7 +95,28 @@ def get_password_hash(password: str) -> str:
     """
     Gera hash da senha usando bcrypt
     """
-    return pwd_context.hash(password)
+    with BCRYPT_DURATION.time("hash"):
+        return pwd_context.hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verifica senha no pool de hashing, sem ocupar o event loop nem o threadpool.
+    Levanta HashingBusyError quando a fila está cheia.
+    """
+    inicio = time.perf_counter()
+    resultado = await hashing_service.verify(plain_password, hashed_password)
+    BCRYPT_DURATION.observe(time.perf_counter() - inicio, "verify_async")
+    return resultado
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Gera hash da senha no pool de hashing.
+    Levanta HashingBusyError quando a fila está cheia.
+    """
+    inicio = time.perf_counter()
+    resultado = await hashing_service.hash(password)
+    BCRYPT_DURATION.observe(time.perf_counter() - inicio, "hash_async")
+    return resultado
 
 def criar_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -59,9 +151,14 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    token = credentials.credentials
+    cached = token_cache.get(token)
+    if cached is not None:
+        return dict(cached)
+    
     try:
         payload = jwt.decode(
-            credentials.credentials, 
+            token, 
             settings.JWT_SECRET, 
             algorithms=[settings.JWT_ALGORITHM]
         )
@@ -75,7 +172,7 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         if email is None or user_id is None:
             raise credentials_exception
         
-        return {
+        claims = {
             "email": email, 
             "user_id": user_id, 
             "role": role,
@@ -83,9 +180,28 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             "name": name
         }
         
+        # Tokens sem 'exp' não são cacheados
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            token_cache.set(token, claims, float(exp))
+        
+        return dict(claims)
+        
     except JWTError:
         raise credentials_exception
 
+def usuario_do_header(authorization: Optional[str]) -> Optional[dict]:
+    """
+    Claims do Bearer token, ou None se ausente/inválido (sem levantar 401)
+    """
+    esquema, _, token = (authorization or "").partition(" ")
+    if esquema.lower() != "bearer" or not token:
+        return None
+    try:
+        return get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token.strip()))
+    except HTTPException:
+        return None
+
 def get_current_admin(current_user: dict = Depends(get_current_user)) -> dict:
     """
     Verifica se o usuário atual é admin
@@ -0,0 +1,59 @@
+"""
+Servidor local que imita o serviço de IA (AI_SERVICE_URL) para testes e
+desenvolvimento, com latência e taxa de falhas configuráveis.
+
+    cd App
+    python -m dev.ai_service_stub --port 5001 --latencia-ms 50 --falhas 0.2
+
+Qualquer POST devolve {"path", "payload", "atendido_em"}. Ajustes em tempo
+de execução: POST /__stub/config {"latencia_ms": 500, "falhas": 1.0}.
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+config: Dict[str, Any] = {"latencia_ms": 0.0, "falhas": 0.0, "status_falha": 503}
+contadores = {"requisicoes": 0, "falhas": 0}
+
+app = FastAPI(title="UPath AI Service (stub)")
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", "config": config, **contadores}
+
+@app.post("/__stub/config")
+async def configurar(request: Request):
+    config.update(await request.json())
+    return config
+
+@app.post("/{path:path}")
+async def atender(path: str, request: Request):
+    contadores["requisicoes"] += 1
+    payload = await request.json()
+    if config["latencia_ms"]:
+        await asyncio.sleep(config["latencia_ms"] / 1000)
+    if random.random() < config["falhas"]:
+        contadores["falhas"] += 1
+        return JSONResponse({"detail": "falha simulada"}, status_code=config["status_falha"])
+    return {"path": f"/{path}", "payload": payload, "atendido_em": time.time()}
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Stub local do serviço de IA")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--falhas", type=float, default=0.0, help="Fração de requisições que falham (0 a 1)")
+    args = parser.parse_args()
+
+    config.update(latencia_ms=args.latencia_ms, falhas=args.falhas)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
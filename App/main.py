@@ -1,10 +1,30 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
 from sqlalchemy import text
 from core.config import settings
-from core.database import engine, Base, SessionLocal
+from core.database import get_engine, dispose_engines, verificar_banco
+from core.hashing import hashing_service, HashingBusyError
+from core.security import token_cache
+from core.background import PeriodicTask
+from core.query_counter import track_queries, registrar_requisicao
+from core.metrics import REGISTRY, HTTP_REQUEST_DURATION, HTTP_REQUESTS
+from core.ai_client import ai_client
+from core.http_cache import NaoModificado
+from core.replica import rastrear_escritas, fixar_primario, replica_monitor
+from services.cleanup_service import executar_limpeza, ultima_limpeza
+from services.email_service import email_outbox_task, smtp_connection
+from services.acesso_service import acessos_task, buffer_acessos
+from services.stats_service import estatisticas_snapshot
+from services.perfil_service import perfil_cache
+from services.noticia_service import feed_noticias
+from services.recomendacao_service import recomendacao_service, ModeloIndisponivelError
+from services.simulacao_service import simulacao_service, NotasCorteIndisponiveisError
+from services.import_service import import_jobs
 import time
+import anyio
 import logging
 
 # Configurar logging
@@ -15,51 +35,62 @@ logger = logging.getLogger(__name__)
 from routes.auth_route import router as auth_router
 from routes.admin_route import router as admin_router
 from routes.perfil_route import router as perfil_router
+from routes.teste_route import router as teste_router
+from routes.simulacao_route import router as simulacao_router
+from routes.noticia_route import router as noticia_router
+
+# Janitor de tokens e sessões expirados
+cleanup_task = PeriodicTask("limpeza-tokens", settings.CLEANUP_INTERVAL_SECONDS, executar_limpeza)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup - código que roda quando a aplicação inicia
     logger.info("🚀 Iniciando UPath API...")
     
-    # Testar conexão com banco na inicialização
+    # Limite de threads para rotas/dependências síncronas (definido por serve.py)
+    if settings.THREADPOOL_TOKENS:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_TOKENS
+    
+    # Probe de prontidão único e opcional (o engine é criado sob demanda)
+    if settings.DB_STARTUP_CHECK:
+        try:
+            info = await run_in_threadpool(verificar_banco, True)
+            logger.info(f"🎉 Banco de dados pronto: {info}")
+        except Exception as e:
+            logger.error(f"❌ ERRO NA CONEXÃO COM BANCO: {e}")
+            logger.error("⚠️ A aplicação continuará, mas funcionalidades de banco podem falhar")
+    
+    # Modelo vocacional e notas de corte carregados antes da primeira requisição (se existirem)
     try:
-        logger.info("🔍 Testando conexão com o banco de dados...")
-        
-        # Teste 1: Conexão básica
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT 1"))
-            logger.info("✅ Teste de conexão básica: OK")
-        
-        # Teste 2: Verificar se o banco existe
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT DATABASE()"))
-            current_db = result.scalar()
-            logger.info(f"📊 Banco atual: {current_db}")
-        
-        # Teste 3: Listar tabelas existentes
-        with engine.connect() as conn:
-            result = conn.execute(text("SHOW TABLES"))
-            tables_result = result.fetchall()
-            tables = [row[0] for row in tables_result] if tables_result else []
-            logger.info(f"📋 Tabelas existentes: {tables}")
-            
-        # Teste 4: Verificar versão do MySQL
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT VERSION()"))
-            version = result.scalar()
-            logger.info(f"🐬 Versão do MySQL: {version}")
-            
-        logger.info("🎉 Todas as verificações de banco passaram!")
-        
-    except Exception as e:
-        logger.error(f"❌ ERRO NA CONEXÃO COM BANCO: {e}")
-        logger.error("⚠️ A aplicação continuará, mas funcionalidades de banco podem falhar")
+        await run_in_threadpool(recomendacao_service.modelo.carregar)
+    except ModeloIndisponivelError as e:
+        logger.warning(f"⚠️ Recomendação vocacional indisponível: {e}")
+    try:
+        await run_in_threadpool(simulacao_service.indice.carregar)
+    except NotasCorteIndisponiveisError as e:
+        logger.warning(f"⚠️ Simulação ENEM indisponível: {e}")
+    
+    if settings.CLEANUP_ENABLED:
+        cleanup_task.start()
+    email_outbox_task.start()
+    acessos_task.start()
     
     yield  # A aplicação roda aqui
     
-    # Shutdown - código que roda quando a aplicação para
+    # Shutdown - roda depois que o servidor drena as requisições em andamento (SIGTERM)
     logger.info("🛑 Encerrando UPath API...")
-    engine.dispose()
+    await cleanup_task.stop()
+    # Importações em andamento terminam (ou são interrompidas) antes de fechar pools e engines
+    await import_jobs.encerrar()
+    # Recomendações já recebidas saem antes de o threadpool e os engines fecharem
+    await recomendacao_service.batcher.encerrar()
+    await email_outbox_task.stop()
+    # Eventos de acesso ainda no buffer gravados antes de fechar os engines
+    await acessos_task.stop()
+    smtp_connection.close()
+    await ai_client.aclose()
+    hashing_service.shutdown()
+    await dispose_engines()
 
 app = FastAPI(
     title="UPath API",
@@ -77,33 +108,90 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def medir_requisicoes(request: Request, call_next):
+    # Latência e status por rota (template do path, não o path concreto)
+    inicio = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        rota = getattr(route, "path", "desconhecida")
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - inicio, request.method, rota)
+        HTTP_REQUESTS.inc(request.method, rota, str(status_code))
+
+@app.middleware("http")
+async def contar_queries(request: Request, call_next):
+    # Statements e tempo de banco por requisição
+    if not settings.QUERY_COUNTER_ENABLED:
+        return await call_next(request)
+
+    with track_queries() as stats:
+        response = await call_next(request)
+
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["X-DB-Time-Ms"] = f"{stats.time_ms:.2f}"
+    registrar_requisicao(request.method, request.url.path, stats)
+    return response
+
+@app.middleware("http")
+async def leituras_apos_escrita(request: Request, call_next):
+    # Read-your-writes: quem escreveu lê do primário por alguns segundos
+    if not settings.DATABASE_READ_URL:
+        return await call_next(request)
+
+    with rastrear_escritas() as escritas:
+        response = await call_next(request)
+    if escritas.houve and response.status_code < 400:
+        await fixar_primario(request)
+    return response
+
+@app.exception_handler(HashingBusyError)
+async def hashing_busy_handler(request: Request, exc: HashingBusyError):
+    # Backpressure do pool de hashing
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Servidor ocupado, tente novamente em instantes"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(NaoModificado)
+async def nao_modificado_handler(request: Request, exc: NaoModificado):
+    # GET condicional: versão do recurso igual à do cliente
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": exc.cache_control})
+
 # Incluir rotas
 app.include_router(auth_router, prefix="/api", tags=["Autenticação"])
 app.include_router(admin_router, prefix="/api", tags=["Administração"])
 app.include_router(perfil_router, prefix="/api", tags=["Perfil"])
+app.include_router(teste_router, prefix="/api", tags=["Teste Vocacional"])
+app.include_router(simulacao_router, prefix="/api", tags=["Simulação ENEM"])
+app.include_router(noticia_router, prefix="/api", tags=["Notícias"])
 
 @app.get("/")
 async def root():
     return {"message": "UPath API - Sistema de Orientação Vocacional"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas no formato de exposição de texto do Prometheus"""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/health")
 async def health_check():
     """Endpoint de health check mais detalhado"""
     start_time = time.time()
     
     try:
-        # Testar conexão com banco
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT 1"))
-            db_status = "healthy"
-            
-            # Verificar informações do banco
-            db_info = conn.execute(text("SELECT DATABASE(), USER(), VERSION()"))
-            db_data = db_info.fetchone()
-            
+        # Testar conexão com banco (fora do event loop)
+        db_info = await run_in_threadpool(verificar_banco, True)
+        db_status = db_info["status"]
     except Exception as e:
         db_status = f"unhealthy - {str(e)}"
-        db_data = None
+        db_info = {}
     
     response_time = round((time.time() - start_time) * 1000, 2)
     
@@ -114,10 +202,20 @@ async def health_check():
         "response_time_ms": response_time,
         "database": {
             "status": db_status,
-            "name": db_data[0] if db_data else "unknown",
-            "user": db_data[1] if db_data else "unknown",
-            "version": db_data[2] if db_data else "unknown"
-        }
+            "name": db_info.get("name", "unknown"),
+            "user": db_info.get("user", "unknown"),
+            "version": db_info.get("version", "unknown")
+        },
+        "replica_leitura": replica_monitor.stats(),
+        "hashing": hashing_service.stats(),
+        "jwt_cache": token_cache.stats(),
+        "cache_perfil": perfil_cache.stats(),
+        "feed_noticias": feed_noticias.stats(),
+        "recomendacao": recomendacao_service.info()["batching"],
+        "servico_ia": ai_client.stats(),
+        "eventos_acesso": buffer_acessos.stats(),
+        "estatisticas_admin": estatisticas_snapshot.stats(),
+        "limpeza_tokens": ultima_limpeza or None
     }
 
 @app.get("/api/status")
@@ -126,7 +224,7 @@ async def api_status():
     try:
         # Testar cada módulo do banco
         db_test = {}
-        with engine.connect() as conn:
+        with get_engine().connect() as conn:
             # Testar acesso a tabelas básicas
             try:
                 conn.execute(text("SELECT 1 FROM users LIMIT 1"))
@@ -153,7 +251,7 @@ async def api_status():
 async def debug_database():
     """Endpoint para debug completo do banco"""
     try:
-        with engine.connect() as conn:
+        with get_engine().connect() as conn:
             # Informações da conexão
             conn_info = conn.execute(text("SELECT DATABASE(), USER(), CONNECTION_ID()"))
             conn_data = conn_info.fetchone()
@@ -188,7 +286,7 @@ async def debug_database():
 async def test_connection():
     """Endpoint simples para testar conexão com banco"""
     try:
-        with engine.connect() as conn:
+        with get_engine().connect() as conn:
             # Teste rápido
             result = conn.execute(text("SELECT 1 as status, NOW() as timestamp"))
             test_data = result.fetchone()
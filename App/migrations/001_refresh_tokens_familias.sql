@@ -0,0 +1,12 @@
+-- Famílias de rotação de refresh tokens (/api/auth/refresh)
+-- Bancos criados antes desta versão: create_all não altera tabelas existentes.
+-- MySQL 8.0. Rodar uma vez, antes de subir a nova versão da API.
+
+ALTER TABLE refresh_tokens
+    ADD COLUMN family_id VARCHAR(32) NULL AFTER token,
+    ADD COLUMN used_at DATETIME NULL,
+    ADD COLUMN replaced_by VARCHAR(255) NULL;
+
+CREATE INDEX ix_refresh_tokens_user_id ON refresh_tokens (user_id);
+CREATE INDEX ix_refresh_tokens_family_id ON refresh_tokens (family_id);
+CREATE INDEX ix_refresh_tokens_expires_at ON refresh_tokens (expires_at);
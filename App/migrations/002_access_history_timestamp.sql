@@ -0,0 +1,14 @@
+-- Paginação keyset do histórico de acessos ordena por (timestamp, id):
+-- linhas com timestamp NULL sumiam das páginas ou quebravam o cursor.
+-- MySQL 8.0. Rodar uma vez, antes de subir a nova versão da API.
+
+-- Linhas sem horário (se houver) entram como as mais antigas do histórico
+SET @mais_antigo = (SELECT MIN(timestamp) FROM access_history);
+UPDATE access_history
+SET timestamp = COALESCE(@mais_antigo, UTC_TIMESTAMP())
+WHERE timestamp IS NULL;
+
+ALTER TABLE access_history MODIFY timestamp DATETIME NOT NULL;
+
+-- Índice da paginação keyset (sem ele, ORDER BY timestamp, id faz filesort na tabela inteira)
+CREATE INDEX ix_access_history_timestamp_id ON access_history (timestamp, id);
@@ -0,0 +1,7 @@
+-- Versão da linha (ETag de /api/perfil/me e /api/admin/users/{id})
+-- Bancos criados antes desta versão: create_all não altera tabelas existentes,
+-- e sem a coluna todo SELECT de Usuario/User falha (login, /me, painel admin).
+-- MySQL 8.0. Rodar uma vez, antes de subir a nova versão da API.
+
+ALTER TABLE usuarios ADD COLUMN versao INT NOT NULL DEFAULT 1;
+ALTER TABLE users ADD COLUMN versao INT NOT NULL DEFAULT 1;
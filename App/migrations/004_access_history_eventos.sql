@@ -0,0 +1,18 @@
+-- Eventos de acesso de estudantes (login/refresh) gravados em lote no access_history.
+-- Sem estas colunas todo INSERT do buffer de acessos falha e os eventos são
+-- descartados; histórico do painel e exportação também quebram.
+-- MySQL 8.0. Rodar uma vez, antes de subir a nova versão da API.
+
+-- Acesso de usuário do painel (users) ou de estudante (usuarios): um dos dois
+ALTER TABLE access_history MODIFY user_id INT NULL;
+
+ALTER TABLE access_history
+    ADD COLUMN id_usuario INT NULL AFTER user_id,
+    ADD COLUMN evento VARCHAR(20) NOT NULL DEFAULT 'login' AFTER id_usuario,
+    ADD COLUMN ip VARCHAR(45) NULL AFTER evento;
+
+CREATE INDEX ix_access_history_id_usuario ON access_history (id_usuario);
+
+ALTER TABLE access_history
+    ADD CONSTRAINT fk_access_history_id_usuario
+    FOREIGN KEY (id_usuario) REFERENCES usuarios (id_usuario);
@@ -0,0 +1,75 @@
+"""
+Treina o modelo vocacional usado por services/recomendacao_service.py.
+
+    cd App
+    python ml/treinar_modelo.py --csv respostas.csv      # colunas q1..qN + curso
+    python ml/treinar_modelo.py --sintetico              # dados gerados (desenvolvimento)
+
+O artefato é gravado sem compressão (compress=0) para que o serviço possa
+carregá-lo com mmap_mode="r" e os workers compartilhem as páginas do modelo.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CURSOS_SINTETICOS = [
+    "Engenharia de Software", "Medicina", "Direito", "Administração", "Psicologia",
+    "Arquitetura", "Design", "Enfermagem", "Pedagogia", "Ciências Contábeis",
+]
+
+def dados_sinteticos(n_respostas: int, amostras: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    # Cada curso tem um perfil médio de respostas; amostras são ruído em torno dele
+    perfis = rng.uniform(1, 5, size=(len(CURSOS_SINTETICOS), n_respostas))
+    y = rng.integers(0, len(CURSOS_SINTETICOS), size=amostras)
+    X = np.clip(np.rint(perfis[y] + rng.normal(0, 0.8, size=(amostras, n_respostas))), 1, 5)
+    return X.astype(np.float32), np.array(CURSOS_SINTETICOS)[y]
+
+def dados_csv(caminho: str):
+    import pandas as pd
+
+    df = pd.read_csv(caminho)
+    colunas = [c for c in df.columns if c != "curso"]
+    return df[colunas].to_numpy(dtype=np.float32), df["curso"].astype(str).to_numpy()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Treina o modelo do teste vocacional")
+    origem = parser.add_mutually_exclusive_group(required=True)
+    origem.add_argument("--csv", help="CSV com as respostas (q1..qN) e a coluna curso")
+    origem.add_argument("--sintetico", action="store_true", help="Gera dados sintéticos")
+    parser.add_argument("--perguntas", type=int, default=30, help="Número de perguntas (modo sintético)")
+    parser.add_argument("--amostras", type=int, default=5000)
+    parser.add_argument("--saida", help="Destino do artefato (padrão: RECOMENDACAO_MODELO_PATH)")
+    args = parser.parse_args(argv)
+
+    from sklearn.linear_model import LogisticRegression
+    from core.config import settings
+
+    if args.csv:
+        X, y = dados_csv(args.csv)
+    else:
+        X, y = dados_sinteticos(args.perguntas, args.amostras)
+
+    modelo = LogisticRegression(max_iter=1000)
+    modelo.fit(X, y)
+
+    saida = args.saida or settings.RECOMENDACAO_MODELO_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    artefato = {
+        "modelo": modelo,
+        "cursos": [str(c) for c in modelo.classes_],
+        "n_respostas": X.shape[1],
+        "versao": datetime.utcnow().strftime("%Y%m%d%H%M%S"),
+    }
+    joblib.dump(artefato, saida, compress=0)
+    print(f"✅ Modelo {artefato['versao']} gravado em {saida} ({len(artefato['cursos'])} cursos, {X.shape[1]} perguntas)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, Index, literal_column
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from core.database import Base
@@ -20,12 +20,43 @@ class User(Base):
     name = Column(String(100), nullable=False)
     email = Column(String(100), unique=True, nullable=False)
     active = Column(Boolean, default=True)
+    # Versão da linha: incrementada pelo próprio UPDATE, base do ETag
+    versao = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("versao") + 1)
 
 class AccessHistory(Base):
     __tablename__ = "access_history"
+    __table_args__ = (
+        # Paginação keyset: ORDER BY timestamp DESC, id DESC
+        Index("ix_access_history_timestamp_id", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    # Acesso de usuário do painel (users) ou de estudante (usuarios): um dos dois
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    id_usuario = Column(Integer, ForeignKey("usuarios.id_usuario"), nullable=True, index=True)
+    evento = Column(String(20), nullable=False, default="login", server_default="login")
+    ip = Column(String(45), nullable=True)
+    # NOT NULL: chave da paginação keyset (timestamp, id)
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
 
-    user = relationship("User", backref="access_logs")
\ No newline at end of file
+    user = relationship("User", backref="access_logs")
+
+# Agregados do access_history, incrementados na mesma transação de cada lote gravado
+class AccessRollupHour(Base):
+    __tablename__ = "access_rollup_hourly"
+
+    # Início da hora (UTC)
+    bucket = Column(DateTime, primary_key=True)
+    evento = Column(String(20), primary_key=True)
+    # Mês de cadastro do estudante ("2025-03"); "" quando não há estudante
+    coorte = Column(String(7), primary_key=True, default="")
+    total = Column(Integer, nullable=False, default=0)
+
+class AccessRollupDay(Base):
+    __tablename__ = "access_rollup_daily"
+
+    # Dia (UTC)
+    bucket = Column(Date, primary_key=True)
+    evento = Column(String(20), primary_key=True)
+    coorte = Column(String(7), primary_key=True, default="")
+    total = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Index, literal_column
 from sqlalchemy.orm import relationship
 import datetime
 from core.database import Base
@@ -14,6 +14,8 @@ class Usuario(Base):
     data_cadastro = Column(DateTime, default=datetime.datetime.utcnow)
     status_conta = Column(String(20), default='ativo')
     ultimo_login = Column(DateTime, nullable=True)
+    # Versão da linha: incrementada pelo próprio UPDATE (ORM ou Core), base do ETag
+    versao = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("versao") + 1)
     
     # Relacionamentos
     perfil = relationship("Perfil", back_populates="usuario", uselist=False)
@@ -59,12 +61,21 @@ class TokenRecuperacao(Base):
 # Modelos para TokenService - APENAS AQUI
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        Index("ix_refresh_tokens_user_id", "user_id"),
+        Index("ix_refresh_tokens_family_id", "family_id"),
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey('usuarios.id_usuario'))
     token = Column(String(255), unique=True, nullable=False)
+    # Família de rotação: todos os tokens derivados do mesmo login
+    family_id = Column(String(32), nullable=True)
     expires_at = Column(DateTime, nullable=False)
     is_revoked = Column(Boolean, default=False)
+    used_at = Column(DateTime, nullable=True)
+    replaced_by = Column(String(255), nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
 class PasswordResetToken(Base):
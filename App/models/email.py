@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+import datetime
+from core.database import Base
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # Fila do worker: pendentes prontos para (re)envio
+        Index("ix_email_outbox_status_proxima", "status", "proxima_tentativa_em"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    destinatario = Column(String(100), nullable=False)
+    assunto = Column(String(255), nullable=False)
+    corpo = Column(Text, nullable=False)
+    # pendente | enviando (reservada por um worker) | enviado | morto
+    status = Column(String(20), nullable=False, default='pendente')
+    tentativas = Column(Integer, nullable=False, default=0)
+    proxima_tentativa_em = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    ultimo_erro = Column(String(500), nullable=True)
+    criado_em = Column(DateTime, default=datetime.datetime.utcnow)
+    enviado_em = Column(DateTime, nullable=True)
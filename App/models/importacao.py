@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+import datetime
+from core.database import Base
+
+class ImportacaoJob(Base):
+    __tablename__ = "importacao_jobs"
+
+    # Estado das importações em massa, visível a todos os workers
+    id = Column(String(16), primary_key=True)
+    formato = Column(String(10), nullable=False)
+    criado_por = Column(String(50), nullable=True)
+    # pendente | processando | concluido | falhou
+    status = Column(String(20), nullable=False, default='pendente')
+    linhas_lidas = Column(Integer, nullable=False, default=0)
+    importados = Column(Integer, nullable=False, default=0)
+    rejeitados = Column(Integer, nullable=False, default=0)
+    # Relatório de erros por linha (JSON, limitado a IMPORT_MAX_ERRORS_REPORTED)
+    erros = Column(Text, nullable=True)
+    mensagem = Column(String(500), nullable=True)
+    criado_em = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    finalizado_em = Column(DateTime, nullable=True)
+    atualizado_em = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
+import datetime
+from core.database import Base
+
+class Noticia(Base):
+    __tablename__ = "noticias"
+    __table_args__ = (
+        # Feed: publicadas, mais recentes primeiro (keyset em publicada_em, id)
+        Index("ix_noticias_publicada_em_id", "publicada", "publicada_em", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    titulo = Column(String(200), nullable=False)
+    descricao = Column(String(500), nullable=False)
+    imagem = Column(String(500), nullable=True)
+    link = Column(String(500), nullable=True)
+    publicada = Column(Boolean, nullable=False, default=True)
+    publicada_em = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    # Alterações (inclusive despublicar) mudam atualizada_em e invalidam o feed
+    atualizada_em = Column(DateTime, nullable=False, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    criado_por = Column(String(50), nullable=True)
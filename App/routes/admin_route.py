@@ -1,40 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db
+from core.replica import get_async_read_db
 from core.security import get_current_user, criar_token, get_current_admin
-from schemas.admin_schemas import LoginRequest, LoginResponse, PinValidationRequest, PinValidationResponse
-from services.admin_service import AdminService
-from services.token_service import AdminAuthService
-from services.email_service import EmailService
-from datetime import timedelta
+from core.http_cache import get_condicional, etag_versao, PRIVADO_CURTO
+from core.rate_limit import login_rate_limiter
+from schemas.admin_schemas import (
+    LoginRequest, LoginResponse, PinValidationRequest, PinValidationResponse, NoticiaCreate, NoticiaUpdate
+)
+from services.admin_service import AsyncAdminService
+from services.token_service import AsyncAdminAuthService
+from services.email_service import EmailService, email_outbox_task
+from services.cleanup_service import executar_limpeza
+from services.acesso_service import buffer_acessos
+from services.agregados_service import AnaliseAcessosService
+from services.noticia_service import NoticiaService
+from services.export_service import ExportService, FORMATOS as FORMATOS_EXPORTACAO
+from services.import_service import (
+    import_jobs, detectar_formato, salvar_upload, ImportacaoInvalidaError
+)
+from datetime import datetime, timedelta
+from typing import Optional
 
 router = APIRouter(prefix="/api/admin", tags=["Administração"])
 
 # Rota para login admin e envio do PIN 2FA
 @router.post("/login", response_model=LoginResponse)
-async def admin_login(credentials: LoginRequest, db: Session = Depends(get_db)):
-    admin_service = AdminService(db)
+async def admin_login(credentials: LoginRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Throttling antes de qualquer consulta ou bcrypt
+    await login_rate_limiter.verificar(request, "admin-login", credentials.username)
+    
+    admin_service = AsyncAdminService(db)
     email_service = EmailService()
-    admin_auth_service = AdminAuthService(db)
+    admin_auth_service = AsyncAdminAuthService(db)
 
     # Buscar admin no banco
-    admin = admin_service.obter_admin_por_username(credentials.username)
+    admin = await admin_service.obter_admin_por_username(credentials.username)
     if not admin:
         raise HTTPException(status_code=401, detail="Usuário não encontrado")
 
-    # Verificar senha
-    if not admin_service.validar_login(credentials.username, credentials.password):
+    # Verificar senha (admin já carregado, sem segunda consulta)
+    if not await admin_service.verificar_senha(admin, credentials.password):
         raise HTTPException(status_code=401, detail="Senha inválida")
 
-    # Criar sessão 2FA
-    session = admin_auth_service.create_admin_session(admin.email) # type: ignore
-    
-    # Enviar PIN por email
-    email_enviado = email_service.send_admin_pin_email(admin.email, session.pin_code) # type: ignore
+    # Criar sessão 2FA e enfileirar o PIN na mesma transação
+    session = await admin_auth_service.create_admin_session(admin.email, commit=False) # type: ignore
+    email_service.enqueue_admin_pin_email(db, admin.email, session.pin_code) # type: ignore
+    await db.commit()
     
-    if not email_enviado:
-        # Não falhar se o email não for enviado, apenas logar
-        print(f"⚠️ Email não enviado, mas PIN gerado: {session.pin_code}")
+    # Envio pelo worker da outbox, fora da requisição
+    email_outbox_task.trigger()
 
     return {
         "success": True,
@@ -44,12 +61,12 @@ async def admin_login(credentials: LoginRequest, db: Session = Depends(get_db)):
 
 # Rota para verificar o PIN 2FA e obter token JWT
 @router.post("/verify-2fa", response_model=PinValidationResponse)
-async def admin_verify_2fa(verification_data: PinValidationRequest, db: Session = Depends(get_db)):
-    admin_auth_service = AdminAuthService(db)
-    admin_service = AdminService(db)
+async def admin_verify_2fa(verification_data: PinValidationRequest, db: AsyncSession = Depends(get_async_db)):
+    admin_auth_service = AsyncAdminAuthService(db)
+    admin_service = AsyncAdminService(db)
     
     # Verificar sessão e PIN
-    session = admin_auth_service.verify_admin_session(
+    session = await admin_auth_service.verify_admin_session(
         verification_data.session_id, 
         verification_data.pin
     )
@@ -58,12 +75,12 @@ async def admin_verify_2fa(verification_data: PinValidationRequest, db: Session
         raise HTTPException(status_code=401, detail="Sessão inválida ou PIN incorreto")
     
     # Buscar admin pelo email da sessão
-    admin = admin_service.obter_admin_por_email(session.admin_email) # type: ignore
+    admin = await admin_service.obter_admin_por_email(session.admin_email) # type: ignore
     if not admin:
         raise HTTPException(status_code=401, detail="Administrador não encontrado")
     
     # Marcar sessão como usada
-    admin_auth_service.mark_admin_session_used(session.session_id) # type: ignore
+    await admin_auth_service.mark_admin_session_used(session.session_id, session) # type: ignore
     
     # Gerar JWT admin
     access_token = criar_token(
@@ -101,20 +118,27 @@ async def admin_home(current_admin: dict = Depends(get_current_admin)):
 # Rota para obter estatísticas do sistema
 @router.get("/stats")
 async def admin_stats(
-    db: Session = Depends(get_db),
+    response: Response,
+    ativos_page: int = 1,
+    ativos_page_size: int = 20,
+    db: AsyncSession = Depends(get_async_read_db),
     current_admin: dict = Depends(get_current_admin)
 ):
-    admin_service = AdminService(db)
+    # Contadores vêm de um snapshot com TTL: o navegador pode reaproveitar por alguns segundos
+    response.headers["Cache-Control"] = PRIVADO_CURTO
+    admin_service = AsyncAdminService(db)
     
-    estatisticas = admin_service.obter_estatisticas_sistema()
-    usuarios_ativos = admin_service.consultar_usuarios_ativos()
-    historico_recente = admin_service.consultar_historico_acessos(page=1, page_size=5)
+    estatisticas = await admin_service.obter_estatisticas_sistema()
+    usuarios_ativos = await admin_service.consultar_usuarios_ativos(page=ativos_page, page_size=ativos_page_size)
+    historico_recente = await admin_service.consultar_historico_acessos(page=1, page_size=5, incluir_total=False)
     
     return {
         "success": True,
         "data": {
             "estatisticas": estatisticas,
-            "usuarios_ativos": usuarios_ativos,
+            # Mesmo formato de antes (lista); os dados da página ficam em uma chave à parte
+            "usuarios_ativos": usuarios_ativos.pop("items"),
+            "usuarios_ativos_paginacao": usuarios_ativos,
             "acessos_recentes": historico_recente["items"]
         }
     }
@@ -124,33 +148,209 @@ async def admin_stats(
 async def listar_usuarios(
     page: int = 1,
     page_size: int = 20,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    incluir_total: bool = True,
+    db: AsyncSession = Depends(get_async_read_db),
     current_admin: dict = Depends(get_current_admin)
 ):
-    admin_service = AdminService(db)
+    admin_service = AsyncAdminService(db)
     
-    # Usar a mesma função de histórico mas adaptar para usuários se necessário
-    historico = admin_service.consultar_historico_acessos(page=page, page_size=page_size)
+    # Usar a mesma função de histórico mas adaptar para usuários se necessário.
+    # Com `cursor` (next_cursor da página anterior) a paginação é keyset.
+    try:
+        historico = await admin_service.consultar_historico_acessos(
+            page=page, page_size=page_size, cursor=cursor, incluir_total=incluir_total
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
     
     return {
         "success": True,
         "data": historico
     }
 
-# Rota para obter detalhes de um usuário específico
-@router.get("/users/{user_id}")
+async def etag_usuario(
+    user_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_admin: dict = Depends(get_current_admin)
+):
+    versao = await AsyncAdminService(db).versao_usuario(user_id)
+    return etag_versao("user", user_id, versao) if versao is not None else None
+
+# Rota para obter detalhes de um usuário específico (GET condicional pela versão da linha)
+@router.get("/users/{user_id}", dependencies=[Depends(get_condicional(etag_usuario))])
 async def obter_usuario(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     current_admin: dict = Depends(get_current_admin)
 ):
-    admin_service = AdminService(db)
+    admin_service = AsyncAdminService(db)
     
-    usuario = admin_service.consultar_usuario_por_id(user_id)
+    usuario = await admin_service.consultar_usuario_por_id(user_id)
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     
     return {
         "success": True,
         "data": usuario
-    }
\ No newline at end of file
+    }
+
+# Rota para disparar a limpeza de tokens/sessões expirados sob demanda
+@router.post("/maintenance/cleanup")
+async def limpar_tokens_expirados(current_admin: dict = Depends(get_current_admin)):
+    resultado = await run_in_threadpool(executar_limpeza)
+    
+    return {
+        "success": True,
+        "data": resultado
+    }
+
+# Recalcula os agregados de acesso a partir do access_history (após migração/carga de dados)
+@router.post("/maintenance/rollups")
+async def reconstruir_agregados_acesso(current_admin: dict = Depends(get_current_admin)):
+    resultado = await run_in_threadpool(buffer_acessos.reconstruir_agregados)
+    
+    return {
+        "success": True,
+        "data": resultado
+    }
+
+# Série temporal de acessos (por hora ou dia, UTC), lida só dos agregados
+@router.get("/analytics/acessos")
+async def serie_acessos(
+    response: Response,
+    granularidade: str = "dia",
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    evento: Optional[str] = None,
+    coorte: Optional[str] = None,
+    por_coorte: bool = False,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_admin: dict = Depends(get_current_admin)
+):
+    response.headers["Cache-Control"] = PRIVADO_CURTO
+    try:
+        serie = await AnaliseAcessosService(db).serie(granularidade, desde, ate, evento, coorte, por_coorte)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "success": True,
+        "data": serie
+    }
+
+# Importação em massa de estudantes (corpo da requisição em CSV ou JSONL).
+# CSV com cabeçalho nome,email,senha; JSONL com um objeto por linha.
+@router.post("/students/import", status_code=202)
+async def importar_estudantes(
+    request: Request,
+    formato: Optional[str] = None,
+    current_admin: dict = Depends(get_current_admin)
+):
+    try:
+        formato = detectar_formato(formato, request.headers.get("content-type"))
+        caminho = await salvar_upload(request.stream())
+    except ImportacaoInvalidaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = await import_jobs.criar(formato, current_admin.get("username"))
+    import_jobs.iniciar(job, caminho)
+    
+    return {
+        "success": True,
+        "data": job.to_dict()
+    }
+
+# Progresso e relatório de erros por linha da importação
+@router.get("/students/import/{job_id}")
+async def progresso_importacao(job_id: str, current_admin: dict = Depends(get_current_admin)):
+    job = await import_jobs.obter(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Importação não encontrada")
+    
+    return {
+        "success": True,
+        "data": job.to_dict()
+    }
+
+def _resposta_exportacao(gerador, nome: str, formato: str) -> StreamingResponse:
+    extensao = "csv" if formato == "csv" else "ndjson"
+    return StreamingResponse(
+        gerador,
+        media_type=FORMATOS_EXPORTACAO[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome}.{extensao}"'}
+    )
+
+def _validar_formato_exportacao(formato: str) -> str:
+    formato = formato.lower()
+    if formato not in FORMATOS_EXPORTACAO:
+        raise HTTPException(status_code=400, detail="Formato inválido. Use ndjson ou csv")
+    return formato
+
+# Exportação em streaming de usuários (NDJSON ou CSV), filtrada por data de cadastro
+@router.get("/export/usuarios")
+async def exportar_usuarios(
+    formato: str = "ndjson",
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    current_admin: dict = Depends(get_current_admin)
+):
+    formato = _validar_formato_exportacao(formato)
+    return _resposta_exportacao(ExportService().exportar_usuarios(formato, desde, ate), "usuarios", formato)
+
+# Exportação em streaming do histórico de acessos, filtrada por timestamp
+@router.get("/export/access-history")
+async def exportar_historico_acessos(
+    formato: str = "ndjson",
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    current_admin: dict = Depends(get_current_admin)
+):
+    formato = _validar_formato_exportacao(formato)
+    return _resposta_exportacao(
+        ExportService().exportar_historico_acessos(formato, desde, ate), "access_history", formato
+    )
+
+# Notícias exibidas no feed e na home dos estudantes
+@router.post("/noticias", status_code=201)
+async def criar_noticia(
+    dados: NoticiaCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin: dict = Depends(get_current_admin)
+):
+    noticia = await NoticiaService(db).criar(dados.model_dump(exclude_none=True), current_admin.get("username"))
+    
+    return {
+        "success": True,
+        "data": noticia
+    }
+
+@router.put("/noticias/{noticia_id}")
+async def atualizar_noticia(
+    noticia_id: int,
+    dados: NoticiaUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin: dict = Depends(get_current_admin)
+):
+    noticia = await NoticiaService(db).atualizar(noticia_id, dados.model_dump(exclude_none=True))
+    if not noticia:
+        raise HTTPException(status_code=404, detail="Notícia não encontrada")
+    
+    return {
+        "success": True,
+        "data": noticia
+    }
+
+@router.delete("/noticias/{noticia_id}")
+async def remover_noticia(
+    noticia_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin: dict = Depends(get_current_admin)
+):
+    if not await NoticiaService(db).remover(noticia_id):
+        raise HTTPException(status_code=404, detail="Notícia não encontrada")
+    
+    return {
+        "success": True,
+        "data": {"mensagem": "Notícia removida"}
+    }
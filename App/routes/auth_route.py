@@ -1,20 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from core.database import get_db
 from schemas.auth_schemas import UserLogin, UserCreate, PasswordResetRequest, PasswordReset
+from schemas.token_schemas import RefreshTokenValidate
 from services.auth_service import AuthService
 from services.token_service import TokenService
 from services.email_service import EmailService
+from services.acesso_service import buffer_acessos
 from core.security import criar_token, get_current_user
+from core.rate_limit import login_rate_limiter
+from core.replica import marcar_autor
 from models.auth import Usuario
 
 router = APIRouter(prefix="/api/auth", tags=["Autenticação"])
 
+def _gerar_access_token(usuario: Usuario) -> str:
+    return criar_token({
+        "sub": usuario.email,
+        "id": usuario.id_usuario,
+        "user_id": usuario.id_usuario
+    })
+
 # Rota para registrar novo usuário
 @router.post("/register")
-def registrar_usuario(dados: UserCreate, db: Session = Depends(get_db)):
+async def registrar_usuario(dados: UserCreate, request: Request, db: Session = Depends(get_db)):
     service = AuthService(db)
-    resultado = service.registrar_usuario(
+    resultado = await service.registrar_usuario(
         nome=dados.nome,
         email=dados.email,
         confirm_email=dados.email,  # Corrigido - usando o mesmo email
@@ -28,6 +40,9 @@ def registrar_usuario(dados: UserCreate, db: Session = Depends(get_db)):
         else:
             raise HTTPException(status_code=400, detail=resultado["mensagem"])
     
+    # Sem token ainda: o novo usuário lê do primário logo após o cadastro
+    marcar_autor(request, resultado["id_usuario"])
+    
     return {
         "success": True,
         "data": {
@@ -39,18 +54,25 @@ def registrar_usuario(dados: UserCreate, db: Session = Depends(get_db)):
     }
 
 @router.post("/login")
-def login_usuario(dados: UserLogin, db: Session = Depends(get_db)):
+async def login_usuario(dados: UserLogin, request: Request, db: Session = Depends(get_db)):
+    # Throttling antes de qualquer consulta ou bcrypt
+    await login_rate_limiter.verificar(request, "login", dados.email)
+    
     service = AuthService(db)
-    usuario = service.autenticar_usuario(dados.email, dados.senha)
+    usuario = await service.autenticar_usuario(dados.email, dados.senha)
     if not usuario:
         raise HTTPException(status_code=401, detail="Credenciais incorretas.")
     
     # Gerar token JWT
-    token = criar_token({"sub": usuario.email, "id": usuario.id_usuario})
+    token = _gerar_access_token(usuario)
     
     # Gerar refresh token
     token_service = TokenService(db)
-    refresh_token = token_service.create_refresh_token(usuario.id_usuario)
+    refresh_token = await run_in_threadpool(token_service.create_refresh_token, usuario.id_usuario)
+    
+    # Só enfileira: a gravação sai em lote fora da requisição
+    buffer_acessos.registrar("login", usuario.id_usuario, login_rate_limiter.client_ip(request))
+    marcar_autor(request, usuario.id_usuario)
     
     return {
         "success": True,
@@ -85,9 +107,9 @@ def recuperar_senha(dados: PasswordResetRequest, db: Session = Depends(get_db)):
     }
 
 @router.post("/reset-password")
-def redefinir_senha(dados: PasswordReset, db: Session = Depends(get_db)):
+async def redefinir_senha(dados: PasswordReset, db: Session = Depends(get_db)):
     service = AuthService(db)
-    resultado = service.redefinir_senha(dados.token, dados.nova_senha)
+    resultado = await service.redefinir_senha(dados.token, dados.nova_senha)
     
     if not resultado["success"]:
         raise HTTPException(status_code=400, detail=resultado["mensagem"])
@@ -97,4 +119,31 @@ def redefinir_senha(dados: PasswordReset, db: Session = Depends(get_db)):
         "data": {
             "mensagem": resultado["mensagem"]
         }
-    }
\ No newline at end of file
+    }
+
+@router.post("/refresh")
+def renovar_token(dados: RefreshTokenValidate, request: Request, db: Session = Depends(get_db)):
+    """
+    Troca o refresh token por um novo par de tokens (rotação), sem bcrypt
+    """
+    token_service = TokenService(db)
+    novo_refresh = token_service.rotate_refresh_token(dados.token)
+    if not novo_refresh:
+        raise HTTPException(status_code=401, detail="Refresh token inválido ou expirado")
+    
+    usuario = db.get(Usuario, novo_refresh.user_id)
+    if not usuario or usuario.status_conta != 'ativo':
+        token_service.store.revoke_family(novo_refresh.family_id)
+        raise HTTPException(status_code=401, detail="Usuário inativo ou inexistente")
+    
+    buffer_acessos.registrar("refresh", usuario.id_usuario, login_rate_limiter.client_ip(request))
+    marcar_autor(request, usuario.id_usuario)
+    
+    return {
+        "success": True,
+        "data": {
+            "access_token": _gerar_access_token(usuario),
+            "refresh_token": novo_refresh.token,
+            "token_type": "bearer"
+        }
+    }
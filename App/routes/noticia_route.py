@@ -0,0 +1,30 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from core.replica import get_async_read_db
+from core.security import get_current_user
+from services.noticia_service import feed_noticias
+
+router = APIRouter(prefix="/api/noticias", tags=["Notícias"])
+
+@router.get("")
+async def listar_noticias(
+    cursor: Optional[str] = None,
+    limite: int = Query(settings.NOTICIAS_PAGE_SIZE, ge=1, le=50),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_read_db),
+    usuario_atual: dict = Depends(get_current_user)
+):
+    """Feed paginado por cursor, servido da memória; If-None-Match igual ao ETag responde 304"""
+    await feed_noticias.sincronizar_async(db)
+    try:
+        pagina = feed_noticias.pagina(cursor, limite)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    # Revalidação obrigatória: o cliente reaproveita a cópia enquanto o ETag não mudar
+    headers = {"ETag": pagina.etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and pagina.etag in [e.strip() for e in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=pagina.corpo, media_type="application/json", headers=headers)
@@ -1,21 +1,25 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from core.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_db, get_async_db
+from core.replica import get_async_read_db
 from core.security import get_current_user
+from core.http_cache import get_condicional, etag_versao
 from schemas.perfil_schemas import PasswordUpdate, UserProfileUpdate
-from services.perfil_service import UserService
+from services.perfil_service import AsyncUserService
 from services.auth_service import AuthService
 
 router = APIRouter(prefix="/api/perfil", tags=["Perfil"])
 
 @router.post("/change-password")
-def alterar_senha(
+async def alterar_senha(
     dados: PasswordUpdate, 
     db: Session = Depends(get_db), 
     usuario_atual: dict = Depends(get_current_user)
 ):
     service = AuthService(db)
-    resultado = service.alterar_senha(
+    resultado = await service.alterar_senha(
         id_usuario=usuario_atual["user_id"],
         senha_atual=dados.current_password,
         nova_senha=dados.new_password
@@ -31,13 +35,29 @@ def alterar_senha(
         }
     }
 
-@router.get("/me")
-def obter_perfil(
-    db: Session = Depends(get_db),
+async def versao_perfil(
+    db: AsyncSession = Depends(get_async_read_db),
     usuario_atual: dict = Depends(get_current_user)
+) -> Optional[int]:
+    # Sempre do banco (SELECT versao): o cache local de outro worker pode estar velho.
+    # Resolvida uma vez por requisição e compartilhada pelo ETag e pela rota.
+    return await AsyncUserService(db).versao_usuario(usuario_atual["user_id"])
+
+async def etag_perfil(
+    usuario_atual: dict = Depends(get_current_user),
+    versao: Optional[int] = Depends(versao_perfil)
+):
+    return etag_versao("usuario", usuario_atual["user_id"], versao) if versao is not None else None
+
+@router.get("/me", dependencies=[Depends(get_condicional(etag_perfil))])
+async def obter_perfil(
+    db: AsyncSession = Depends(get_async_read_db),
+    usuario_atual: dict = Depends(get_current_user),
+    versao: Optional[int] = Depends(versao_perfil)
 ):
-    service = UserService(db)
-    perfil = service.get_user_profile(usuario_atual["user_id"])
+    service = AsyncUserService(db)
+    # Corpo na mesma versão do ETag: entrada em cache de outra versão é recarregada
+    perfil = await service.get_user_profile_cached(usuario_atual["user_id"], versao) if versao is not None else None
     
     if not perfil:
         raise HTTPException(status_code=404, detail="Perfil não encontrado")
@@ -45,22 +65,22 @@ def obter_perfil(
     return {
         "success": True,
         "data": {
-            "id": perfil.id,
-            "nome": perfil.nome,
-            "email": perfil.email,
-            "foto_url": perfil.foto_url,
-            "role": getattr(perfil, 'role', 'student')
+            "id": perfil["id_usuario"],
+            "nome": perfil["nome"],
+            "email": perfil["email"],
+            "foto_url": perfil["foto_url"],
+            "role": perfil.get("role", "student")
         }
     }
 
 @router.put("/update")
-def atualizar_perfil(
+async def atualizar_perfil(
     dados: UserProfileUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     usuario_atual: dict = Depends(get_current_user)
 ):
-    service = UserService(db)
-    perfil_atualizado = service.update_user_profile(usuario_atual["user_id"], dados)
+    service = AsyncUserService(db)
+    perfil_atualizado = await service.update_user_profile(usuario_atual["user_id"], dados)
     
     if not perfil_atualizado:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
@@ -68,7 +88,7 @@ def atualizar_perfil(
     return {
         "success": True,
         "data": {
-            "id": perfil_atualizado.id,
+            "id": perfil_atualizado.id_usuario,
             "nome": perfil_atualizado.nome,
             "foto_url": perfil_atualizado.foto_url,
             "mensagem": "Perfil atualizado com sucesso"
@@ -76,12 +96,12 @@ def atualizar_perfil(
     }
 
 @router.get("/home")
-def home_usuario(
-    db: Session = Depends(get_db),
+async def home_usuario(
+    db: AsyncSession = Depends(get_async_read_db),
     usuario_atual: dict = Depends(get_current_user)
 ):
-    service = UserService(db)
-    dados_home = service.get_user_home_data(usuario_atual["user_id"])
+    service = AsyncUserService(db)
+    dados_home = await service.get_user_home_data(usuario_atual["user_id"])
     
     return {
         "success": True,
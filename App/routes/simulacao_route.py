@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from core.security import get_current_user
+from schemas.simulacao_schemas import SimulacaoRequest
+from services.simulacao_service import simulacao_service, NotasCorteIndisponiveisError
+
+router = APIRouter(prefix="/api/simulacao", tags=["Simulação ENEM"])
+
+@router.post("/enem")
+async def simular_enem(
+    dados: SimulacaoRequest,
+    usuario_atual: dict = Depends(get_current_user)
+):
+    """Chances de aprovação por curso/instituição, ordenadas da maior para a menor"""
+    try:
+        resultado = await run_in_threadpool(
+            simulacao_service.simular,
+            dados.notas.model_dump(),
+            dados.cursos,
+            dados.regioes,
+            dados.ufs,
+            dados.modalidades,
+            dados.limite,
+        )
+    except NotasCorteIndisponiveisError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    return {
+        "success": True,
+        "data": resultado
+    }
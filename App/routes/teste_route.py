@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from core.security import get_current_user
+from schemas.teste_schemas import RecomendacaoRequest
+from services.recomendacao_service import (
+    recomendacao_service, ModeloIndisponivelError, RespostasInvalidasError
+)
+
+router = APIRouter(prefix="/api/teste", tags=["Teste Vocacional"])
+
+@router.post("/recomendacoes")
+async def recomendar_cursos(
+    dados: RecomendacaoRequest,
+    usuario_atual: dict = Depends(get_current_user)
+):
+    """Top-k cursos para as respostas do teste vocacional"""
+    try:
+        resultado = await recomendacao_service.recomendar(dados.respostas, dados.top_k)
+    except ModeloIndisponivelError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except RespostasInvalidasError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {
+        "success": True,
+        "data": resultado
+    }
+
+@router.get("/modelo")
+async def info_modelo(usuario_atual: dict = Depends(get_current_user)):
+    """Versão do modelo carregado e estatísticas de batching/cache"""
+    return {
+        "success": True,
+        "data": recomendacao_service.info()
+    }
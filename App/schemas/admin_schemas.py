@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
@@ -40,7 +40,9 @@ class UserResponse(BaseModel):
 
 class AccessHistoryResponse(BaseModel):
     id: int
-    user_id: int
+    user_id: Optional[int] = None
+    id_usuario: Optional[int] = None
+    evento: str = "login"
     user_name: str
     timestamp: datetime
 
@@ -60,7 +62,29 @@ class SystemStatsResponse(BaseModel):
     total_acessos: int
     acessos_hoje: int
 
+class PaginacaoResponse(BaseModel):
+    page: int
+    page_size: int
+    total: int
+    total_pages: int
+
 class AdminStatsResponse(BaseModel):
     estatisticas: SystemStatsResponse
     usuarios_ativos: List[UserResponse]
-    acessos_recentes: List[AccessHistoryResponse]
\ No newline at end of file
+    usuarios_ativos_paginacao: PaginacaoResponse
+    acessos_recentes: List[AccessHistoryResponse]
+class NoticiaCreate(BaseModel):
+    titulo: str = Field(..., min_length=1, max_length=200)
+    descricao: str = Field(..., min_length=1, max_length=500)
+    imagem: Optional[str] = Field(None, max_length=500)
+    link: Optional[str] = Field(None, max_length=500)
+    publicada: bool = True
+    publicada_em: Optional[datetime] = None
+
+class NoticiaUpdate(BaseModel):
+    titulo: Optional[str] = Field(None, min_length=1, max_length=200)
+    descricao: Optional[str] = Field(None, min_length=1, max_length=500)
+    imagem: Optional[str] = Field(None, max_length=500)
+    link: Optional[str] = Field(None, max_length=500)
+    publicada: Optional[bool] = None
+    publicada_em: Optional[datetime] = None
@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class NotasEnem(BaseModel):
+    linguagens: float = Field(..., ge=0, le=1000)
+    humanas: float = Field(..., ge=0, le=1000)
+    natureza: float = Field(..., ge=0, le=1000)
+    matematica: float = Field(..., ge=0, le=1000)
+    redacao: float = Field(..., ge=0, le=1000)
+
+class SimulacaoRequest(BaseModel):
+    notas: NotasEnem
+    cursos: Optional[List[str]] = None
+    regioes: Optional[List[str]] = None
+    ufs: Optional[List[str]] = None
+    modalidades: Optional[List[str]] = None
+    limite: int = Field(20, ge=1, le=200)
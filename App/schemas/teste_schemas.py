@@ -0,0 +1,6 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+class RecomendacaoRequest(BaseModel):
+    respostas: List[int] = Field(..., min_length=1, description="Respostas do teste vocacional (1 a 5)")
+    top_k: int = Field(3, ge=1, le=20)
@@ -0,0 +1,116 @@
+"""
+Entrada de produção da API UPath (multi-worker).
+
+    cd App
+    python serve.py                      # workers = WEB_CONCURRENCY ou núcleos
+    python serve.py --workers 4 --port 8080
+    python serve.py --dry-run            # só mostra o plano calculado
+
+Cada worker é um processo uvicorn com uvloop/httptools quando instalados.
+O pool de conexões de cada worker é dimensionado para que o total fique
+abaixo de DB_MAX_CONNECTIONS, e o limite do threadpool do anyio acompanha o
+pool síncrono. SIGTERM drena: o servidor para de aceitar conexões, espera
+as requisições em andamento (até GRACEFUL_TIMEOUT_SECONDS) e roda o
+shutdown do lifespan, que esvazia os buffers em memória.
+
+Para desenvolvimento continue usando `python main.py` (reload).
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import sys
+from typing import Any, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.config import settings
+
+logger = logging.getLogger("upath.serve")
+
+def _disponivel(modulo: str) -> bool:
+    return importlib.util.find_spec(modulo) is not None
+
+def planejar(workers: Optional[int] = None, cpus: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Workers, pools por engine e threadpool a partir dos núcleos e do Settings
+    """
+    cpus = cpus or os.cpu_count() or 1
+    workers = workers or settings.WEB_CONCURRENCY or cpus
+
+    # Cada worker tem dois engines no primário (síncrono e assíncrono)
+    orcamento = max(workers * 2, settings.DB_MAX_CONNECTIONS - settings.DB_RESERVED_CONNECTIONS)
+    por_engine = max(1, orcamento // (workers * 2))
+    pool_size = max(1, min(settings.DB_POOL_SIZE, por_engine))
+    max_overflow = max(0, min(settings.DB_MAX_OVERFLOW, por_engine - pool_size))
+
+    # Mais threads que conexões síncronas só gera espera no pool
+    threadpool = settings.THREADPOOL_TOKENS or max(4, pool_size + max_overflow)
+
+    # Invalidação no LRU local não chega aos outros workers: teto curto no TTL dele
+    cache_ttl_local = settings.CACHE_MEMORY_MAX_TTL_SECONDS or (5 if workers > 1 else 0)
+
+    return {
+        "workers": workers,
+        "cpus": cpus,
+        "loop": "uvloop" if _disponivel("uvloop") else "asyncio",
+        "http": "httptools" if _disponivel("httptools") else "h11",
+        "db_pool_size": pool_size,
+        "db_max_overflow": max_overflow,
+        "db_conexoes_max": workers * 2 * (pool_size + max_overflow),
+        "db_max_connections": settings.DB_MAX_CONNECTIONS,
+        "threadpool_tokens": threadpool,
+        "cache_backend": settings.CACHE_BACKEND,
+        "cache_ttl_local": cache_ttl_local,
+        "graceful_timeout": settings.GRACEFUL_TIMEOUT_SECONDS,
+    }
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Servidor de produção da API UPath")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, help="Padrão: WEB_CONCURRENCY ou número de núcleos")
+    parser.add_argument("--dry-run", action="store_true", help="Mostra o plano e sai")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    plano = planejar(args.workers)
+    logger.info(
+        f"🚀 {plano['workers']} workers ({plano['cpus']} núcleos), {plano['loop']}/{plano['http']}, "
+        f"pool {plano['db_pool_size']}+{plano['db_max_overflow']} por engine "
+        f"(até {plano['db_conexoes_max']}/{plano['db_max_connections']} conexões), "
+        f"threadpool {plano['threadpool_tokens']}"
+    )
+    if plano["db_conexoes_max"] > settings.DB_MAX_CONNECTIONS - settings.DB_RESERVED_CONNECTIONS:
+        logger.warning("⚠️ Workers demais para DB_MAX_CONNECTIONS: pools reduzidos ao mínimo ainda excedem o limite")
+    if plano["workers"] > 1 and plano["cache_backend"] != "redis":
+        logger.warning(
+            f"⚠️ CACHE_BACKEND={plano['cache_backend']} com {plano['workers']} workers: invalidações são "
+            f"locais, dados podem ficar até {plano['cache_ttl_local']}s desatualizados. Use CACHE_BACKEND=redis"
+        )
+    if args.dry_run:
+        return 0
+
+    # Workers são processos novos: herdam o ambiente e leem o Settings na importação
+    os.environ["DB_POOL_SIZE"] = str(plano["db_pool_size"])
+    os.environ["DB_MAX_OVERFLOW"] = str(plano["db_max_overflow"])
+    os.environ["THREADPOOL_TOKENS"] = str(plano["threadpool_tokens"])
+    os.environ["CACHE_MEMORY_MAX_TTL_SECONDS"] = str(plano["cache_ttl_local"])
+
+    import uvicorn
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=plano["workers"],
+        loop=plano["loop"],
+        http=plano["http"],
+        proxy_headers=settings.TRUST_PROXY_HEADERS,
+        timeout_graceful_shutdown=plano["graceful_timeout"],
+        access_log=False,
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from core.background import PeriodicTask
+from core.config import settings
+from core.database import SessionLocal
+from core.metrics import counter, gauge
+from models.admin import AccessHistory
+from services.stats_service import estatisticas_snapshot
+from services import agregados_service
+
+logger = logging.getLogger(__name__)
+
+ACCESS_EVENTS = counter(
+    "upath_access_events_total",
+    "Eventos de acesso por destino (registrado, gravado, descartado)",
+    ("result",),
+)
+
+class BufferAcessos:
+    """
+    Eventos de acesso (login, refresh) acumulados em memória e gravados em
+    lote no access_history por um INSERT de várias linhas, quando o lote
+    enche ou a cada ACCESS_LOG_FLUSH_SECONDS. O buffer é limitado: cheio,
+    novos eventos são descartados e contados, sem nunca atrasar a rota.
+    """
+
+    def __init__(self, max_eventos: Optional[int] = None, lote: Optional[int] = None):
+        self.max_eventos = max_eventos or settings.ACCESS_LOG_BUFFER_MAX
+        self.lote = lote or settings.ACCESS_LOG_BATCH_SIZE
+        self._eventos: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        # Uma gravação por vez (tarefa periódica x flush do shutdown)
+        self._gravando = threading.Lock()
+        self.registrados = 0
+        self.gravados = 0
+        self.descartados = 0
+        self.falhas = 0
+
+    def registrar(self, evento: str, id_usuario: Optional[int] = None, ip: Optional[str] = None) -> None:
+        """
+        Enfileira o evento (sem I/O); antecipa a gravação ao completar um lote
+        """
+        if not settings.ACCESS_LOG_ENABLED:
+            return
+        linha = {
+            "evento": evento,
+            "id_usuario": id_usuario,
+            "ip": ip,
+            "timestamp": datetime.utcnow(),
+        }
+        with self._lock:
+            if len(self._eventos) >= self.max_eventos:
+                self.descartados += 1
+                ACCESS_EVENTS.inc("descartado")
+                return
+            self._eventos.append(linha)
+            self.registrados += 1
+            lote_cheio = len(self._eventos) == self.lote
+        ACCESS_EVENTS.inc("registrado")
+        if lote_cheio:
+            acessos_task.trigger()
+
+    def _retirar_lote(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            n = min(self.lote, len(self._eventos))
+            return [self._eventos.popleft() for _ in range(n)]
+
+    def _devolver(self, lote: List[Dict[str, Any]]) -> None:
+        # Banco fora: o lote volta para a frente do buffer no espaço que houver
+        with self._lock:
+            espaco = max(0, self.max_eventos - len(self._eventos))
+            perdidos = len(lote) - min(espaco, len(lote))
+            self._eventos.extendleft(reversed(lote[perdidos:]))
+            self.descartados += perdidos
+        if perdidos:
+            ACCESS_EVENTS.inc("descartado", amount=perdidos)
+
+    def _gravar_lote(self, lote: List[Dict[str, Any]]) -> None:
+        db = SessionLocal()
+        try:
+            with agregados_service.trava(db):
+                db.execute(insert(AccessHistory).values(lote))
+                # Agregados por hora/dia na mesma transação: nunca divergem dos eventos
+                agregados_service.incrementar(db, lote)
+                db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        # INSERT Core não passa pelos eventos do ORM: deltas do snapshot aplicados aqui
+        hoje = agregados_service.inicio_do_dia_utc()
+        estatisticas_snapshot.aplicar({
+            "total_acessos": len(lote),
+            "acessos_hoje": sum(1 for e in lote if e["timestamp"] >= hoje),
+        })
+
+    def gravar(self) -> int:
+        """
+        Grava o buffer em lotes até esvaziá-lo; devolve quantos eventos foram gravados
+        """
+        total = 0
+        with self._gravando:
+            while True:
+                lote = self._retirar_lote()
+                if not lote:
+                    break
+                try:
+                    self._gravar_lote(lote)
+                except (SQLAlchemyError, agregados_service.TravaAgregadosError) as e:
+                    self.falhas += 1
+                    self._devolver(lote)
+                    logger.error(f"❌ Falha ao gravar {len(lote)} eventos de acesso: {e}")
+                    break
+                total += len(lote)
+                self.gravados += len(lote)
+                ACCESS_EVENTS.inc("gravado", amount=len(lote))
+        return total
+
+    def reconstruir_agregados(self) -> Dict[str, int]:
+        """
+        Recalcula os agregados com as gravações suspensas: as deste worker pelo
+        lock local, as dos demais pela trava exclusiva no banco
+        """
+        with self._gravando:
+            db = SessionLocal()
+            try:
+                with agregados_service.trava(db, exclusiva=True):
+                    resultado = agregados_service.reconstruir(db)
+                    db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+        estatisticas_snapshot.invalidar()
+        return resultado
+
+    def pendentes(self) -> int:
+        with self._lock:
+            return len(self._eventos)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pendentes": self.pendentes(),
+            "max_eventos": self.max_eventos,
+            "lote": self.lote,
+            "registrados": self.registrados,
+            "gravados": self.gravados,
+            "descartados": self.descartados,
+            "falhas": self.falhas,
+        }
+
+buffer_acessos = BufferAcessos()
+
+# Disparado ao completar um lote e periodicamente; a execução final no shutdown esvazia o buffer
+acessos_task = PeriodicTask(
+    "eventos-acesso",
+    settings.ACCESS_LOG_FLUSH_SECONDS,
+    buffer_acessos.gravar,
+    run_on_stop=True,
+)
+
+gauge(
+    "upath_access_events_pending",
+    "Eventos de acesso aguardando gravação",
+    callback=lambda: {(): float(buffer_acessos.pendentes())},
+)
@@ -1,13 +1,80 @@
-from typing import Optional, Dict, Any, List
-from datetime import datetime
+from typing import Optional, Dict, Any
+from sqlalchemy import select, or_, and_, func
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from passlib.context import CryptContext
 
+from core.security import verify_password_async
+from core.pagination import encode_cursor, decode_cursor
 from models.admin import Admin, User, AccessHistory
+from models.auth import Usuario
+from services.stats_service import estatisticas_snapshot
 
-# Configuração do passlib para hashing seguro
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Limite da lista de usuários ativos por página
+USUARIOS_ATIVOS_PAGE_MAX = 100
+
+def _historico_query(page: int, page_size: int, cursor: Optional[str]):
+    # Nome do usuário via join (sem lazy load de h.user por linha): painel
+    # (users) ou estudante (usuarios); uma linha extra indica se há próxima página
+    query = (
+        select(
+            AccessHistory.id,
+            AccessHistory.user_id,
+            AccessHistory.id_usuario,
+            AccessHistory.evento,
+            AccessHistory.timestamp,
+            func.coalesce(User.name, Usuario.nome).label("name"),
+        )
+        .outerjoin(User, AccessHistory.user_id == User.id)
+        .outerjoin(Usuario, AccessHistory.id_usuario == Usuario.id_usuario)
+        .order_by(AccessHistory.timestamp.desc(), AccessHistory.id.desc())
+        .limit(page_size + 1)
+    )
+    if cursor:
+        timestamp, ultimo_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                AccessHistory.timestamp < timestamp,
+                and_(AccessHistory.timestamp == timestamp, AccessHistory.id < ultimo_id),
+            )
+        )
+    else:
+        query = query.offset((page - 1) * page_size)
+    return query
+
+def _montar_pagina_historico(
+    linhas, page: int, page_size: int, cursor: Optional[str], total: Optional[int]
+) -> Dict[str, Any]:
+    tem_mais = len(linhas) > page_size
+    linhas = linhas[:page_size]
+    ultimo = linhas[-1] if linhas else None
+
+    pagina: Dict[str, Any] = {
+        "items": [
+            {
+                "id": h.id,
+                "user_id": h.user_id,
+                "id_usuario": h.id_usuario,
+                "evento": h.evento,
+                "timestamp": h.timestamp,
+                "user_name": h.name or "N/A"
+            } for h in linhas
+        ],
+        "page_size": page_size,
+        "next_cursor": encode_cursor(ultimo.timestamp, ultimo.id) if tem_mais and ultimo else None,
+        # Total aproximado (snapshot das estatísticas), None quando não solicitado
+        "total": total,
+    }
+    if not cursor:
+        pagina["page"] = page
+        pagina["total_pages"] = (total + page_size - 1) // page_size if total is not None else None
+    return pagina
+
+def _pagina_historico_vazia(page: int, page_size: int, cursor: Optional[str]) -> Dict[str, Any]:
+    pagina: Dict[str, Any] = {"items": [], "page_size": page_size, "next_cursor": None, "total": 0}
+    if not cursor:
+        pagina.update(page=page, total_pages=0)
+    return pagina
 
 class AdminService:
     """
@@ -17,8 +84,8 @@ class AdminService:
     def __init__(self, db: Session):
         self.db = db
 
-    def _verify_password(self, plain: str, hashed: str) -> bool:
-        return pwd_context.verify(plain, hashed)
+    async def _verify_password(self, plain: str, hashed: str) -> bool:
+        return await verify_password_async(plain, hashed)
 
     def obter_admin_por_username(self, username: str) -> Optional[Admin]:
         """
@@ -38,7 +105,7 @@ class AdminService:
         except SQLAlchemyError:
             return None
 
-    def validar_login(self, username: str, password: str) -> bool:
+    async def validar_login(self, username: str, password: str) -> bool:
         """
         Valida username e senha do admin usando hash seguro.
         """
@@ -47,11 +114,11 @@ class AdminService:
             if not admin:
                 return False
 
-            return self._verify_password(password, admin.password) # type: ignore
+            return await self._verify_password(password, admin.password) # type: ignore
         except SQLAlchemyError:
             return False
 
-    def validar_pin(self, username: str, pin: str) -> bool:
+    async def validar_pin(self, username: str, pin: str) -> bool:
         """
         Valida PIN do admin usando hash seguro.
         """
@@ -60,7 +127,7 @@ class AdminService:
             if not admin or not admin.pin: # type: ignore
                 return False
 
-            return self._verify_password(pin, admin.pin) # type: ignore
+            return await self._verify_password(pin, admin.pin) # type: ignore
         except SQLAlchemyError:
             return False
 
@@ -84,79 +151,222 @@ class AdminService:
                 "id": user.id, 
                 "name": user.name, 
                 "email": user.email,
-                "active": user.active
+                "active": user.active,
+                "versao": user.versao
             }
         except SQLAlchemyError:
             return None
 
+    def versao_usuario(self, user_id: int) -> Optional[int]:
+        """Só a coluna de versão (ETag), sem carregar o usuário"""
+        return self.db.scalar(select(User.versao).where(User.id == user_id))
+
     def consultar_historico_acessos(
-        self, page: int = 1, page_size: int = 20
+        self,
+        page: int = 1,
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+        incluir_total: bool = True,
     ) -> Dict[str, Any]:
+        """
+        Histórico de acessos, mais recentes primeiro.
+        Com cursor usa keyset em (timestamp, id); sem cursor mantém page/page_size.
+        Levanta ValueError para cursor inválido.
+        """
+        page = max(1, page)
+        page_size = max(1, min(page_size, 100))
         try:
-            page = max(1, page)
-            page_size = min(page_size, 100)
-
-            query = self.db.query(AccessHistory).order_by(AccessHistory.timestamp.desc())
-            total = query.count()
-
-            offset = (page - 1) * page_size
-            historico = query.offset(offset).limit(page_size).all()
-
-            items = [
-                {
-                    "id": h.id,
-                    "user_id": h.user_id, 
-                    "timestamp": h.timestamp,
-                    "user_name": h.user.name if h.user else "N/A"
-                } for h in historico
-            ]
+            query = _historico_query(page, page_size, cursor)
+            linhas = self.db.execute(query).all()
+            total = estatisticas_snapshot.obter(self.db)["total_acessos"] if incluir_total else None
+            return _montar_pagina_historico(linhas, page, page_size, cursor, total)
+        except SQLAlchemyError as e:
+            print(f"Erro ao consultar histórico: {e}")
+            return _pagina_historico_vazia(page, page_size, cursor)
 
+    def consultar_usuarios_ativos(self, page: int = 1, page_size: int = 20) -> Dict[str, Any]:
+        """
+        Página de usuários ativos (ordem por id); o total vem do snapshot
+        """
+        page = max(1, page)
+        page_size = max(1, min(page_size, USUARIOS_ATIVOS_PAGE_MAX))
+        try:
+            ativos = (
+                self.db.query(User.id, User.name, User.email)
+                .filter(User.active == True)
+                .order_by(User.id)
+                .offset((page - 1) * page_size)
+                .limit(page_size)
+                .all()
+            )
+            total = estatisticas_snapshot.obter(self.db)["usuarios_ativos"]
             return {
-                "items": items,
+                "items": [{"id": u.id, "name": u.name, "email": u.email} for u in ativos],
                 "page": page,
                 "page_size": page_size,
                 "total": total,
                 "total_pages": (total + page_size - 1) // page_size,
             }
         except SQLAlchemyError as e:
-            print(f"Erro ao consultar histórico: {e}")
+            print(f"Erro ao consultar usuários ativos: {e}")
             return {"items": [], "page": page, "page_size": page_size, "total": 0, "total_pages": 0}
 
-    def consultar_usuarios_ativos(self) -> List[Dict[str, Any]]:
+    def obter_estatisticas_sistema(self) -> Dict[str, Any]:
+        """
+        Obtém estatísticas do sistema (snapshot com TTL, sem COUNT(*) por chamada)
+        """
         try:
-            ativos = self.db.query(User).filter(User.active == True).all()
-            return [
-                {
-                    "id": u.id, 
-                    "name": u.name, 
-                    "email": u.email
-                } for u in ativos
-            ]
+            return estatisticas_snapshot.obter(self.db)
         except SQLAlchemyError as e:
-            print(f"Erro ao consultar usuários ativos: {e}")
-            return []
+            print(f"Erro ao obter estatísticas: {e}")
+            return {}
 
-    def obter_estatisticas_sistema(self) -> Dict[str, Any]:
+class AsyncAdminService:
+    """
+    Versão assíncrona do AdminService, para rotas async com AsyncSession
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def _verify_password(self, plain: str, hashed: str) -> bool:
+        return await verify_password_async(plain, hashed)
+
+    async def obter_admin_por_username(self, username: str) -> Optional[Admin]:
+        """
+        Obtém admin pelo username
+        """
+        try:
+            return await self.db.scalar(select(Admin).where(Admin.username == username))
+        except SQLAlchemyError:
+            return None
+
+    async def obter_admin_por_email(self, email: str) -> Optional[Admin]:
+        """
+        Obtém admin pelo email
+        """
+        try:
+            return await self.db.scalar(select(Admin).where(Admin.email == email))
+        except SQLAlchemyError:
+            return None
+
+    async def validar_login(self, username: str, password: str) -> bool:
+        """
+        Valida username e senha do admin usando hash seguro.
+        """
+        try:
+            admin = await self.obter_admin_por_username(username)
+            if not admin:
+                return False
+
+            return await self.verificar_senha(admin, password)
+        except SQLAlchemyError:
+            return False
+
+    async def verificar_senha(self, admin: Admin, password: str) -> bool:
+        """
+        Confere a senha de um admin já carregado (sem nova consulta)
+        """
+        return await self._verify_password(password, admin.password) # type: ignore
+
+    async def validar_pin(self, username: str, pin: str) -> bool:
+        """
+        Valida PIN do admin usando hash seguro.
+        """
+        try:
+            admin = await self.obter_admin_por_username(username)
+            if not admin or not admin.pin: # type: ignore
+                return False
+
+            return await self._verify_password(pin, admin.pin) # type: ignore
+        except SQLAlchemyError:
+            return False
+
+    async def obter_nome_admin(self, username: str) -> Optional[str]:
+        """
+        Retorna o nome do administrador pelo username.
+        """
+        admin = await self.obter_admin_por_username(username)
+        return admin.name if admin else None # type: ignore
+
+    async def consultar_usuario_por_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            user = await self.db.get(User, user_id)
+            if not user:
+                return None
+
+            return {
+                "id": user.id, 
+                "name": user.name, 
+                "email": user.email,
+                "active": user.active,
+                "versao": user.versao
+            }
+        except SQLAlchemyError:
+            return None
+
+    async def versao_usuario(self, user_id: int) -> Optional[int]:
+        """Só a coluna de versão (ETag), sem carregar o usuário"""
+        return await self.db.scalar(select(User.versao).where(User.id == user_id))
+
+    async def consultar_historico_acessos(
+        self,
+        page: int = 1,
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+        incluir_total: bool = True,
+    ) -> Dict[str, Any]:
         """
-        Obtém estatísticas do sistema
+        Histórico de acessos, mais recentes primeiro.
+        Com cursor usa keyset em (timestamp, id); sem cursor mantém page/page_size.
+        Levanta ValueError para cursor inválido.
         """
+        page = max(1, page)
+        page_size = max(1, min(page_size, 100))
         try:
-            total_usuarios = self.db.query(User).count()
-            usuarios_ativos = self.db.query(User).filter(User.active == True).count()
-            total_acessos = self.db.query(AccessHistory).count()
-            
-            # Acessos hoje
-            hoje = datetime.now().date()
-            acessos_hoje = self.db.query(AccessHistory).filter(
-                AccessHistory.timestamp >= hoje
-            ).count()
+            query = _historico_query(page, page_size, cursor)
+            linhas = (await self.db.execute(query)).all()
+            total = (
+                (await estatisticas_snapshot.obter_async(self.db))["total_acessos"]
+                if incluir_total else None
+            )
+            return _montar_pagina_historico(linhas, page, page_size, cursor, total)
+        except SQLAlchemyError as e:
+            print(f"Erro ao consultar histórico: {e}")
+            return _pagina_historico_vazia(page, page_size, cursor)
 
+    async def consultar_usuarios_ativos(self, page: int = 1, page_size: int = 20) -> Dict[str, Any]:
+        """
+        Página de usuários ativos (ordem por id); o total vem do snapshot
+        """
+        page = max(1, page)
+        page_size = max(1, min(page_size, USUARIOS_ATIVOS_PAGE_MAX))
+        try:
+            result = await self.db.execute(
+                select(User.id, User.name, User.email)
+                .where(User.active == True)
+                .order_by(User.id)
+                .offset((page - 1) * page_size)
+                .limit(page_size)
+            )
+            total = (await estatisticas_snapshot.obter_async(self.db))["usuarios_ativos"]
             return {
-                "total_usuarios": total_usuarios,
-                "usuarios_ativos": usuarios_ativos,
-                "total_acessos": total_acessos,
-                "acessos_hoje": acessos_hoje
+                "items": [{"id": u.id, "name": u.name, "email": u.email} for u in result.all()],
+                "page": page,
+                "page_size": page_size,
+                "total": total,
+                "total_pages": (total + page_size - 1) // page_size,
             }
+        except SQLAlchemyError as e:
+            print(f"Erro ao consultar usuários ativos: {e}")
+            return {"items": [], "page": page, "page_size": page_size, "total": 0, "total_pages": 0}
+
+    async def obter_estatisticas_sistema(self) -> Dict[str, Any]:
+        """
+        Obtém estatísticas do sistema (snapshot com TTL, sem COUNT(*) por chamada)
+        """
+        try:
+            return await estatisticas_snapshot.obter_async(self.db)
         except SQLAlchemyError as e:
             print(f"Erro ao obter estatísticas: {e}")
-            return {}
\ No newline at end of file
+            return {}
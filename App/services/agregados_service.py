@@ -0,0 +1,251 @@
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, text, update, insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.admin import AccessHistory, AccessRollupHour, AccessRollupDay
+from models.auth import Usuario
+
+logger = logging.getLogger(__name__)
+
+GRANULARIDADES = {"hora": AccessRollupHour, "dia": AccessRollupDay}
+# Janela padrão e limite de buckets por consulta da série
+JANELA_PADRAO = {"hora": timedelta(hours=48), "dia": timedelta(days=30)}
+MAX_BUCKETS = 2000
+# Linhas por INSERT ... ON DUPLICATE KEY / ON CONFLICT
+UPSERT_CHUNK = 1000
+
+Contagens = Counter  # (bucket, evento, coorte) -> total
+
+# Trava entre workers: gravações de lote x reconstrução
+TRAVA_NOME = "upath_agregados_acesso"
+TRAVA_CHAVE_PG = 0x55504154  # advisory lock do PostgreSQL
+TRAVA_TIMEOUT_SECONDS = 30
+
+class TravaAgregadosError(Exception):
+    """Trava dos agregados não obtida dentro de TRAVA_TIMEOUT_SECONDS"""
+    pass
+
+@contextmanager
+def trava(db: Session, exclusiva: bool = False) -> Iterator[None]:
+    """
+    Envolve o trabalho e o commit, antes de qualquer statement da transação:
+    a reconstrução (exclusiva) não perde incrementos gravados por outros workers
+    entre a varredura e o DELETE. PostgreSQL: advisory lock da transação,
+    compartilhado entre gravações. MySQL: GET_LOCK em conexão à parte, liberado
+    após o commit (gravações também se serializam). SQLite (um processo): a
+    exclusão fica com o lock de gravação do buffer de acessos.
+    """
+    dialeto = db.get_bind().dialect.name
+    if dialeto == "postgresql":
+        funcao = "pg_advisory_xact_lock" if exclusiva else "pg_advisory_xact_lock_shared"
+        db.execute(text(f"SELECT {funcao}(:chave)"), {"chave": TRAVA_CHAVE_PG})
+        yield
+    elif dialeto == "mysql":
+        with db.get_bind().connect() as conexao:
+            obtida = conexao.execute(
+                text("SELECT GET_LOCK(:nome, :timeout)"),
+                {"nome": TRAVA_NOME, "timeout": TRAVA_TIMEOUT_SECONDS},
+            ).scalar()
+            if obtida != 1:
+                raise TravaAgregadosError(f"Trava {TRAVA_NOME} não obtida em {TRAVA_TIMEOUT_SECONDS}s")
+            try:
+                yield
+            finally:
+                conexao.execute(text("SELECT RELEASE_LOCK(:nome)"), {"nome": TRAVA_NOME})
+    else:
+        yield
+
+def coorte_de(data_cadastro: Optional[datetime]) -> str:
+    """Coorte do estudante: mês de cadastro ("2025-03")"""
+    return data_cadastro.strftime("%Y-%m") if data_cadastro else ""
+
+def inicio_do_dia_utc() -> datetime:
+    """
+    Meia-noite local de hoje em UTC (naive, como os timestamps do banco).
+    Com fuso de hora cheia coincide com um bucket horário.
+    """
+    meia_noite = datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+    return meia_noite.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _contar(eventos: Iterable[Tuple[datetime, str, str]]) -> Tuple[Contagens, Contagens]:
+    por_hora: Contagens = Counter()
+    por_dia: Contagens = Counter()
+    for timestamp, evento, coorte in eventos:
+        por_hora[(timestamp.replace(minute=0, second=0, microsecond=0), evento, coorte)] += 1
+        por_dia[(timestamp.date(), evento, coorte)] += 1
+    return por_hora, por_dia
+
+def _upsert(db: Session, tabela, contagens: Contagens) -> None:
+    """
+    Soma as contagens aos buckets existentes (ou os cria) em um único
+    statement por chunk; ordem fixa das chaves evita deadlock entre workers
+    """
+    linhas = [
+        {"bucket": bucket, "evento": evento, "coorte": coorte, "total": total}
+        for (bucket, evento, coorte), total in sorted(contagens.items())
+    ]
+    dialeto = db.get_bind().dialect.name
+    for inicio in range(0, len(linhas), UPSERT_CHUNK):
+        chunk = linhas[inicio:inicio + UPSERT_CHUNK]
+        if dialeto == "mysql":
+            stmt = mysql.insert(tabela).values(chunk)
+            stmt = stmt.on_duplicate_key_update(total=tabela.total + stmt.inserted.total)
+        elif dialeto in ("postgresql", "sqlite"):
+            stmt = (postgresql if dialeto == "postgresql" else sqlite).insert(tabela).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["bucket", "evento", "coorte"],
+                set_={"total": tabela.total + stmt.excluded.total},
+            )
+        else:
+            # Sem upsert nativo: UPDATE e, se nenhum bucket existia, INSERT
+            for linha in chunk:
+                resultado = db.execute(
+                    update(tabela)
+                    .where(
+                        tabela.bucket == linha["bucket"],
+                        tabela.evento == linha["evento"],
+                        tabela.coorte == linha["coorte"],
+                    )
+                    .values(total=tabela.total + linha["total"])
+                )
+                if resultado.rowcount == 0:
+                    db.execute(insert(tabela).values(linha))
+            continue
+        db.execute(stmt)
+
+def incrementar(db: Session, eventos: List[Dict[str, Any]]) -> None:
+    """
+    Aplica um lote de eventos aos agregados na transação corrente (sem commit)
+    """
+    ids = {e["id_usuario"] for e in eventos if e.get("id_usuario")}
+    coortes: Dict[int, str] = {}
+    if ids:
+        coortes = {
+            id_usuario: coorte_de(data_cadastro)
+            for id_usuario, data_cadastro in db.execute(
+                select(Usuario.id_usuario, Usuario.data_cadastro).where(Usuario.id_usuario.in_(ids))
+            )
+        }
+    por_hora, por_dia = _contar(
+        (e["timestamp"], e["evento"], coortes.get(e.get("id_usuario"), "")) for e in eventos # type: ignore
+    )
+    _upsert(db, AccessRollupHour, por_hora)
+    _upsert(db, AccessRollupDay, por_dia)
+
+def reconstruir(db: Session) -> Dict[str, int]:
+    """
+    Recalcula todos os agregados a partir do access_history (varredura
+    completa; manutenção após migração ou carga de dados fora do buffer).
+    Com vários workers, chamar sob trava(db, exclusiva=True) até o commit.
+    """
+    consulta = (
+        select(AccessHistory.timestamp, AccessHistory.evento, Usuario.data_cadastro)
+        .outerjoin(Usuario, AccessHistory.id_usuario == Usuario.id_usuario)
+        .execution_options(yield_per=5000)
+    )
+    por_hora, por_dia = _contar(
+        (timestamp, evento or "login", coorte_de(data_cadastro))
+        for timestamp, evento, data_cadastro in db.execute(consulta)
+    )
+
+    db.execute(delete(AccessRollupHour))
+    db.execute(delete(AccessRollupDay))
+    _upsert(db, AccessRollupHour, por_hora)
+    _upsert(db, AccessRollupDay, por_dia)
+    resultado = {"eventos": sum(por_dia.values()), "buckets_hora": len(por_hora), "buckets_dia": len(por_dia)}
+    logger.info(f"📈 Agregados de acesso reconstruídos: {resultado}")
+    return resultado
+
+def _utc_naive(momento: Optional[datetime]) -> Optional[datetime]:
+    # Parâmetros com fuso (ex.: ...Z ou -03:00) viram UTC naive, como os buckets
+    if momento is not None and momento.tzinfo is not None:
+        return momento.astimezone(timezone.utc).replace(tzinfo=None)
+    return momento
+
+def _normalizar_janela(
+    granularidade: str, desde: Optional[datetime], ate: Optional[datetime]
+) -> Tuple[Any, Any, timedelta]:
+    desde, ate = _utc_naive(desde), _utc_naive(ate)
+    if granularidade == "hora":
+        passo = timedelta(hours=1)
+        ate = (ate or datetime.utcnow() + passo).replace(minute=0, second=0, microsecond=0)
+        desde = (desde or ate - JANELA_PADRAO["hora"]).replace(minute=0, second=0, microsecond=0)
+        return desde, ate, passo
+    passo = timedelta(days=1)
+    fim = ate.date() if ate else datetime.utcnow().date() + passo
+    inicio = desde.date() if desde else fim - JANELA_PADRAO["dia"]
+    return inicio, fim, passo
+
+class AnaliseAcessosService:
+    """
+    Séries temporais de acessos lidas só dos agregados: custo proporcional
+    ao número de buckets da janela, não ao de eventos
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def serie(
+        self,
+        granularidade: str = "dia",
+        desde: Optional[datetime] = None,
+        ate: Optional[datetime] = None,
+        evento: Optional[str] = None,
+        coorte: Optional[str] = None,
+        por_coorte: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Série [desde, ate) em UTC com buckets vazios preenchidos com zero.
+        Levanta ValueError para granularidade ou janela inválidas.
+        """
+        tabela = GRANULARIDADES.get(granularidade)
+        if tabela is None:
+            raise ValueError("Granularidade inválida. Use hora ou dia")
+        inicio, fim, passo = _normalizar_janela(granularidade, desde, ate)
+        if fim <= inicio:
+            raise ValueError("Janela vazia: 'ate' deve ser posterior a 'desde'")
+        if (fim - inicio) // passo > MAX_BUCKETS:
+            raise ValueError(f"Janela grande demais: máximo de {MAX_BUCKETS} buckets")
+
+        colunas = [tabela.bucket, func.sum(tabela.total)]
+        if por_coorte:
+            colunas.insert(1, tabela.coorte)
+        consulta = select(*colunas).where(tabela.bucket >= inicio, tabela.bucket < fim)
+        if evento:
+            consulta = consulta.where(tabela.evento == evento)
+        if coorte is not None:
+            consulta = consulta.where(tabela.coorte == coorte)
+        consulta = consulta.group_by(*colunas[:-1])
+        linhas = (await self.db.execute(consulta)).all()
+
+        totais: Dict[Any, int] = {}
+        coortes: Dict[Any, Dict[str, int]] = {}
+        for linha in linhas:
+            bucket, total = linha[0], int(linha[-1] or 0)
+            totais[bucket] = totais.get(bucket, 0) + total
+            if por_coorte:
+                coortes.setdefault(bucket, {})[linha[1]] = total
+
+        serie = []
+        bucket = inicio
+        while bucket < fim:
+            ponto: Dict[str, Any] = {"periodo": bucket.isoformat(), "total": totais.get(bucket, 0)}
+            if por_coorte:
+                ponto["por_coorte"] = coortes.get(bucket, {})
+            serie.append(ponto)
+            bucket += passo
+
+        return {
+            "granularidade": granularidade,
+            "desde": inicio.isoformat(),
+            "ate": fim.isoformat(),
+            "total": sum(totais.values()),
+            "serie": serie,
+        }
@@ -1,14 +1,19 @@
 from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
 import re
 import datetime
 from typing import Optional, Dict, Any
 import secrets
 import string
 
-from core.security import get_password_hash, verify_password
+from core.security import get_password_hash_async, verify_password_async
+from core.hashing import HashingBusyError
 from models.auth import Usuario, Perfil, TokenRecuperacao
 from services.token_service import TokenService
-from services.email_service import EmailService
+from services.email_service import EmailService, email_outbox_task
+from services.perfil_service import perfil_cache
+
+NOME_REGEX = re.compile(r'^[A-Za-zÀ-ÿ\s]{2,100}$')
 
 class AuthService:
     def __init__(self, db: Session):
@@ -16,8 +21,8 @@ class AuthService:
         self.token_service = TokenService(db)
         self.email_service = EmailService()
 
-    def registrar_usuario(self, nome: str, email: str, confirm_email: str, 
-                         senha: str, confirm_senha: str) -> dict:
+    async def registrar_usuario(self, nome: str, email: str, confirm_email: str, 
+                                senha: str, confirm_senha: str) -> dict:
         """
         Registra um novo usuário no sistema 
         """
@@ -32,16 +37,15 @@ class AuthService:
                 return {"success": False, "mensagem": "Senhas não coincidem"}
             
             # Verifica se email já existe
-            usuario_existente = self.db.query(Usuario).filter(
-                Usuario.email == email
-            ).first()
+            usuario_existente = await run_in_threadpool(self._obter_usuario_por_email, email)
             
             if usuario_existente:
                 return {"success": False, "mensagem": "Email já cadastrado"}
             
             # Valida nome
-            if not re.match(r'^[A-Za-zÀ-ÿ\s]{2,100}$', nome.strip()):
-                return {"success": False, "mensagem": "Nome deve conter apenas letras e espaços"}
+            validacao_nome = self.validar_nome(nome)
+            if not validacao_nome["success"]:
+                return validacao_nome
             
             # Valida senha 
             validacao_senha = self.validar_senha(senha)
@@ -50,9 +54,39 @@ class AuthService:
             
             # Cria hash da senha 
             print("🔧 Gerando hash da senha...")
-            senha_hash = get_password_hash(senha)
+            senha_hash = await get_password_hash_async(senha)
             print("✅ Hash gerado com sucesso")
             
+            return await run_in_threadpool(self._criar_usuario, nome, email, senha_hash)
+            
+        except HashingBusyError:
+            raise
+        except Exception as e:
+            await run_in_threadpool(self.db.rollback)
+            print(f"Erro no registro: {str(e)}")
+            return {"success": False, "mensagem": f"Erro ao registrar usuário: {str(e)}"}
+
+    def _obter_usuario_por_email(self, email: str) -> Optional[Usuario]:
+        return self.db.query(Usuario).filter(
+            Usuario.email == email
+        ).first()
+
+    def _obter_usuario_ativo(self, email: str) -> Optional[Usuario]:
+        return self.db.query(Usuario).filter(
+            Usuario.email == email.lower().strip(),
+            Usuario.status_conta == 'ativo'
+        ).first()
+
+    def _obter_usuario_por_id(self, id_usuario: int) -> Optional[Usuario]:
+        return self.db.query(Usuario).filter(
+            Usuario.id_usuario == id_usuario
+        ).first()
+
+    def _criar_usuario(self, nome: str, email: str, senha_hash: str) -> dict:
+        """
+        Persiste usuário e perfil (executado no threadpool)
+        """
+        try:
             # Cria usuário
             novo_usuario = Usuario(
                 nome=nome.strip(),
@@ -93,7 +127,17 @@ class AuthService:
             print(f"Erro no registro: {str(e)}")
             return {"success": False, "mensagem": f"Erro ao registrar usuário: {str(e)}"}
 
-    def validar_senha(self, senha: str) -> Dict[str, Any]:
+    @staticmethod
+    def validar_nome(nome: str) -> Dict[str, Any]:
+        """
+        Valida o nome (apenas letras e espaços, 2 a 100 caracteres)
+        """
+        if not NOME_REGEX.match(nome.strip()):
+            return {"success": False, "mensagem": "Nome deve conter apenas letras e espaços"}
+        return {"success": True}
+
+    @staticmethod
+    def validar_senha(senha: str) -> Dict[str, Any]:
         """
         Valida os requisitos da senha
         """
@@ -115,14 +159,11 @@ class AuthService:
         
         return {"success": True}
 
-    def autenticar_usuario(self, email: str, senha: str) -> Optional[Usuario]:
+    async def autenticar_usuario(self, email: str, senha: str) -> Optional[Usuario]:
         try:
             print(f"🔐 Tentando autenticar: {email}")
             
-            usuario = self.db.query(Usuario).filter(
-                Usuario.email == email.lower().strip(),
-                Usuario.status_conta == 'ativo'
-            ).first()
+            usuario = await run_in_threadpool(self._obter_usuario_ativo, email)
             
             if not usuario:
                 print("❌ Usuário não encontrado ou inativo")
@@ -131,7 +172,7 @@ class AuthService:
             print(f"✅ Usuário encontrado: {usuario.nome}")
             print(f"🔑 Verificando senha...")
             
-            senha_correta = verify_password(senha, usuario.senha_hash) # type: ignore
+            senha_correta = await verify_password_async(senha, usuario.senha_hash) # type: ignore
             print(f"Senha correta: {senha_correta}")
             
             if not senha_correta:
@@ -141,6 +182,8 @@ class AuthService:
             print(f"✅ Autenticação bem-sucedida para: {usuario.email}")
             return usuario
                 
+        except HashingBusyError:
+            raise
         except Exception as e:
             print(f"💥 Erro na autenticação: {str(e)}")
             return None
@@ -151,24 +194,19 @@ class AuthService:
         """
         try:
             # Verifica se usuário existe
-            usuario = self.db.query(Usuario).filter(
-                Usuario.email == email.lower().strip(),
-                Usuario.status_conta == 'ativo'
-            ).first()
+            usuario = self._obter_usuario_ativo(email)
             
             if not usuario:
                 return {"success": False, "mensagem": "Email não encontrado"}
             
-            # Gera token de recuperação usando TokenService
-            reset_token = self.token_service.create_password_reset_token(usuario.id_usuario) # type: ignore
-            
-            # Envia email usando EmailService
-            email_enviado = self.email_service.send_password_reset_email(email, reset_token.token) # type: ignore
-            
-            if not email_enviado:
-                return {"success": False, "mensagem": "Erro ao enviar email de recuperação"}
+            # Token e email na outbox na mesma transação
+            reset_token = self.token_service.create_password_reset_token(usuario.id_usuario, commit=False) # type: ignore
+            self.email_service.enqueue_password_reset_email(self.db, email, reset_token.token) # type: ignore
+            self.db.commit()
             
-            print(f"📧 Email de recuperação enviado para {email}")
+            # Envio assíncrono pelo worker da outbox
+            email_outbox_task.trigger()
+            print(f"📧 Email de recuperação enfileirado para {email}")
             
             return {
                 "success": True, 
@@ -180,21 +218,19 @@ class AuthService:
             print(f"Erro ao enviar email de recuperação: {str(e)}")
             return {"success": False, "mensagem": f"Erro ao enviar email de recuperação: {str(e)}"}
 
-    def redefinir_senha(self, token: str, nova_senha: str) -> Dict[str, Any]:
+    async def redefinir_senha(self, token: str, nova_senha: str) -> Dict[str, Any]:
         """
         Redefine a senha do usuário usando token de recuperação
         """
         try:
             # Verifica token usando TokenService
-            reset_token = self.token_service.verify_password_reset_token(token)
+            reset_token = await run_in_threadpool(self.token_service.verify_password_reset_token, token)
             
             if not reset_token:
                 return {"success": False, "mensagem": "Token inválido ou expirado"}
             
             # Busca usuário
-            usuario = self.db.query(Usuario).filter(
-                Usuario.id_usuario == reset_token.user_id
-            ).first()
+            usuario = await run_in_threadpool(self._obter_usuario_por_id, reset_token.user_id) # type: ignore
             
             if not usuario:
                 return {"success": False, "mensagem": "Usuário não encontrado"}
@@ -204,13 +240,10 @@ class AuthService:
             if not validacao_senha["success"]:
                 return validacao_senha
             
-            # Atualiza senha
-            usuario.senha_hash = get_password_hash(nova_senha) # type: ignore
-            
-            # Marca token como usado
-            self.token_service.use_password_reset_token(token)
-            
-            self.db.commit()
+            # Atualiza senha e marca token como usado
+            senha_hash = await get_password_hash_async(nova_senha)
+            await run_in_threadpool(self._salvar_senha_redefinida, usuario, senha_hash, token)
+            await perfil_cache.invalidate(usuario.id_usuario)
             
             print(f"✅ Senha redefinida para usuário: {usuario.email}")
             
@@ -219,11 +252,22 @@ class AuthService:
                 "mensagem": "Senha redefinida com sucesso"
             }
             
+        except HashingBusyError:
+            raise
         except Exception as e:
-            self.db.rollback()
+            await run_in_threadpool(self.db.rollback)
             print(f"Erro ao redefinir senha: {str(e)}")
             return {"success": False, "mensagem": f"Erro ao redefinir senha: {str(e)}"}
 
+    def _salvar_senha_redefinida(self, usuario: Usuario, senha_hash: str, token: str) -> None:
+        usuario.senha_hash = senha_hash # type: ignore
+        self.token_service.use_password_reset_token(token)
+        self.db.commit()
+
+    def _salvar_senha(self, usuario: Usuario, senha_hash: str) -> None:
+        usuario.senha_hash = senha_hash # type: ignore
+        self.db.commit()
+
     def _gerar_token_recuperacao(self, length: int = 32) -> str:
         """
         Gera token aleatório para recuperação de senha
@@ -231,20 +275,18 @@ class AuthService:
         caracteres = string.ascii_letters + string.digits
         return ''.join(secrets.choice(caracteres) for _ in range(length))
 
-    def alterar_senha(self, id_usuario: int, senha_atual: str, nova_senha: str) -> Dict[str, Any]:
+    async def alterar_senha(self, id_usuario: int, senha_atual: str, nova_senha: str) -> Dict[str, Any]:
         """
         Altera senha do usuário logado
         """
         try:
-            usuario = self.db.query(Usuario).filter(
-                Usuario.id_usuario == id_usuario
-            ).first()
+            usuario = await run_in_threadpool(self._obter_usuario_por_id, id_usuario)
             
             if not usuario:
                 return {"success": False, "mensagem": "Usuário não encontrado"}
             
             # Verifica senha atual
-            if not verify_password(senha_atual, usuario.senha_hash): # type: ignore
+            if not await verify_password_async(senha_atual, usuario.senha_hash): # type: ignore
                 return {"success": False, "mensagem": "Senha atual incorreta"}
             
             # Valida nova senha
@@ -253,15 +295,18 @@ class AuthService:
                 return validacao_senha
             
             # Atualiza senha
-            usuario.senha_hash = get_password_hash(nova_senha) # type: ignore
-            self.db.commit()
+            senha_hash = await get_password_hash_async(nova_senha)
+            await run_in_threadpool(self._salvar_senha, usuario, senha_hash)
+            await perfil_cache.invalidate(id_usuario)
             
             return {
                 "success": True,
                 "mensagem": "Senha alterada com sucesso"
             }
             
+        except HashingBusyError:
+            raise
         except Exception as e:
-            self.db.rollback()
+            await run_in_threadpool(self.db.rollback)
             print(f"Erro ao alterar senha: {str(e)}")
             return {"success": False, "mensagem": f"Erro ao alterar senha: {str(e)}"}
\ No newline at end of file
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+import logging
+import time
+
+from sqlalchemy import select, delete, or_
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.database import SessionLocal
+from models.auth import AdminSession, RefreshToken, PasswordResetToken, TokenRecuperacao
+from models.importacao import ImportacaoJob
+
+logger = logging.getLogger(__name__)
+
+class TokenCleanupService:
+    """
+    Remove tokens e sessões expirados/usados em pequenos lotes por chave primária,
+    para não segurar locks longos nas tabelas
+    """
+
+    def __init__(self, db: Session, chunk_size: Optional[int] = None):
+        self.db = db
+        self.chunk_size = chunk_size or settings.CLEANUP_CHUNK_SIZE
+
+    def _delete_in_chunks(self, model, pk_column, condition) -> int:
+        total = 0
+        while True:
+            ids = self.db.scalars(
+                select(pk_column).where(condition).order_by(pk_column).limit(self.chunk_size)
+            ).all()
+            if not ids:
+                break
+
+            self.db.execute(
+                delete(model).where(pk_column.in_(ids)),
+                execution_options={"synchronize_session": False},
+            )
+            self.db.commit()
+            total += len(ids)
+
+            if len(ids) < self.chunk_size:
+                break
+        return total
+
+    def limpar_sessoes_admin(self) -> int:
+        agora = datetime.utcnow()
+        return self._delete_in_chunks(
+            AdminSession, AdminSession.id,
+            or_(AdminSession.expires_at < agora, AdminSession.is_used == True)
+        )
+
+    def limpar_refresh_tokens(self) -> int:
+        # Tokens usados (não revogados) ficam até expirar para a detecção de reuso
+        agora = datetime.utcnow()
+        return self._delete_in_chunks(
+            RefreshToken, RefreshToken.id,
+            or_(RefreshToken.expires_at < agora, RefreshToken.is_revoked == True)
+        )
+
+    def limpar_tokens_reset(self) -> int:
+        agora = datetime.utcnow()
+        return self._delete_in_chunks(
+            PasswordResetToken, PasswordResetToken.id,
+            or_(PasswordResetToken.expires_at < agora, PasswordResetToken.is_used == True)
+        )
+
+    def limpar_tokens_recuperacao(self) -> int:
+        agora = datetime.utcnow()
+        return self._delete_in_chunks(
+            TokenRecuperacao, TokenRecuperacao.id_token,
+            or_(TokenRecuperacao.data_expiracao < agora, TokenRecuperacao.utilizado == True)
+        )
+
+    def limpar_importacoes(self) -> int:
+        # Só jobs finalizados; os em andamento continuam consultáveis
+        limite = datetime.utcnow() - timedelta(days=settings.IMPORT_JOB_RETENTION_DAYS)
+        return self._delete_in_chunks(
+            ImportacaoJob, ImportacaoJob.id,
+            ImportacaoJob.finalizado_em < limite
+        )
+
+    def limpar_tudo(self) -> Dict[str, Any]:
+        """
+        Executa a limpeza em todas as tabelas e retorna linhas removidas e duração
+        """
+        inicio = time.perf_counter()
+        removidos = {
+            "admin_sessions": self.limpar_sessoes_admin(),
+            "refresh_tokens": self.limpar_refresh_tokens(),
+            "password_reset_tokens": self.limpar_tokens_reset(),
+            "tokens_recuperacao": self.limpar_tokens_recuperacao(),
+            "importacao_jobs": self.limpar_importacoes(),
+        }
+        return {
+            "removidos": removidos,
+            "total": sum(removidos.values()),
+            "duracao_ms": round((time.perf_counter() - inicio) * 1000, 2),
+            "executado_em": datetime.utcnow(),
+        }
+
+# Resultado da última execução (exposto no /health)
+ultima_limpeza: Dict[str, Any] = {}
+
+def executar_limpeza() -> Dict[str, Any]:
+    """
+    Ponto de entrada do janitor: abre sessão própria e registra o resultado
+    """
+    db = SessionLocal()
+    try:
+        resultado = TokenCleanupService(db).limpar_tudo()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    ultima_limpeza.clear()
+    ultima_limpeza.update(resultado)
+    logger.info(
+        f"🧹 Limpeza de tokens: {resultado['total']} linha(s) removida(s) "
+        f"em {resultado['duracao_ms']} ms {resultado['removidos']}"
+    )
+    return resultado
@@ -1,64 +1,83 @@
 import smtplib
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, update
 from core.config import settings
- 
+from core.background import PeriodicTask
+from core.metrics import SMTP_SEND_DURATION, SMTP_SEND_FAILURES
+from core.database import SessionLocal
+from models.email import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
 class EmailService:
     def __init__(self):
         self.smtp_server = settings.SMTP_SERVER
         self.smtp_port = settings.SMTP_PORT
         self.smtp_username = settings.SMTP_USERNAME
         self.smtp_password = settings.SMTP_PASSWORD
-    
-    def send_password_reset_email(self, to_email: str, reset_token: str) -> bool:
-        try:
-            subject = "Redefinição de Senha - UPath"
-            reset_url = f"http://localhost:5173/reset-password?token={reset_token}"
-            
-            body = f"""
+
+    def _password_reset_message(self, reset_token: str) -> Tuple[str, str]:
+        subject = "Redefinição de Senha - UPath"
+        reset_url = f"http://localhost:5173/reset-password?token={reset_token}"
+
+        body = f"""
             Olá,
-            
+
             Você solicitou a redefinição de sua senha no UPath.
             Clique no link abaixo para criar uma nova senha:
-            
+
             {reset_url}
-            
+
             Este link expira em 1 hora.
-            
+
             Se você não solicitou esta redefinição, ignore este email.
-            
+
             Atenciosamente,
             Equipe UPath
             """
-            
-            return self.send_email(to_email, subject, body)
-        except Exception as e:
-            print(f"Erro ao enviar email de recuperação: {e}")
-            return False
-    
-    def send_admin_pin_email(self, to_email: str, pin_code: str) -> bool:
-        try:
-            subject = "Código de Verificação - UPath Admin"
-            body = f"""
+        return subject, body
+
+    def _admin_pin_message(self, pin_code: str) -> Tuple[str, str]:
+        subject = "Código de Verificação - UPath Admin"
+        body = f"""
             Prezado Administrador,
-            
+
             Seu código de verificação para acesso administrativo é:
-            
+
             {pin_code}
-            
+
             Este código expira em 10 minutos.
-            
+
             Não compartilhe este código com ninguém.
-            
+
             Atenciosamente,
             Sistema UPath
             """
-            
+        return subject, body
+
+    def send_password_reset_email(self, to_email: str, reset_token: str) -> bool:
+        try:
+            subject, body = self._password_reset_message(reset_token)
+            return self.send_email(to_email, subject, body)
+        except Exception as e:
+            print(f"Erro ao enviar email de recuperação: {e}")
+            return False
+
+    def send_admin_pin_email(self, to_email: str, pin_code: str) -> bool:
+        try:
+            subject, body = self._admin_pin_message(pin_code)
             return self.send_email(to_email, subject, body)
         except Exception as e:
             print(f"Erro ao enviar email de PIN: {e}")
             return False
-    
+
     def send_account_locked_email(self, to_email: str, admin_name: str) -> bool:
         """
         Envia email quando conta é bloqueada por administrador
@@ -67,20 +86,20 @@ class EmailService:
             subject = "Conta Bloqueada - UPath"
             body = f"""
             Prezado usuário,
-            
+
             Sua conta no UPath foi bloqueada por um administrador.
-            
+
             Se você acredita que isso foi um erro, entre em contato com o suporte.
-            
+
             Atenciosamente,
             Equipe UPath
             """
-            
+
             return self.send_email(to_email, subject, body)
         except Exception as e:
             print(f"Erro ao enviar email de conta bloqueada: {e}")
             return False
-    
+
     def send_account_deleted_email(self, to_email: str) -> bool:
         """
         Envia email quando conta é excluída por administrador
@@ -89,38 +108,271 @@ class EmailService:
             subject = "Conta Excluída - UPath"
             body = f"""
             Prezado usuário,
-            
+
             Sua conta no UPath foi excluída por um administrador.
-            
+
             Se você acredita que isso foi um erro, entre em contato com o suporte.
-            
+
             Atenciosamente,
             Equipe UPath
             """
-            
+
             return self.send_email(to_email, subject, body)
         except Exception as e:
             print(f"Erro ao enviar email de conta excluída: {e}")
             return False
 
+    def build_message(self, to_email: str, subject: str, body: str) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg['From'] = self.smtp_username
+        msg['To'] = to_email
+        msg['Subject'] = subject
+
+        msg.attach(MIMEText(body, 'plain'))
+        return msg
+
     def send_email(self, to_email: str, subject: str, body: str) -> bool:
+        """
+        Envio síncrono imediato. Fluxos de requisição devem usar enqueue_email.
+        """
         try:
-            msg = MIMEMultipart()
-            msg['From'] = self.smtp_username
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            msg.attach(MIMEText(body, 'plain'))
-            
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_username, self.smtp_password)
-            text = msg.as_string()
-            server.sendmail(self.smtp_username, to_email, text)
-            server.quit()
-            
+            msg = self.build_message(to_email, subject, body)
+            smtp_connection.send(to_email, msg)
             print(f"✅ Email enviado para: {to_email}")
             return True
         except Exception as e:
+            smtp_connection.reset()
             print(f"Erro SMTP: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    # Outbox transacional
+
+    def enqueue_email(self, db, to_email: str, subject: str, body: str) -> EmailOutbox:
+        """
+        Grava o email na outbox na transação corrente (Session ou AsyncSession).
+        O commit fica com o chamador, junto com o token que originou o email.
+        """
+        mensagem = EmailOutbox(
+            destinatario=to_email,
+            assunto=subject,
+            corpo=body,
+            status='pendente',
+            tentativas=0,
+            proxima_tentativa_em=datetime.utcnow()
+        )
+        db.add(mensagem)
+        return mensagem
+
+    def enqueue_password_reset_email(self, db, to_email: str, reset_token: str) -> EmailOutbox:
+        subject, body = self._password_reset_message(reset_token)
+        return self.enqueue_email(db, to_email, subject, body)
+
+    def enqueue_admin_pin_email(self, db, to_email: str, pin_code: str) -> EmailOutbox:
+        subject, body = self._admin_pin_message(pin_code)
+        return self.enqueue_email(db, to_email, subject, body)
+
+class SMTPConnection:
+    """
+    Conexão SMTP autenticada reaproveitada entre envios.
+    Reconecta sob demanda e confere a conexão com NOOP após ociosidade.
+    """
+
+    def __init__(self):
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT_SECONDS)
+        if settings.SMTP_USE_TLS:
+            server.starttls()
+        if settings.SMTP_USERNAME and settings.SMTP_PASSWORD:
+            server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+        return server
+
+    def _ensure(self) -> smtplib.SMTP:
+        if self._server is not None and time.monotonic() - self._last_used > settings.SMTP_IDLE_CHECK_SECONDS:
+            try:
+                if self._server.noop()[0] != 250:
+                    self._close()
+            except smtplib.SMTPException:
+                self._close()
+            except OSError:
+                self._close()
+
+        if self._server is None:
+            self._server = self._connect()
+        return self._server
+
+    def send(self, to_email: str, msg: MIMEMultipart) -> None:
+        with self._lock:
+            inicio = time.perf_counter()
+            try:
+                server = self._ensure()
+                server.sendmail(settings.SMTP_USERNAME, to_email, msg.as_string())
+            except Exception as e:
+                SMTP_SEND_FAILURES.inc(type(e).__name__)
+                raise
+            finally:
+                SMTP_SEND_DURATION.observe(time.perf_counter() - inicio)
+            self._last_used = time.monotonic()
+
+    def _close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+    def reset(self) -> None:
+        """Descarta a conexão após erro; a próxima chamada reconecta"""
+        with self._lock:
+            self._close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+smtp_connection = SMTPConnection()
+
+# Erros que não melhoram com nova tentativa
+PERMANENT_SMTP_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)
+
+def _erro_permanente(e: Exception) -> bool:
+    # Respostas 5xx (ex.: SMTPDataError 550/554) são rejeições definitivas
+    if isinstance(e, PERMANENT_SMTP_ERRORS):
+        return True
+    return isinstance(e, smtplib.SMTPResponseException) and e.smtp_code >= 500
+
+class EmailOutboxWorker:
+    """
+    Drena a outbox em lotes pela conexão SMTP compartilhada,
+    com retry e backoff exponencial e dead-letter após o limite de tentativas.
+    As mensagens são reservadas (status 'enviando') e a transação é fechada
+    antes dos envios: nenhum lock de linha fica aberto durante o SMTP.
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, max_attempts: Optional[int] = None):
+        self.batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+        self.email_service = EmailService()
+
+    def _backoff(self, tentativas: int) -> timedelta:
+        segundos = min(
+            settings.EMAIL_OUTBOX_BACKOFF_BASE_SECONDS * (2 ** (tentativas - 1)),
+            settings.EMAIL_OUTBOX_BACKOFF_MAX_SECONDS
+        )
+        return timedelta(seconds=segundos * random.uniform(0.8, 1.2))
+
+    def _reservar(self) -> List[Dict[str, Any]]:
+        """
+        Reserva um lote (pendentes prontos ou reservas vencidas de um worker
+        que caiu) e faz commit; a reserva vale EMAIL_OUTBOX_CLAIM_SECONDS
+        """
+        db = SessionLocal()
+        try:
+            agora = datetime.utcnow()
+            mensagens = db.scalars(
+                select(EmailOutbox)
+                .where(
+                    EmailOutbox.status.in_(('pendente', 'enviando')),
+                    EmailOutbox.proxima_tentativa_em <= agora
+                )
+                .order_by(EmailOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            reservadas = []
+            for mensagem in mensagens:
+                mensagem.status = 'enviando' # type: ignore
+                mensagem.proxima_tentativa_em = agora + timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_SECONDS) # type: ignore
+                reservadas.append({
+                    "id": mensagem.id,
+                    "destinatario": mensagem.destinatario,
+                    "assunto": mensagem.assunto,
+                    "corpo": mensagem.corpo,
+                    "tentativas": mensagem.tentativas or 0,
+                })
+            db.commit()
+            return reservadas
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _enviar(self, mensagem: Dict[str, Any]) -> Dict[str, Any]:
+        """Envia fora de transação e devolve os campos a gravar na mensagem"""
+        try:
+            msg = self.email_service.build_message(mensagem["destinatario"], mensagem["assunto"], mensagem["corpo"])
+            smtp_connection.send(mensagem["destinatario"], msg)
+            return {"status": 'enviado', "enviado_em": datetime.utcnow()}
+        except Exception as e:
+            smtp_connection.reset()
+            tentativas = mensagem["tentativas"] + 1
+            campos: Dict[str, Any] = {"tentativas": tentativas, "ultimo_erro": str(e)[:500]}
+            if _erro_permanente(e) or tentativas >= self.max_attempts:
+                logger.error(f"📪 Email {mensagem['id']} para {mensagem['destinatario']} movido para dead-letter: {e}")
+                campos["status"] = 'morto'
+            else:
+                logger.warning(f"⚠️ Falha ao enviar email {mensagem['id']} (tentativa {tentativas}): {e}")
+                campos["status"] = 'pendente'
+                campos["proxima_tentativa_em"] = datetime.utcnow() + self._backoff(tentativas)
+            return campos
+
+    def processar_lote(self) -> Dict[str, int]:
+        """
+        Envia um lote de mensagens pendentes e devolve as contagens
+        """
+        resultado = {"enviados": 0, "reagendados": 0, "mortos": 0, "lidos": 0}
+        mensagens = self._reservar()
+        resultado["lidos"] = len(mensagens)
+        if not mensagens:
+            return resultado
+
+        desfechos = [(mensagem["id"], self._enviar(mensagem)) for mensagem in mensagens]
+
+        db = SessionLocal()
+        try:
+            for mensagem_id, campos in desfechos:
+                # Só grava se a reserva ainda é nossa (não expirou e foi retomada)
+                db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id == mensagem_id, EmailOutbox.status == 'enviando')
+                    .values(**campos)
+                )
+                chave = {"enviado": "enviados", "pendente": "reagendados", "morto": "mortos"}[campos["status"]]
+                resultado[chave] += 1
+            db.commit()
+            return resultado
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def drenar(self) -> Dict[str, Any]:
+        """
+        Processa lotes até esvaziar os pendentes prontos
+        """
+        total = {"enviados": 0, "reagendados": 0, "mortos": 0}
+        while True:
+            lote = self.processar_lote()
+            for chave in total:
+                total[chave] += lote[chave]
+            if lote["lidos"] < self.batch_size:
+                break
+        if any(total.values()):
+            logger.info(f"📬 Outbox de emails: {total}")
+        return total
+
+email_outbox_worker = EmailOutboxWorker()
+
+# Disparado pelas rotas após o commit (trigger) e periodicamente para retries
+email_outbox_task = PeriodicTask(
+    "outbox-emails",
+    settings.EMAIL_OUTBOX_INTERVAL_SECONDS,
+    email_outbox_worker.drenar,
+    run_on_stop=True,
+)
@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import func, select
+
+from core.config import settings
+from core.database import SessionLocal
+from models.admin import User, AccessHistory
+from models.auth import Usuario
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Tamanho aproximado de cada bloco enviado ao cliente
+CHUNK_BYTES = 64 * 1024
+
+def _serializar(valor: Any) -> Any:
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+class ExportService:
+    """
+    Exportações em streaming: cursor no servidor (stream_results + yield_per)
+    e blocos de NDJSON/CSV gerados sob demanda, com memória constante.
+    Os geradores são síncronos; o StreamingResponse os consome no threadpool.
+    """
+
+    def __init__(self, yield_per: Optional[int] = None):
+        self.yield_per = yield_per or settings.EXPORT_YIELD_PER
+
+    def _linhas(self, query) -> Iterator[Dict[str, Any]]:
+        # Sessão própria: a resposta continua depois que a rota retorna
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                query.execution_options(stream_results=True, yield_per=self.yield_per)
+            )
+            for linha in result.mappings():
+                yield linha
+        finally:
+            db.close()
+
+    def _gerar(self, query, colunas: Sequence[str], formato: str) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer) if formato == "csv" else None
+        if escritor:
+            # Cabeçalho enviado de imediato: o download começa antes da primeira linha
+            escritor.writerow(colunas)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+        total = 0
+        for linha in self._linhas(query):
+            valores = [_serializar(linha[c]) for c in colunas]
+            if escritor:
+                escritor.writerow(valores)
+            else:
+                buffer.write(json.dumps(dict(zip(colunas, valores)), ensure_ascii=False))
+                buffer.write("\n")
+            total += 1
+
+            if buffer.tell() >= CHUNK_BYTES:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+        logger.info(f"📤 Exportação concluída: {total} linhas ({formato})")
+
+    def exportar_usuarios(
+        self, formato: str, desde: Optional[datetime] = None, ate: Optional[datetime] = None
+    ) -> Iterator[bytes]:
+        """
+        Usuários (sem hash de senha), filtrados por data de cadastro
+        """
+        colunas: List[str] = ["id_usuario", "nome", "email", "status_conta", "data_cadastro", "ultimo_login"]
+        query = select(*(getattr(Usuario, c) for c in colunas)).order_by(Usuario.id_usuario)
+        if desde:
+            query = query.where(Usuario.data_cadastro >= desde)
+        if ate:
+            query = query.where(Usuario.data_cadastro < ate)
+        return self._gerar(query, colunas, formato)
+
+    def exportar_historico_acessos(
+        self, formato: str, desde: Optional[datetime] = None, ate: Optional[datetime] = None
+    ) -> Iterator[bytes]:
+        """
+        Histórico de acessos com o nome do usuário (join), filtrado por timestamp
+        """
+        colunas = ["id", "user_id", "id_usuario", "evento", "user_name", "ip", "timestamp"]
+        query = (
+            select(
+                AccessHistory.id,
+                AccessHistory.user_id,
+                AccessHistory.id_usuario,
+                AccessHistory.evento,
+                func.coalesce(User.name, Usuario.nome).label("user_name"),
+                AccessHistory.ip,
+                AccessHistory.timestamp,
+            )
+            .outerjoin(User, AccessHistory.user_id == User.id)
+            .outerjoin(Usuario, AccessHistory.id_usuario == Usuario.id_usuario)
+            .order_by(AccessHistory.id)
+        )
+        if desde:
+            query = query.where(AccessHistory.timestamp >= desde)
+        if ate:
+            query = query.where(AccessHistory.timestamp < ate)
+        return self._gerar(query, colunas, formato)
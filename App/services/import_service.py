@@ -0,0 +1,430 @@
+import asyncio
+import codecs
+import csv
+import datetime
+import json
+import logging
+import os
+import secrets
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+
+from email_validator import validate_email, EmailNotValidError
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from core.config import settings
+from core.database import SessionLocal
+from core.hashing import hashing_service, HashingBusyError
+from models.auth import Usuario, Perfil
+from models.importacao import ImportacaoJob
+from services.auth_service import AuthService
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("csv", "jsonl")
+
+class ImportacaoInvalidaError(Exception):
+    """Upload recusado antes de criar o job (formato ou tamanho)"""
+    pass
+
+@dataclass
+class ImportJob:
+    """
+    Estado de uma importação em massa, consultado pelo endpoint de progresso
+    """
+    id: str
+    formato: str
+    criado_por: Optional[str] = None
+    status: str = "pendente"  # pendente | processando | concluido | falhou
+    linhas_lidas: int = 0
+    importados: int = 0
+    rejeitados: int = 0
+    erros: List[Dict[str, Any]] = field(default_factory=list)
+    mensagem: Optional[str] = None
+    criado_em: datetime.datetime = field(default_factory=datetime.datetime.utcnow)
+    finalizado_em: Optional[datetime.datetime] = None
+
+    def registrar_erro(self, linha: int, email: Optional[str], mensagem: str) -> None:
+        self.rejeitados += 1
+        if len(self.erros) < settings.IMPORT_MAX_ERRORS_REPORTED:
+            self.erros.append({"linha": linha, "email": email, "mensagem": mensagem})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "formato": self.formato,
+            "status": self.status,
+            "linhas_lidas": self.linhas_lidas,
+            "importados": self.importados,
+            "rejeitados": self.rejeitados,
+            "erros": list(self.erros),
+            "erros_omitidos": max(0, self.rejeitados - len(self.erros)),
+            "mensagem": self.mensagem,
+            "criado_em": self.criado_em,
+            "finalizado_em": self.finalizado_em,
+        }
+
+    def to_row(self) -> ImportacaoJob:
+        return ImportacaoJob(
+            id=self.id,
+            formato=self.formato,
+            criado_por=self.criado_por,
+            status=self.status,
+            linhas_lidas=self.linhas_lidas,
+            importados=self.importados,
+            rejeitados=self.rejeitados,
+            erros=json.dumps(self.erros, ensure_ascii=False),
+            mensagem=self.mensagem,
+            criado_em=self.criado_em,
+            finalizado_em=self.finalizado_em,
+            atualizado_em=datetime.datetime.utcnow(),
+        )
+
+    @classmethod
+    def from_row(cls, row: ImportacaoJob) -> "ImportJob":
+        return cls(
+            id=row.id,
+            formato=row.formato,
+            criado_por=row.criado_por,
+            status=row.status,
+            linhas_lidas=row.linhas_lidas,
+            importados=row.importados,
+            rejeitados=row.rejeitados,
+            erros=json.loads(row.erros) if row.erros else [],
+            mensagem=row.mensagem,
+            criado_em=row.criado_em,
+            finalizado_em=row.finalizado_em,
+        )
+
+class ImportJobRegistry:
+    """
+    Estado dos jobs na tabela importacao_jobs (qualquer worker responde o
+    progresso); os jobs em execução neste processo ficam também em memória
+    e são drenados no shutdown
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, ImportJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _salvar(self, job: ImportJob) -> None:
+        db = SessionLocal()
+        try:
+            db.merge(job.to_row())
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _carregar(self, job_id: str) -> Optional[ImportJob]:
+        db = SessionLocal()
+        try:
+            row = db.get(ImportacaoJob, job_id)
+            return ImportJob.from_row(row) if row else None
+        finally:
+            db.close()
+
+    async def salvar(self, job: ImportJob) -> None:
+        await run_in_threadpool(self._salvar, job)
+
+    async def criar(self, formato: str, criado_por: Optional[str]) -> ImportJob:
+        job = ImportJob(id=secrets.token_hex(8), formato=formato, criado_por=criado_por)
+        await self.salvar(job)
+        return job
+
+    async def obter(self, job_id: str) -> Optional[ImportJob]:
+        # Job deste worker: progresso ao vivo, sem ir ao banco
+        job = self._jobs.get(job_id)
+        if job:
+            return job
+        return await run_in_threadpool(self._carregar, job_id)
+
+    def iniciar(self, job: ImportJob, caminho: str) -> None:
+        # Referência à task evita que ela seja coletada antes de terminar
+        task = asyncio.create_task(StudentImportService().executar(job, caminho), name=f"import-{job.id}")
+        self._jobs[job.id] = job
+        self._tasks[job.id] = task
+
+        def _fim(_):
+            self._jobs.pop(job.id, None)
+            self._tasks.pop(job.id, None)
+        task.add_done_callback(_fim)
+
+    def em_execucao(self) -> int:
+        return len(self._tasks)
+
+    async def encerrar(self, timeout: Optional[float] = None) -> None:
+        """
+        Shutdown: espera os jobs em execução por até IMPORT_DRAIN_SECONDS e
+        cancela os restantes (ficam como falhou no banco; lotes já gravados permanecem)
+        """
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return
+        timeout = settings.IMPORT_DRAIN_SECONDS if timeout is None else timeout
+        logger.info(f"⏳ Aguardando {len(tasks)} importação(ões) em andamento (até {timeout}s)")
+        _, pendentes = await asyncio.wait(tasks, timeout=timeout)
+        for task in pendentes:
+            task.cancel()
+        if pendentes:
+            await asyncio.gather(*pendentes, return_exceptions=True)
+            logger.warning(f"⚠️ {len(pendentes)} importação(ões) interrompida(s) no shutdown")
+
+import_jobs = ImportJobRegistry()
+
+def detectar_formato(formato: Optional[str], content_type: Optional[str]) -> str:
+    if formato:
+        formato = formato.lower()
+    elif content_type and ("ndjson" in content_type or "jsonl" in content_type):
+        formato = "jsonl"
+    else:
+        formato = "csv"
+
+    if formato not in FORMATOS:
+        raise ImportacaoInvalidaError(f"Formato não suportado: {formato}. Use csv ou jsonl")
+    return formato
+
+async def salvar_upload(chunks: AsyncIterator[bytes]) -> str:
+    """
+    Copia o corpo da requisição para um arquivo temporário, bloco a bloco,
+    respeitando IMPORT_MAX_BYTES. O job lê o arquivo depois da resposta.
+    """
+    fd, caminho = tempfile.mkstemp(prefix="upath-import-", suffix=".upload")
+    total = 0
+    try:
+        with os.fdopen(fd, "wb") as arquivo:
+            async for chunk in chunks:
+                total += len(chunk)
+                if total > settings.IMPORT_MAX_BYTES:
+                    raise ImportacaoInvalidaError(
+                        f"Arquivo excede o limite de {settings.IMPORT_MAX_BYTES} bytes"
+                    )
+                arquivo.write(chunk)
+        if total == 0:
+            raise ImportacaoInvalidaError("Arquivo vazio")
+        return caminho
+    except BaseException:
+        os.unlink(caminho)
+        raise
+
+def _ler_linhas(caminho: str, formato: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    (número da linha, registro) sem carregar o arquivo inteiro na memória
+    """
+    with open(caminho, "rb") as bruto:
+        texto = codecs.getreader("utf-8-sig")(bruto, errors="replace")
+        if formato == "csv":
+            leitor = csv.DictReader(texto)
+            for registro in leitor:
+                yield leitor.line_num, {k.strip().lower(): v for k, v in registro.items() if k}
+        else:
+            for numero, linha in enumerate(texto, start=1):
+                if not linha.strip():
+                    continue
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    registro = None
+                yield numero, registro if isinstance(registro, dict) else {"__invalido__": True}
+
+class StudentImportService:
+    """
+    Importação em lotes: validação com as regras do cadastro, bcrypt em
+    paralelo no pool de hashing e INSERTs multi-linha de usuarios e perfis
+    """
+
+    def __init__(self, batch_size: Optional[int] = None):
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.hash_concurrency = (
+            settings.IMPORT_HASH_CONCURRENCY or max(1, hashing_service.max_workers // 2)
+        )
+
+    def _validar(self, job: ImportJob, numero: int, registro: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        if registro.get("__invalido__"):
+            job.registrar_erro(numero, None, "Linha não é um objeto JSON válido")
+            return None
+
+        nome = str(registro.get("nome") or "").strip()
+        email = str(registro.get("email") or "").lower().strip()
+        senha = str(registro.get("senha") or "")
+
+        if not nome or not email or not senha:
+            job.registrar_erro(numero, email or None, "Campos obrigatórios: nome, email, senha")
+            return None
+
+        validacao = AuthService.validar_nome(nome)
+        if not validacao["success"]:
+            job.registrar_erro(numero, email, validacao["mensagem"])
+            return None
+
+        try:
+            validate_email(email, check_deliverability=False)
+        except EmailNotValidError:
+            job.registrar_erro(numero, email, "Email inválido")
+            return None
+
+        validacao = AuthService.validar_senha(senha)
+        if not validacao["success"]:
+            job.registrar_erro(numero, email, validacao["mensagem"])
+            return None
+
+        return {"linha": numero, "nome": nome, "email": email, "senha": senha} # type: ignore
+
+    def _emails_existentes(self, emails: List[str]) -> Set[str]:
+        db = SessionLocal()
+        try:
+            return set(db.scalars(select(Usuario.email).where(Usuario.email.in_(emails))).all())
+        finally:
+            db.close()
+
+    def _inserir_lote(self, linhas: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        INSERT multi-linha de usuarios e depois de perfis, em uma transação.
+        Retorna email -> id_usuario dos inseridos.
+        """
+        agora = datetime.datetime.utcnow()
+        db = SessionLocal()
+        try:
+            db.execute(insert(Usuario), [
+                {
+                    "nome": l["nome"],
+                    "email": l["email"],
+                    "senha_hash": l["senha_hash"],
+                    "data_cadastro": agora,
+                    "status_conta": "ativo",
+                } for l in linhas
+            ])
+            ids = dict(db.execute(
+                select(Usuario.email, Usuario.id_usuario)
+                .where(Usuario.email.in_([l["email"] for l in linhas]))
+            ).all())
+            db.execute(insert(Perfil), [
+                {"id_usuario": ids[l["email"]], "nivel_acesso": "estudante"} for l in linhas
+            ])
+            db.commit()
+            return ids
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _hash(self, senha: str, limite: asyncio.Semaphore) -> str:
+        async with limite:
+            for tentativa in range(3):
+                try:
+                    return await hashing_service.hash(senha)
+                except HashingBusyError:
+                    # Pool ocupado com logins: recua e tenta de novo
+                    await asyncio.sleep(1 + tentativa)
+            return await hashing_service.hash(senha)
+
+    async def _processar_lote(self, job: ImportJob, lote: List[Dict[str, Any]], vistos: Set[str]) -> None:
+        # Duplicados no próprio arquivo e já cadastrados
+        unicos = []
+        for linha in lote:
+            if linha["email"] in vistos:
+                job.registrar_erro(linha["linha"], linha["email"], "Email duplicado no arquivo")
+            else:
+                vistos.add(linha["email"])
+                unicos.append(linha)
+        if not unicos:
+            return
+
+        existentes = await run_in_threadpool(self._emails_existentes, [l["email"] for l in unicos])
+        novos = []
+        for linha in unicos:
+            if linha["email"] in existentes:
+                job.registrar_erro(linha["linha"], linha["email"], "Email já cadastrado")
+            else:
+                novos.append(linha)
+        if not novos:
+            return
+
+        limite = asyncio.Semaphore(self.hash_concurrency)
+        hashes = await asyncio.gather(*(self._hash(l["senha"], limite) for l in novos))
+        for linha, senha_hash in zip(novos, hashes):
+            linha["senha_hash"] = senha_hash
+            linha.pop("senha")
+
+        try:
+            ids = await run_in_threadpool(self._inserir_lote, novos)
+        except IntegrityError:
+            # Corrida com cadastros simultâneos: refaz sem os emails que passaram a existir
+            existentes = await run_in_threadpool(self._emails_existentes, [l["email"] for l in novos])
+            restantes = []
+            for linha in novos:
+                if linha["email"] in existentes:
+                    job.registrar_erro(linha["linha"], linha["email"], "Email já cadastrado")
+                else:
+                    restantes.append(linha)
+            ids = await run_in_threadpool(self._inserir_lote, restantes) if restantes else {}
+
+        job.importados += len(ids)
+
+    def _proximo_lote(
+        self, job: ImportJob, linhas: Iterator[Tuple[int, Dict[str, Any]]]
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Lê e valida no threadpool até completar um lote (ou ler dez lotes de
+        linhas, para o progresso andar mesmo com muitas rejeições).
+        Retorna (lote, fim do arquivo).
+        """
+        lote: List[Dict[str, Any]] = []
+        for _ in range(self.batch_size * 10):
+            try:
+                numero, registro = next(linhas)
+            except StopIteration:
+                return lote, True
+            job.linhas_lidas += 1
+            linha = self._validar(job, numero, registro)
+            if linha:
+                lote.append(linha)
+                if len(lote) >= self.batch_size:
+                    break
+        return lote, False
+
+    async def executar(self, job: ImportJob, caminho: str) -> None:
+        job.status = "processando"
+        logger.info(f"📥 Importação {job.id} iniciada ({job.formato})")
+        vistos: Set[str] = set()
+        linhas = _ler_linhas(caminho, job.formato)
+        try:
+            await import_jobs.salvar(job)
+            fim = False
+            while not fim:
+                lote, fim = await run_in_threadpool(self._proximo_lote, job, linhas)
+                if lote:
+                    await self._processar_lote(job, lote, vistos)
+                # Progresso visível aos outros workers a cada lote
+                await import_jobs.salvar(job)
+
+            job.status = "concluido"
+            logger.info(
+                f"✅ Importação {job.id} concluída: {job.importados} importados, {job.rejeitados} rejeitados"
+            )
+        except asyncio.CancelledError:
+            # Shutdown no meio do job: lotes já commitados permanecem
+            job.status = "falhou"
+            job.mensagem = "Importação interrompida"
+            raise
+        except Exception as e:
+            job.status = "falhou"
+            job.mensagem = str(e)[:500]
+            logger.error(f"❌ Importação {job.id} falhou: {e}")
+        finally:
+            job.finalizado_em = datetime.datetime.utcnow()
+            linhas.close()
+            try:
+                os.unlink(caminho)
+            except OSError:
+                pass
+            try:
+                await import_jobs.salvar(job)
+            except Exception as e:
+                logger.error(f"❌ Falha ao gravar o estado final da importação {job.id}: {e}")
@@ -0,0 +1,219 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.pagination import encode_cursor, decode_cursor
+from models.noticia import Noticia
+
+logger = logging.getLogger(__name__)
+
+# Páginas memorizadas por (cursor, limite) entre duas recargas do feed
+MAX_PAGINAS_MEMORIZADAS = 256
+
+@dataclass(frozen=True)
+class PaginaFeed:
+    corpo: bytes
+    etag: str
+
+def noticia_para_dict(noticia: Noticia) -> Dict[str, Any]:
+    return {
+        "id": noticia.id,
+        "titulo": noticia.titulo,
+        "descricao": noticia.descricao,
+        "imagem": noticia.imagem,
+        "link": noticia.link,
+        "publicada_em": noticia.publicada_em.isoformat() if noticia.publicada_em else None, # type: ignore
+    }
+
+class FeedNoticias:
+    """
+    Feed de notícias publicado mantido em memória já serializado: cada item
+    vira bytes JSON na recarga e as páginas são montadas por concatenação,
+    com ETag calculado uma vez por página. Cada worker confere a assinatura
+    do banco (contagem + última alteração) a cada NOTICIAS_FEED_CHECK_SECONDS
+    e só recarrega quando ela muda.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Single-flight: uma verificação/recarga por vez no worker
+        self._recarga = threading.Lock()
+        self._itens: List[Dict[str, Any]] = []
+        self._itens_json: List[bytes] = []
+        # Chaves (publicada_em, id) negadas: ordem crescente para o bisect
+        self._chaves: List[Tuple[float, int]] = []
+        self._cursores: List[str] = []
+        self._paginas: Dict[Tuple[Optional[str], int], PaginaFeed] = {}
+        self._assinatura: Optional[Tuple[int, Optional[datetime]]] = None
+        self._carregado_em = 0.0
+        self._verificado_em = 0.0
+        self.recargas = 0
+        self.verificacoes = 0
+
+    def _precisa_verificar(self) -> bool:
+        agora = time.monotonic()
+        return (
+            self._assinatura is None
+            or agora - self._verificado_em >= settings.NOTICIAS_FEED_CHECK_SECONDS
+            or agora - self._carregado_em >= settings.NOTICIAS_FEED_MAX_AGE_SECONDS
+        )
+
+    def _sincronizar(self, db: Session) -> None:
+        assinatura = tuple(db.execute(
+            select(func.count(Noticia.id), func.max(Noticia.atualizada_em))
+        ).one())
+        with self._lock:
+            self.verificacoes += 1
+            self._verificado_em = time.monotonic()
+            expirado = time.monotonic() - self._carregado_em >= settings.NOTICIAS_FEED_MAX_AGE_SECONDS
+            if assinatura == self._assinatura and not expirado:
+                return
+
+        noticias = db.scalars(
+            select(Noticia)
+            .where(Noticia.publicada == True)
+            .order_by(Noticia.publicada_em.desc(), Noticia.id.desc())
+            .limit(settings.NOTICIAS_FEED_MAX_ITENS)
+        ).all()
+        itens = [noticia_para_dict(n) for n in noticias]
+
+        with self._lock:
+            self._itens = itens
+            self._itens_json = [
+                json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8") for item in itens
+            ]
+            self._chaves = [(-n.publicada_em.timestamp(), -n.id) for n in noticias] # type: ignore
+            self._cursores = [encode_cursor(n.publicada_em, n.id) for n in noticias] # type: ignore
+            self._paginas = {}
+            self._assinatura = assinatura # type: ignore
+            self._carregado_em = time.monotonic()
+            self.recargas += 1
+        logger.info(f"📰 Feed de notícias recarregado: {len(itens)} itens")
+
+    def sincronizar(self, db: Session) -> None:
+        if not self._precisa_verificar():
+            return
+        # Com o feed carregado, quem chega durante uma recarga serve a versão atual;
+        # sem ele (primeira leitura ou invalidado), espera a recarga em andamento
+        if not self._recarga.acquire(blocking=self._assinatura is None):
+            return
+        try:
+            if self._precisa_verificar():
+                self._sincronizar(db)
+        finally:
+            self._recarga.release()
+
+    async def sincronizar_async(self, db: AsyncSession) -> None:
+        if not self._precisa_verificar():
+            return
+        # run_sync roda no event loop: a espera cede a vez em vez de bloquear no lock
+        while not self._recarga.acquire(blocking=False):
+            if self._assinatura is not None:
+                return
+            await asyncio.sleep(0.01)
+        try:
+            if self._precisa_verificar():
+                await db.run_sync(self._sincronizar)
+        finally:
+            self._recarga.release()
+
+    def invalidar(self) -> None:
+        """Força recarga na próxima leitura (chamado após editar notícias)"""
+        with self._lock:
+            self._assinatura = None
+
+    def _montar_pagina(self, inicio: int, limite: int) -> PaginaFeed:
+        fim = min(inicio + limite, len(self._itens_json))
+        proximo = self._cursores[fim - 1] if fim < len(self._itens_json) and fim > inicio else None
+        corpo = b"".join((
+            b'{"success":true,"data":{"noticias":[',
+            b",".join(self._itens_json[inicio:fim]),
+            b'],"next_cursor":',
+            json.dumps(proximo).encode(),
+            b"}}",
+        ))
+        return PaginaFeed(corpo, f'"{hashlib.sha1(corpo).hexdigest()[:20]}"')
+
+    def pagina(self, cursor: Optional[str], limite: int) -> PaginaFeed:
+        """
+        Página já serializada (resposta completa). Levanta ValueError para cursor inválido.
+        """
+        chave = (cursor, limite)
+        with self._lock:
+            pagina = self._paginas.get(chave)
+            if pagina is not None:
+                return pagina
+
+            inicio = 0
+            if cursor:
+                timestamp, noticia_id = decode_cursor(cursor)
+                inicio = bisect.bisect_right(self._chaves, (-timestamp.timestamp(), -noticia_id))
+            pagina = self._montar_pagina(inicio, limite)
+            if len(self._paginas) < MAX_PAGINAS_MEMORIZADAS:
+                self._paginas[chave] = pagina
+            return pagina
+
+    def destaques(self, limite: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Primeiras notícias do feed, para a home"""
+        with self._lock:
+            return [dict(item) for item in self._itens[:limite or settings.NOTICIAS_HOME_LIMITE]]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "itens": len(self._itens),
+                "paginas_memorizadas": len(self._paginas),
+                "recargas": self.recargas,
+                "verificacoes": self.verificacoes,
+            }
+
+feed_noticias = FeedNoticias()
+
+class NoticiaService:
+    """
+    Edição de notícias (admin). Toda alteração invalida o feed do worker;
+    os demais percebem pela assinatura na próxima verificação.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def criar(self, dados: Dict[str, Any], criado_por: Optional[str]) -> Dict[str, Any]:
+        noticia = Noticia(**dados, criado_por=criado_por)
+        self.db.add(noticia)
+        await self.db.commit()
+        await self.db.refresh(noticia)
+        feed_noticias.invalidar()
+        return noticia_para_dict(noticia)
+
+    async def atualizar(self, noticia_id: int, dados: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        noticia = await self.db.get(Noticia, noticia_id)
+        if not noticia:
+            return None
+        for campo, valor in dados.items():
+            setattr(noticia, campo, valor)
+        await self.db.commit()
+        await self.db.refresh(noticia)
+        feed_noticias.invalidar()
+        return noticia_para_dict(noticia)
+
+    async def remover(self, noticia_id: int) -> bool:
+        noticia = await self.db.get(Noticia, noticia_id)
+        if not noticia:
+            return False
+        await self.db.delete(noticia)
+        await self.db.commit()
+        feed_noticias.invalidar()
+        return True
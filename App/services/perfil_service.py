@@ -1,8 +1,42 @@
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
 from models.auth import Usuario
 from schemas.perfil_schemas import UserProfileUpdate, PasswordUpdate
-from core.security import verify_password, get_password_hash
+from core.config import settings
+from core.cache import Cache
+from core.security import verify_password_async, get_password_hash_async
+from services.noticia_service import feed_noticias
+
+# Perfis lidos por /me e /home; invalidado em toda escrita no usuário
+perfil_cache = Cache("perfil", settings.PROFILE_CACHE_TTL_SECONDS)
+
+def perfil_para_dict(user: Usuario) -> Dict[str, Any]:
+    """
+    Campos do perfil que vão para o cache (nunca o hash da senha)
+    """
+    return {
+        "id_usuario": user.id_usuario,
+        "nome": user.nome,
+        "email": user.email,
+        "foto_url": user.foto_url,
+        "versao": user.versao,
+    }
+
+def montar_dados_home(perfil: Optional[Dict[str, Any]], noticias: List[Dict[str, Any]]) -> dict:
+    """
+    Payload da home do estudante (compartilhado pelas versões sync e async)
+    """
+    if not perfil:
+        return {}
+    
+    return {
+        "nome": perfil["nome"],
+        "imagem": perfil.get("foto_url"),
+        "noticias": noticias
+    }
 
 class UserService:
     def __init__(self, db: Session):
@@ -23,43 +57,90 @@ class UserService:
         
         self.db.commit()
         self.db.refresh(user)
+        perfil_cache.invalidate_sync(user_id)
         return user
     
-    def update_password(self, user_id: int, password_data: PasswordUpdate) -> bool:
-        user = self.db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
+    async def update_password(self, user_id: int, password_data: PasswordUpdate) -> bool:
+        # Session síncrona: consulta e commit no threadpool, fora do event loop
+        user = await run_in_threadpool(self.get_user_profile, user_id)
         if not user:
             return False
         
         # Usar setattr para evitar problemas de tipo com SQLAlchemy
-        if not verify_password(password_data.current_password, str(user.senha_hash)):
+        if not await verify_password_async(password_data.current_password, str(user.senha_hash)):
             return False
         
-        user.senha_hash = get_password_hash(password_data.new_password)  # type: ignore
-        self.db.commit()
+        user.senha_hash = await get_password_hash_async(password_data.new_password)  # type: ignore
+        await run_in_threadpool(self.db.commit)
+        await perfil_cache.invalidate(user_id)
         return True
     
     def get_user_home_data(self, user_id: int) -> dict:
         user = self.get_user_profile(user_id)
+        feed_noticias.sincronizar(self.db)
+        return montar_dados_home(perfil_para_dict(user) if user else None, feed_noticias.destaques())
+
+class AsyncUserService:
+    """
+    Versão assíncrona do UserService, para rotas async com AsyncSession
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_user_profile(self, user_id: int) -> Optional[Usuario]:
+        return await self.db.get(Usuario, user_id)
+
+    async def versao_usuario(self, user_id: int) -> Optional[int]:
+        """Versão da linha, para o ETag (consulta só pela chave primária)"""
+        return await self.db.scalar(select(Usuario.versao).where(Usuario.id_usuario == user_id))
+
+    async def get_user_profile_cached(self, user_id: int, versao: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Perfil como dict, via cache read-through (PROFILE_CACHE_TTL_SECONDS).
+        Com `versao` (lida do banco), uma entrada de outra versão é recarregada:
+        a invalidação de outro worker pode não ter chegado a este cache.
+        """
+        async def carregar() -> Optional[Dict[str, Any]]:
+            user = await self.get_user_profile(user_id)
+            return perfil_para_dict(user) if user else None
+
+        perfil = await perfil_cache.get_or_load(user_id, carregar)
+        if perfil is not None and versao is not None and perfil.get("versao") != versao:
+            perfil = await carregar()
+            if perfil is not None:
+                await perfil_cache.set(user_id, perfil)
+        return perfil
+
+    async def update_user_profile(self, user_id: int, profile_data: UserProfileUpdate) -> Optional[Usuario]:
+        user = await self.db.get(Usuario, user_id)
+        if not user:
+            return None
+        
+        if profile_data.nome:
+            user.nome = profile_data.nome # type: ignore
+        if profile_data.foto_url:
+            user.foto_url = profile_data.foto_url # type: ignore
         
+        await self.db.commit()
+        await self.db.refresh(user)
+        await perfil_cache.invalidate(user_id)
+        return user
+
+    async def update_password(self, user_id: int, password_data: PasswordUpdate) -> bool:
+        user = await self.db.get(Usuario, user_id)
         if not user:
-            return {}
+            return False
         
-        # Cards de notícias (mock data - pode virar banco de dados depois)
-        news_cards = [
-            {
-                "titulo": "Inscrições Abertas para o PROUNI",
-                "descricao": "Prazo até 30/11 para inscrições no PROUNI 2024",
-                "imagem": "https://example.com/prouni.jpg"
-            },
-            {
-                "titulo": "Novas Bolsas em Tecnologia",
-                "descricao": "Empresas oferecem 500 bolsas em cursos de TI",
-                "imagem": "https://example.com/tech.jpg"
-            }
-        ]
+        if not await verify_password_async(password_data.current_password, str(user.senha_hash)):
+            return False
         
-        return {
-            "nome": user.nome,
-            "imagem": getattr(user, 'foto_url', None),
-            "noticias": news_cards
-        }
\ No newline at end of file
+        user.senha_hash = await get_password_hash_async(password_data.new_password)  # type: ignore
+        await self.db.commit()
+        await perfil_cache.invalidate(user_id)
+        return True
+
+    async def get_user_home_data(self, user_id: int) -> dict:
+        perfil = await self.get_user_profile_cached(user_id)
+        await feed_noticias.sincronizar_async(self.db)
+        return montar_dados_home(perfil, feed_noticias.destaques())
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from core.config import settings
+from core.cache import Cache
+
+logger = logging.getLogger(__name__)
+
+# Escala das respostas do teste vocacional (Likert)
+RESPOSTA_MIN = 1
+RESPOSTA_MAX = 5
+
+class ModeloIndisponivelError(Exception):
+    """Arquivo do modelo ausente ou inválido"""
+    pass
+
+class RespostasInvalidasError(ValueError):
+    pass
+
+class ModeloVocacional:
+    """
+    Artefato joblib carregado uma vez por worker, com mmap_mode="r": os
+    arrays do modelo ficam mapeados do disco e são compartilhados entre
+    processos pelo page cache.
+
+    Formato do artefato (ver ml/treinar_modelo.py):
+        {"modelo": estimador com predict_proba, "cursos": [...],
+         "n_respostas": int, "versao": str}
+    """
+
+    def __init__(self, caminho: Optional[str] = None):
+        self.caminho = caminho or settings.RECOMENDACAO_MODELO_PATH
+        self._artefato: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def carregar(self) -> Dict[str, Any]:
+        if self._artefato is None:
+            with self._lock:
+                if self._artefato is None:
+                    if not os.path.exists(self.caminho):
+                        raise ModeloIndisponivelError(f"Modelo não encontrado em {self.caminho}")
+                    import joblib
+
+                    inicio = time.perf_counter()
+                    artefato = joblib.load(self.caminho, mmap_mode="r")
+                    if not isinstance(artefato, dict) or "modelo" not in artefato:
+                        raise ModeloIndisponivelError("Artefato de modelo em formato inesperado")
+                    self._artefato = artefato
+                    logger.info(
+                        f"🧠 Modelo vocacional {artefato.get('versao', '?')} carregado em "
+                        f"{(time.perf_counter() - inicio) * 1000:.0f}ms ({len(artefato['cursos'])} cursos)"
+                    )
+        return self._artefato
+
+    @property
+    def carregado(self) -> bool:
+        return self._artefato is not None
+
+    @property
+    def cursos(self) -> List[str]:
+        return list(self.carregar()["cursos"])
+
+    @property
+    def n_respostas(self) -> int:
+        return int(self.carregar()["n_respostas"])
+
+    @property
+    def versao(self) -> str:
+        return str(self.carregar().get("versao", "desconhecida"))
+
+    def predict_proba(self, matriz: np.ndarray) -> np.ndarray:
+        return self.carregar()["modelo"].predict_proba(matriz)
+
+class MicroBatcher:
+    """
+    Agrupa chamadas concorrentes em uma única chamada vetorizada: o lote
+    sai ao atingir max_batch itens ou após max_wait_ms do primeiro pedido.
+    A função roda no threadpool para não bloquear o event loop.
+    """
+
+    def __init__(
+        self,
+        func: Callable[[np.ndarray], np.ndarray],
+        max_batch: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+    ):
+        self.func = func
+        self.max_batch = max_batch or settings.RECOMENDACAO_BATCH_MAX
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.RECOMENDACAO_BATCH_WAIT_MS) / 1000
+        self._pendentes: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Lotes em execução (referência até terminarem; aguardados no shutdown)
+        self._execucoes: Set[asyncio.Task] = set()
+
+        # Métricas
+        self.lotes = 0
+        self.itens = 0
+        self.maior_lote = 0
+
+    async def submit(self, vetor: np.ndarray) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Estado pertence ao event loop em execução
+            self._pendentes = []
+            self._timer = None
+            self._execucoes = set()
+            self._loop = loop
+
+        futuro = loop.create_future()
+        self._pendentes.append((vetor, futuro))
+
+        if len(self._pendentes) >= self.max_batch:
+            self._disparar()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._disparar)
+
+        return await futuro
+
+    def _disparar(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        lote, self._pendentes = self._pendentes[:self.max_batch], self._pendentes[self.max_batch:]
+        if self._pendentes:
+            assert self._loop is not None
+            self._timer = self._loop.call_later(self.max_wait, self._disparar)
+        if lote:
+            execucao = asyncio.ensure_future(self._executar(lote))
+            self._execucoes.add(execucao)
+            execucao.add_done_callback(self._execucoes.discard)
+
+    async def encerrar(self) -> None:
+        """
+        Shutdown: dispara os pedidos que esperavam o timer e aguarda os lotes em execução
+        """
+        while self._pendentes:
+            self._disparar()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._execucoes:
+            await asyncio.gather(*self._execucoes, return_exceptions=True)
+
+    async def _executar(self, lote: List[Tuple[np.ndarray, asyncio.Future]]) -> None:
+        self.lotes += 1
+        self.itens += len(lote)
+        self.maior_lote = max(self.maior_lote, len(lote))
+        try:
+            resultado = await run_in_threadpool(self.func, np.vstack([vetor for vetor, _ in lote]))
+        except Exception as e:
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+        for (_, futuro), linha in zip(lote, resultado):
+            if not futuro.done():
+                futuro.set_result(linha)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "lotes": self.lotes,
+            "itens": self.itens,
+            "media_por_lote": round(self.itens / self.lotes, 2) if self.lotes else 0.0,
+            "maior_lote": self.maior_lote,
+        }
+
+class RecomendacaoService:
+    """
+    Top-k cursos para um vetor de respostas do teste vocacional
+    """
+
+    def __init__(self, modelo: Optional[ModeloVocacional] = None):
+        self.modelo = modelo or ModeloVocacional()
+        self.batcher = MicroBatcher(self.modelo.predict_proba)
+        # Mesmo vetor de respostas -> mesmo ranking (chave inclui a versão do modelo)
+        self.cache = Cache("recomendacao", settings.RECOMENDACAO_CACHE_TTL_SECONDS)
+
+    def _validar(self, respostas: Sequence[int]) -> None:
+        esperado = self.modelo.n_respostas
+        if len(respostas) != esperado:
+            raise RespostasInvalidasError(f"O teste tem {esperado} perguntas; recebidas {len(respostas)} respostas")
+        if any(r < RESPOSTA_MIN or r > RESPOSTA_MAX for r in respostas):
+            raise RespostasInvalidasError(f"Respostas devem estar entre {RESPOSTA_MIN} e {RESPOSTA_MAX}")
+
+    async def _ranking(self, respostas: Sequence[int]) -> List[Dict[str, Any]]:
+        chave = f"{self.modelo.versao}:{','.join(map(str, respostas))}"
+
+        async def inferir() -> List[Dict[str, Any]]:
+            probabilidades = await self.batcher.submit(np.asarray(respostas, dtype=np.float32))
+            ordem = np.argsort(probabilidades)[::-1]
+            cursos = self.modelo.cursos
+            return [
+                {"curso": cursos[i], "probabilidade": round(float(probabilidades[i]), 4)}
+                for i in ordem
+            ]
+
+        return await self.cache.get_or_load(chave, inferir) # type: ignore
+
+    async def recomendar(self, respostas: Sequence[int], top_k: int = 3) -> Dict[str, Any]:
+        """
+        Levanta ModeloIndisponivelError ou RespostasInvalidasError
+        """
+        # Primeira chamada sem o carregamento do startup: joblib.load fora do event loop
+        if not self.modelo.carregado:
+            await run_in_threadpool(self.modelo.carregar)
+        self._validar(respostas)
+
+        inicio = time.perf_counter()
+        ranking = await self._ranking(respostas)
+        return {
+            "recomendacoes": ranking[:max(1, top_k)],
+            "versao_modelo": self.modelo.versao,
+            "tempo_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        }
+
+    def info(self) -> Dict[str, Any]:
+        info: Dict[str, Any] = {"carregado": self.modelo.carregado, "batching": self.batcher.stats()}
+        if self.modelo.carregado:
+            info.update(
+                versao=self.modelo.versao,
+                n_respostas=self.modelo.n_respostas,
+                cursos=self.modelo.cursos,
+            )
+        info["cache"] = self.cache.stats()
+        return info
+
+recomendacao_service = RecomendacaoService()
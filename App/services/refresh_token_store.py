@@ -0,0 +1,221 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Dict, Optional, Set
+import threading
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.auth import RefreshToken
+
+@dataclass
+class RefreshTokenRecord:
+    """Refresh token independente do backend de armazenamento"""
+    token: str
+    user_id: int
+    family_id: str
+    expires_at: datetime
+    is_revoked: bool = False
+    used_at: Optional[datetime] = None
+    replaced_by: Optional[str] = None
+
+    @property
+    def is_active(self) -> bool:
+        return (
+            not self.is_revoked
+            and self.used_at is None
+            and self.expires_at > datetime.utcnow()
+        )
+
+class RefreshTokenStore(ABC):
+    """
+    Interface de armazenamento de refresh tokens com famílias de rotação
+    """
+
+    @abstractmethod
+    def add(self, record: RefreshTokenRecord) -> None:
+        """Persiste um novo token"""
+
+    @abstractmethod
+    def get(self, token: str) -> Optional[RefreshTokenRecord]:
+        """Busca um token (ativo ou não) pelo valor"""
+
+    @abstractmethod
+    def consume(self, token: str, replaced_by: str) -> bool:
+        """
+        Marca o token como usado de forma atômica.
+        Retorna False se ele já tinha sido usado ou revogado.
+        """
+
+    @abstractmethod
+    def revoke(self, token: str) -> bool:
+        """Revoga um único token"""
+
+    @abstractmethod
+    def revoke_family(self, family_id: str) -> int:
+        """Revoga todos os tokens de uma família"""
+
+    @abstractmethod
+    def revoke_user(self, user_id: int) -> int:
+        """Revoga todos os tokens ativos de um usuário"""
+
+class SQLRefreshTokenStore(RefreshTokenStore):
+    """
+    Backend SQL (tabela refresh_tokens), compartilhado entre workers
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def _to_record(row: RefreshToken) -> RefreshTokenRecord:
+        return RefreshTokenRecord(
+            token=row.token, # type: ignore
+            user_id=row.user_id, # type: ignore
+            family_id=row.family_id or "", # type: ignore
+            expires_at=row.expires_at, # type: ignore
+            is_revoked=bool(row.is_revoked),
+            used_at=row.used_at, # type: ignore
+            replaced_by=row.replaced_by, # type: ignore
+        )
+
+    def add(self, record: RefreshTokenRecord) -> None:
+        self.db.add(RefreshToken(
+            user_id=record.user_id,
+            token=record.token,
+            family_id=record.family_id,
+            expires_at=record.expires_at,
+        ))
+        self.db.commit()
+
+    def get(self, token: str) -> Optional[RefreshTokenRecord]:
+        row = self.db.query(RefreshToken).filter(RefreshToken.token == token).first()
+        return self._to_record(row) if row else None
+
+    def consume(self, token: str, replaced_by: str) -> bool:
+        # UPDATE condicional: só uma requisição concorrente vence
+        result = self.db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.token == token,
+                RefreshToken.used_at.is_(None),
+                RefreshToken.is_revoked == False,
+            )
+            .values(used_at=datetime.utcnow(), replaced_by=replaced_by)
+        )
+        self.db.commit()
+        return result.rowcount == 1
+
+    def revoke(self, token: str) -> bool:
+        result = self.db.execute(
+            update(RefreshToken).where(RefreshToken.token == token).values(is_revoked=True)
+        )
+        self.db.commit()
+        return result.rowcount > 0
+
+    def revoke_family(self, family_id: str) -> int:
+        result = self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.is_revoked == False)
+            .values(is_revoked=True)
+        )
+        self.db.commit()
+        return result.rowcount
+
+    def revoke_user(self, user_id: int) -> int:
+        result = self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.is_revoked == False)
+            .values(is_revoked=True)
+        )
+        self.db.commit()
+        return result.rowcount
+
+class MemoryRefreshTokenStore(RefreshTokenStore):
+    """
+    Backend em memória para implantações de um único processo
+    """
+
+    # Remove expirados a cada N inserções
+    PRUNE_EVERY = 1000
+
+    def __init__(self):
+        self._tokens: Dict[str, RefreshTokenRecord] = {}
+        self._families: Dict[str, Set[str]] = {}
+        self._users: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._adds = 0
+
+    def add(self, record: RefreshTokenRecord) -> None:
+        with self._lock:
+            self._tokens[record.token] = replace(record)
+            self._families.setdefault(record.family_id, set()).add(record.token)
+            self._users.setdefault(record.user_id, set()).add(record.token)
+
+            self._adds += 1
+            if self._adds % self.PRUNE_EVERY == 0:
+                self._prune()
+
+    def get(self, token: str) -> Optional[RefreshTokenRecord]:
+        with self._lock:
+            record = self._tokens.get(token)
+            return replace(record) if record else None
+
+    def consume(self, token: str, replaced_by: str) -> bool:
+        with self._lock:
+            record = self._tokens.get(token)
+            if not record or record.used_at is not None or record.is_revoked:
+                return False
+            record.used_at = datetime.utcnow()
+            record.replaced_by = replaced_by
+            return True
+
+    def revoke(self, token: str) -> bool:
+        with self._lock:
+            record = self._tokens.get(token)
+            if not record:
+                return False
+            record.is_revoked = True
+            return True
+
+    def _revoke_many(self, tokens: Set[str]) -> int:
+        count = 0
+        for token in tokens:
+            record = self._tokens.get(token)
+            if record and not record.is_revoked:
+                record.is_revoked = True
+                count += 1
+        return count
+
+    def revoke_family(self, family_id: str) -> int:
+        with self._lock:
+            return self._revoke_many(self._families.get(family_id, set()))
+
+    def revoke_user(self, user_id: int) -> int:
+        with self._lock:
+            return self._revoke_many(self._users.get(user_id, set()))
+
+    def _prune(self) -> None:
+        # Chamado com o lock adquirido
+        agora = datetime.utcnow()
+        expirados = [t for t, r in self._tokens.items() if r.expires_at <= agora]
+        for token in expirados:
+            record = self._tokens.pop(token)
+            self._families.get(record.family_id, set()).discard(token)
+            self._users.get(record.user_id, set()).discard(token)
+            if not self._families.get(record.family_id):
+                self._families.pop(record.family_id, None)
+            if not self._users.get(record.user_id):
+                self._users.pop(record.user_id, None)
+
+_memory_store = MemoryRefreshTokenStore()
+
+def get_refresh_token_store(db: Session) -> RefreshTokenStore:
+    """
+    Backend configurado em settings.REFRESH_TOKEN_STORE
+    """
+    if settings.REFRESH_TOKEN_STORE == "memory":
+        return _memory_store
+    return SQLRefreshTokenStore(db)
@@ -0,0 +1,215 @@
+import csv
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Áreas do ENEM, na ordem das colunas de peso do CSV
+AREAS = ("linguagens", "humanas", "natureza", "matematica", "redacao")
+
+# Desvio mínimo entre anos: com um único ano de histórico a chance não vira 0/100%
+DESVIO_MINIMO = 10.0
+
+class NotasCorteIndisponiveisError(Exception):
+    """Arquivo de notas de corte ausente ou inválido"""
+    pass
+
+def _chance(margem: np.ndarray, desvio: np.ndarray) -> np.ndarray:
+    # Aproximação logística da normal acumulada (|erro| < 0.01), sem scipy
+    return 1.0 / (1.0 + np.exp(-1.702 * margem / desvio))
+
+class IndiceNotasCorte:
+    """
+    Notas de corte (curso x instituição x ano x modalidade) em arrays
+    colunares. Os anos são agregados na carga em uma oferta por
+    (curso, instituição, modalidade), com média e desvio do corte;
+    índices por curso e por região guardam as posições das ofertas.
+
+    CSV esperado (uma linha por ano):
+        curso,instituicao,uf,regiao,ano,modalidade,nota_corte,
+        peso_linguagens,peso_humanas,peso_natureza,peso_matematica,peso_redacao
+    """
+
+    def __init__(self, caminho: Optional[str] = None):
+        self.caminho = caminho or settings.SIMULACAO_NOTAS_CORTE_PATH
+        self._lock = threading.Lock()
+        self.carregado = False
+
+    def carregar(self) -> "IndiceNotasCorte":
+        if not self.carregado:
+            with self._lock:
+                if not self.carregado:
+                    self._carregar()
+        return self
+
+    def _carregar(self) -> None:
+        if not os.path.exists(self.caminho):
+            raise NotasCorteIndisponiveisError(f"Notas de corte não encontradas em {self.caminho}")
+
+        inicio = time.perf_counter()
+        # Agrupa os anos de cada oferta; o arquivo é lido uma única vez por worker
+        ofertas: Dict[tuple, Dict[str, Any]] = {}
+        try:
+            with open(self.caminho, encoding="utf-8-sig", newline="") as arquivo:
+                for linha in csv.DictReader(arquivo):
+                    chave = (linha["curso"].strip(), linha["instituicao"].strip(), linha["modalidade"].strip())
+                    oferta = ofertas.setdefault(chave, {
+                        "uf": linha["uf"].strip().upper(),
+                        "regiao": linha["regiao"].strip(),
+                        "pesos": [float(linha[f"peso_{a}"] or 1) for a in AREAS],
+                        "anos": {},
+                    })
+                    oferta["anos"][int(linha["ano"])] = float(linha["nota_corte"])
+        except (KeyError, ValueError) as e:
+            raise NotasCorteIndisponiveisError(f"CSV de notas de corte inválido: {e}")
+
+        if not ofertas:
+            raise NotasCorteIndisponiveisError("CSV de notas de corte vazio")
+
+        chaves = list(ofertas)
+        valores = list(ofertas.values())
+        self.cursos = np.array([c for c, _, _ in chaves], dtype=object)
+        self.instituicoes = np.array([i for _, i, _ in chaves], dtype=object)
+        self.modalidades = np.array([m for _, _, m in chaves], dtype=object)
+        self.ufs = np.array([o["uf"] for o in valores], dtype=object)
+        self.regioes = np.array([o["regiao"] for o in valores], dtype=object)
+
+        self.pesos = np.array([o["pesos"] for o in valores], dtype=np.float64)
+        self.soma_pesos = self.pesos.sum(axis=1)
+
+        # Estatísticas do corte no tempo: média, desvio e último ano observado
+        self.corte_medio = np.empty(len(valores))
+        self.corte_desvio = np.empty(len(valores))
+        self.corte_ultimo = np.empty(len(valores))
+        self.ano_ultimo = np.empty(len(valores), dtype=np.int32)
+        for i, oferta in enumerate(valores):
+            anos = sorted(oferta["anos"])
+            notas = np.array([oferta["anos"][a] for a in anos])
+            self.corte_medio[i] = notas.mean()
+            self.corte_desvio[i] = max(notas.std(), DESVIO_MINIMO)
+            self.corte_ultimo[i] = notas[-1]
+            self.ano_ultimo[i] = anos[-1]
+
+        self.por_curso = self._indexar(self.cursos)
+        self.por_regiao = self._indexar(self.regioes)
+        self.por_uf = self._indexar(self.ufs)
+        self.por_modalidade = self._indexar(self.modalidades)
+
+        self.total = len(valores)
+        self.carregado = True
+        logger.info(
+            f"🎯 Notas de corte carregadas: {self.total} ofertas, {len(self.por_curso)} cursos "
+            f"em {(time.perf_counter() - inicio) * 1000:.0f}ms"
+        )
+
+    @staticmethod
+    def _indexar(coluna: np.ndarray) -> Dict[str, np.ndarray]:
+        # Chave normalizada antes de agrupar: "Direito" e "direito" caem na mesma lista
+        chaves = np.char.lower(np.char.strip(coluna.astype(str)))
+        valores, inversos = np.unique(chaves, return_inverse=True)
+        ordem = np.argsort(inversos, kind="stable")
+        limites = np.cumsum(np.bincount(inversos, minlength=len(valores)))[:-1]
+        return dict(zip(valores.tolist(), np.split(ordem, limites)))
+
+    def _filtrar(self, indice: Dict[str, np.ndarray], valores: Optional[Sequence[str]]) -> Optional[np.ndarray]:
+        if not valores:
+            return None
+        # Valores repetidos no filtro (ex.: "Direito" e "direito") não duplicam posições
+        partes = [indice.get(v) for v in {v.strip().lower() for v in valores}]
+        partes = [p for p in partes if p is not None]
+        return np.unique(np.concatenate(partes)) if partes else np.empty(0, dtype=np.intp)
+
+    def elegiveis(
+        self,
+        cursos: Optional[Sequence[str]] = None,
+        regioes: Optional[Sequence[str]] = None,
+        ufs: Optional[Sequence[str]] = None,
+        modalidades: Optional[Sequence[str]] = None,
+    ) -> np.ndarray:
+        """
+        Posições das ofertas que atendem aos filtros (interseção dos índices)
+        """
+        selecao: Optional[np.ndarray] = None
+        for indice, valores in (
+            (self.por_curso, cursos),
+            (self.por_regiao, regioes),
+            (self.por_uf, ufs),
+            (self.por_modalidade, modalidades),
+        ):
+            posicoes = self._filtrar(indice, valores)
+            if posicoes is None:
+                continue
+            selecao = posicoes if selecao is None else np.intersect1d(selecao, posicoes, assume_unique=True)
+        return np.arange(self.total) if selecao is None else np.sort(selecao)
+
+class SimulacaoService:
+    """
+    Nota ponderada e chance de aprovação para todas as ofertas elegíveis
+    em uma única passada vetorizada
+    """
+
+    def __init__(self, indice: Optional[IndiceNotasCorte] = None):
+        self.indice = indice or IndiceNotasCorte()
+
+    def simular(
+        self,
+        notas: Dict[str, float],
+        cursos: Optional[Sequence[str]] = None,
+        regioes: Optional[Sequence[str]] = None,
+        ufs: Optional[Sequence[str]] = None,
+        modalidades: Optional[Sequence[str]] = None,
+        limite: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Levanta NotasCorteIndisponiveisError se o índice não puder ser carregado
+        """
+        inicio = time.perf_counter()
+        indice = self.indice.carregar()
+        limite = min(limite or settings.SIMULACAO_LIMITE_RESULTADOS, settings.SIMULACAO_LIMITE_RESULTADOS)
+
+        posicoes = indice.elegiveis(cursos, regioes, ufs, modalidades)
+        vetor_notas = np.array([float(notas[a]) for a in AREAS])
+
+        # (n_ofertas x 5) @ (5,) -> nota ponderada de cada oferta
+        nota_ponderada = indice.pesos[posicoes] @ vetor_notas / indice.soma_pesos[posicoes]
+        margem = nota_ponderada - indice.corte_medio[posicoes]
+        chance = _chance(margem, indice.corte_desvio[posicoes])
+
+        # Top-k sem ordenar tudo: argpartition e depois ordena só o recorte
+        k = min(limite, len(posicoes))
+        if k < len(posicoes):
+            topo = np.argpartition(-chance, k - 1)[:k]
+        else:
+            topo = np.arange(len(posicoes))
+        topo = topo[np.lexsort((-margem[topo], -chance[topo]))]
+
+        resultados: List[Dict[str, Any]] = []
+        for i in topo:
+            p = posicoes[i]
+            resultados.append({
+                "curso": indice.cursos[p],
+                "instituicao": indice.instituicoes[p],
+                "uf": indice.ufs[p],
+                "regiao": indice.regioes[p],
+                "modalidade": indice.modalidades[p],
+                "nota_ponderada": round(float(nota_ponderada[i]), 2),
+                "nota_corte_media": round(float(indice.corte_medio[p]), 2),
+                "nota_corte_ultimo_ano": round(float(indice.corte_ultimo[p]), 2),
+                "ano_referencia": int(indice.ano_ultimo[p]),
+                "chance": round(float(chance[i]) * 100, 1),
+            })
+
+        return {
+            "resultados": resultados,
+            "total_elegiveis": int(len(posicoes)),
+            "tempo_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        }
+
+simulacao_service = SimulacaoService()
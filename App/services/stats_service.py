@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+from datetime import datetime, date
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from models.admin import User, AccessRollupHour, AccessRollupDay
+from services.agregados_service import inicio_do_dia_utc
+
+logger = logging.getLogger(__name__)
+
+# Chave em session.info onde os deltas de uma transação aguardam o commit
+_DELTAS_KEY = "estatisticas_deltas"
+
+class EstatisticasSnapshot:
+    """
+    Contadores do dashboard admin mantidos em memória.
+    Recontados no banco após o TTL (ou na virada do dia) e atualizados
+    incrementalmente pelos commits que inserem/alteram usuários e acessos.
+    """
+
+    CAMPOS = ("total_usuarios", "usuarios_ativos", "total_acessos", "acessos_hoje")
+
+    def __init__(self, ttl_seconds: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.ADMIN_STATS_TTL_SECONDS
+        self._valores: Optional[Dict[str, int]] = None
+        self._carregado_em = 0.0
+        self._dia: Optional[date] = None
+        self._lock = threading.Lock()
+        self.recontagens = 0
+        self.incrementos = 0
+
+    def _valido(self) -> bool:
+        return (
+            self._valores is not None
+            and self._dia == datetime.now().date()
+            and time.monotonic() - self._carregado_em < self.ttl_seconds
+        )
+
+    def _contar(self, db: Session) -> Dict[str, int]:
+        # Recontagem completa em uma única consulta; acessos vêm dos agregados
+        # (soma de buckets diários/horários, sem varrer o access_history)
+        hoje = inicio_do_dia_utc()
+        total_usuarios, usuarios_ativos, total_acessos, acessos_hoje = db.execute(
+            select(
+                select(func.count()).select_from(User).scalar_subquery(),
+                select(func.count()).select_from(User).where(User.active == True).scalar_subquery(),
+                select(func.coalesce(func.sum(AccessRollupDay.total), 0)).scalar_subquery(),
+                select(func.coalesce(func.sum(AccessRollupHour.total), 0))
+                .where(AccessRollupHour.bucket >= hoje).scalar_subquery(),
+            )
+        ).one()
+        return {
+            "total_usuarios": total_usuarios or 0,
+            "usuarios_ativos": usuarios_ativos or 0,
+            "total_acessos": total_acessos or 0,
+            "acessos_hoje": acessos_hoje or 0,
+        }
+
+    def _recarregar(self, db: Session) -> Dict[str, int]:
+        valores = self._contar(db)
+        with self._lock:
+            self._valores = valores
+            self._carregado_em = time.monotonic()
+            self._dia = datetime.now().date()
+            self.recontagens += 1
+            return dict(valores)
+
+    def obter(self, db: Session) -> Dict[str, int]:
+        """
+        Estatísticas atuais (Session síncrona)
+        """
+        with self._lock:
+            if self._valido():
+                return dict(self._valores) # type: ignore
+        return self._recarregar(db)
+
+    async def obter_async(self, db: AsyncSession) -> Dict[str, int]:
+        """
+        Estatísticas atuais (AsyncSession)
+        """
+        with self._lock:
+            if self._valido():
+                return dict(self._valores) # type: ignore
+        return await db.run_sync(self._recarregar)
+
+    def aplicar(self, deltas: Dict[str, int]) -> None:
+        """
+        Soma deltas já commitados ao snapshot (ignorado se ainda não carregado)
+        """
+        with self._lock:
+            if self._valores is None:
+                return
+            for campo, delta in deltas.items():
+                self._valores[campo] = max(0, self._valores[campo] + delta)
+            self.incrementos += 1
+
+    def invalidar(self) -> None:
+        """Força recontagem na próxima leitura (ex.: UPDATE/DELETE em massa)"""
+        with self._lock:
+            self._valores = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            idade = time.monotonic() - self._carregado_em if self._valores is not None else None
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "idade_seconds": round(idade, 1) if idade is not None else None,
+            "recontagens": self.recontagens,
+            "incrementos": self.incrementos,
+        }
+
+estatisticas_snapshot = EstatisticasSnapshot()
+
+def _calcular_deltas(session: Session) -> Dict[str, int]:
+    # Só usuários: acessos são contados pelos agregados, que o ORM não atualiza.
+    # O buffer de acessos aplica os próprios deltas; cargas via ORM pedem reconstruir()
+    deltas = dict.fromkeys(EstatisticasSnapshot.CAMPOS, 0)
+
+    for obj in session.new:
+        if isinstance(obj, User):
+            deltas["total_usuarios"] += 1
+            if obj.active is not False:
+                deltas["usuarios_ativos"] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            deltas["total_usuarios"] -= 1
+            if obj.active:
+                deltas["usuarios_ativos"] -= 1
+
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            historico = inspect(obj).attrs.active.history
+            if historico.has_changes():
+                antes = bool(historico.deleted[0]) if historico.deleted else True
+                depois = bool(historico.added[0]) if historico.added else antes
+                deltas["usuarios_ativos"] += int(depois) - int(antes)
+
+    return {campo: delta for campo, delta in deltas.items() if delta}
+
+# Deltas acumulados por flush e aplicados só após o commit (rollback descarta)
+@event.listens_for(Session, "after_flush")
+def _registrar_deltas(session: Session, flush_context) -> None:
+    deltas = _calcular_deltas(session)
+    if not deltas:
+        return
+    pendentes = session.info.setdefault(_DELTAS_KEY, {})
+    for campo, delta in deltas.items():
+        pendentes[campo] = pendentes.get(campo, 0) + delta
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_deltas(session: Session) -> None:
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if deltas:
+        estatisticas_snapshot.aplicar(deltas)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _descartar_deltas(session: Session, previous_transaction) -> None:
+    session.info.pop(_DELTAS_KEY, None)
@@ -1,57 +1,89 @@
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import Optional
+import logging
 import secrets
-from models.auth import RefreshToken, PasswordResetToken, AdminSession
+from models.auth import PasswordResetToken, AdminSession
 from core.config import settings
+from services.refresh_token_store import RefreshTokenRecord, get_refresh_token_store
+
+logger = logging.getLogger(__name__)
 
 class TokenService:
     def __init__(self, db: Session):
         self.db = db
+        self.store = get_refresh_token_store(db)
     
-    def create_refresh_token(self, user_id: int) -> RefreshToken:
-        # Revogar tokens antigos do usuário
-        self.db.query(RefreshToken).filter(
-            RefreshToken.user_id == user_id,
-            RefreshToken.is_revoked == False
-        ).update({"is_revoked": True})
-        
-        # Criar novo token
-        token = secrets.token_urlsafe(64)
-        expires_at = datetime.utcnow() + timedelta(days=30)  # 30 dias
+    def create_refresh_token(self, user_id: int, family_id: Optional[str] = None) -> RefreshTokenRecord:
+        """
+        Emite refresh token. Sem family_id inicia uma nova família (novo login)
+        e revoga os tokens antigos do usuário.
+        """
+        if family_id is None:
+            self.store.revoke_user(user_id)
+            family_id = secrets.token_hex(16)
         
-        refresh_token = RefreshToken(
+        record = RefreshTokenRecord(
+            token=secrets.token_urlsafe(64),
             user_id=user_id,
-            token=token,
-            expires_at=expires_at
+            family_id=family_id,
+            expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
         )
-        
-        self.db.add(refresh_token)
-        self.db.commit()
-        self.db.refresh(refresh_token)
-        return refresh_token
+        self.store.add(record)
+        return record
     
-    def verify_refresh_token(self, token: str) -> Optional[RefreshToken]:
+    def verify_refresh_token(self, token: str) -> Optional[RefreshTokenRecord]:
         """Verifica se o refresh token é válido"""
-        return self.db.query(RefreshToken).filter(
-            RefreshToken.token == token,
-            RefreshToken.is_revoked == False,
-            RefreshToken.expires_at > datetime.utcnow()
-        ).first()
+        record = self.store.get(token)
+        return record if record and record.is_active else None
+    
+    def rotate_refresh_token(self, token: str) -> Optional[RefreshTokenRecord]:
+        """
+        Troca um refresh token válido por um novo da mesma família.
+        Reuso de token já trocado revoga a família inteira.
+        """
+        record = self.store.get(token)
+        if not record:
+            return None
+        
+        if record.is_revoked or record.used_at is not None:
+            revogados = self.store.revoke_family(record.family_id)
+            logger.warning(
+                f"🚨 Reuso de refresh token detectado (usuário {record.user_id}); "
+                f"{revogados} token(s) da família revogados"
+            )
+            return None
+        
+        if record.expires_at <= datetime.utcnow():
+            return None
+        
+        novo_token = secrets.token_urlsafe(64)
+        if not self.store.consume(token, replaced_by=novo_token):
+            # Outra requisição consumiu o mesmo token ao mesmo tempo
+            self.store.revoke_family(record.family_id)
+            logger.warning(f"🚨 Refresh token usado em paralelo (usuário {record.user_id}); família revogada")
+            return None
+        
+        novo = RefreshTokenRecord(
+            token=novo_token,
+            user_id=record.user_id,
+            family_id=record.family_id,
+            expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+        self.store.add(novo)
+        return novo
     
     def revoke_refresh_token(self, token: str) -> bool:
         """Revoga um refresh token"""
-        refresh_token = self.db.query(RefreshToken).filter(
-            RefreshToken.token == token
-        ).first()
-        
-        if refresh_token:
-            refresh_token.is_revoked = True # type: ignore
-            self.db.commit()
-            return True
-        return False
+        return self.store.revoke(token)
     
-    def create_password_reset_token(self, user_id: int) -> PasswordResetToken:
+    def create_password_reset_token(self, user_id: int, commit: bool = True) -> PasswordResetToken:
+        """
+        Cria token de reset. Com commit=False o chamador fecha a transação
+        (ex.: junto com o email na outbox).
+        """
         # Invalidar tokens antigos
         self.db.query(PasswordResetToken).filter(
             PasswordResetToken.user_id == user_id,
@@ -69,8 +101,9 @@ class TokenService:
         )
         
         self.db.add(reset_token)
-        self.db.commit()
-        self.db.refresh(reset_token)
+        if commit:
+            self.db.commit()
+            self.db.refresh(reset_token)
         return reset_token
     
     def verify_password_reset_token(self, token: str) -> Optional[PasswordResetToken]:
@@ -100,11 +133,7 @@ class AdminAuthService:
         pin_code = str(secrets.randbelow(10000)).zfill(4)
         expires_at = datetime.utcnow() + timedelta(minutes=10)  # 10 minutos
         
-        # Limpar sessões expiradas
-        self.db.query(AdminSession).filter(
-            AdminSession.expires_at < datetime.utcnow()
-        ).delete()
-        
+        # Sessões expiradas são removidas pelo janitor (services.cleanup_service)
         session = AdminSession(
             session_id=session_id,
             admin_email=admin_email,
@@ -136,4 +165,106 @@ class AdminAuthService:
             session.is_used = True # type: ignore
             self.db.commit()
             return True
-        return False
\ No newline at end of file
+        return False
+
+class AsyncTokenService:
+    """
+    Versão assíncrona do TokenService, para rotas async com AsyncSession.
+    Refresh tokens ficam só no TokenService (RefreshTokenStore configurado).
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def create_password_reset_token(self, user_id: int) -> PasswordResetToken:
+        # Invalidar tokens antigos
+        await self.db.execute(
+            update(PasswordResetToken)
+            .where(PasswordResetToken.user_id == user_id, PasswordResetToken.is_used == False)
+            .values(is_used=True)
+        )
+        
+        reset_token = PasswordResetToken(
+            user_id=user_id,
+            token=secrets.token_urlsafe(32),
+            expires_at=datetime.utcnow() + timedelta(hours=1)  # 1 hora
+        )
+        
+        self.db.add(reset_token)
+        await self.db.commit()
+        await self.db.refresh(reset_token)
+        return reset_token
+    
+    async def verify_password_reset_token(self, token: str) -> Optional[PasswordResetToken]:
+        """Verifica se o token de reset de senha é válido"""
+        return await self.db.scalar(
+            select(PasswordResetToken).where(
+                PasswordResetToken.token == token,
+                PasswordResetToken.is_used == False,
+                PasswordResetToken.expires_at > datetime.utcnow()
+            )
+        )
+    
+    async def use_password_reset_token(self, token: str) -> bool:
+        """Marca um token de reset de senha como usado"""
+        reset_token = await self.verify_password_reset_token(token)
+        if reset_token:
+            reset_token.is_used = True # type: ignore
+            await self.db.commit()
+            return True
+        return False
+
+class AsyncAdminAuthService:
+    """
+    Versão assíncrona do AdminAuthService (2FA do administrador)
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def create_admin_session(self, admin_email: str, commit: bool = True) -> AdminSession:
+        """
+        Cria uma nova sessão administrativa com PIN 2FA.
+        Com commit=False o chamador fecha a transação (ex.: junto com o email na outbox).
+        """
+        session = AdminSession(
+            session_id=secrets.token_hex(16),
+            admin_email=admin_email,
+            pin_code=str(secrets.randbelow(10000)).zfill(4),
+            expires_at=datetime.utcnow() + timedelta(minutes=10)  # 10 minutos
+        )
+        
+        self.db.add(session)
+        if commit:
+            await self.db.commit()
+            await self.db.refresh(session)
+        return session
+    
+    async def verify_admin_session(self, session_id: str, pin_code: str) -> Optional[AdminSession]:
+        """Verifica se a sessão administrativa e PIN são válidos"""
+        return await self.db.scalar(
+            select(AdminSession).where(
+                AdminSession.session_id == session_id,
+                AdminSession.pin_code == pin_code,
+                AdminSession.is_used == False,
+                AdminSession.expires_at > datetime.utcnow()
+            )
+        )
+    
+    async def mark_admin_session_used(
+        self, session_id: str, session: Optional[AdminSession] = None
+    ) -> bool:
+        """
+        Marca uma sessão administrativa como usada.
+        Se a sessão já foi carregada (verify_admin_session), reaproveita o objeto.
+        """
+        if session is None:
+            session = await self.db.scalar(
+                select(AdminSession).where(AdminSession.session_id == session_id)
+            )
+        
+        if session:
+            session.is_used = True # type: ignore
+            await self.db.commit()
+            return True
+        return False
@@ -0,0 +1,55 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+# Banco SQLite descartável (e aiosqlite para o engine assíncrono), definido antes de importar o Settings
+_tmp = tempfile.mkdtemp(prefix="upath-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/app.db"
+os.environ.setdefault("DB_STARTUP_CHECK", "false")
+os.environ.setdefault("CLEANUP_ENABLED", "false")
+os.environ.setdefault("CACHE_BACKEND", "memory")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import models.admin, models.auth, models.email, models.importacao, models.noticia  # noqa: E401,F401  (tabelas)
+from core.database import Base, SessionLocal, get_engine, get_async_engine
+
+@pytest.fixture(scope="session", autouse=True)
+def tabelas():
+    Base.metadata.create_all(get_engine())
+    yield
+
+@pytest.fixture(autouse=True)
+def banco_limpo():
+    yield
+    with get_engine().begin() as conn:
+        for tabela in reversed(Base.metadata.sorted_tables):
+            conn.execute(tabela.delete())
+
+@pytest.fixture
+def db():
+    sessao = SessionLocal()
+    try:
+        yield sessao
+    finally:
+        sessao.close()
+
+@pytest.fixture
+def rodar():
+    """
+    Executa a corrotina em um loop novo e fecha o pool assíncrono nele
+    (conexões aiosqlite não atravessam loops)
+    """
+    def executar(coro):
+        async def com_dispose():
+            try:
+                return await coro
+            finally:
+                await get_async_engine().dispose()
+
+        return asyncio.run(com_dispose())
+
+    return executar
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select
+
+from core.database import AsyncSessionLocal
+from models.admin import AccessHistory, AccessRollupDay, AccessRollupHour
+from services import agregados_service
+from services.agregados_service import AnaliseAcessosService
+
+BRASILIA = timezone(timedelta(hours=-3))
+
+def test_serie_aceita_janela_com_fuso(db, rodar):
+    base = datetime(2026, 3, 10, 12, 30)
+    agregados_service.incrementar(db, [
+        {"evento": "login", "id_usuario": None, "timestamp": base},
+        {"evento": "login", "id_usuario": None, "timestamp": base + timedelta(hours=1)},
+    ])
+    db.commit()
+
+    async def cenario():
+        async with AsyncSessionLocal() as sessao:
+            service = AnaliseAcessosService(sessao)
+            # Só `desde` com fuso: comparado com o utcnow naive do `ate` padrão
+            await service.serie("dia", desde=datetime(2026, 3, 1, tzinfo=timezone.utc))
+            # 09h às 11h em Brasília = 12h às 14h UTC
+            return await service.serie(
+                "hora",
+                desde=datetime(2026, 3, 10, 9, tzinfo=BRASILIA),
+                ate=datetime(2026, 3, 10, 11, tzinfo=BRASILIA),
+            )
+
+    serie = rodar(cenario())
+    assert (serie["desde"], serie["ate"]) == ("2026-03-10T12:00:00", "2026-03-10T14:00:00")
+    assert [p["total"] for p in serie["serie"]] == [1, 1]
+
+def test_reconstruir_sob_trava_refaz_os_totais(db):
+    base = datetime(2026, 3, 10, 12, 30)
+    eventos = [{"evento": "login", "id_usuario": None, "timestamp": base} for _ in range(3)]
+    db.execute(insert(AccessHistory).values(eventos))
+    # Agregados já divergentes (ex.: incremento aplicado duas vezes)
+    agregados_service.incrementar(db, eventos + eventos)
+    db.commit()
+
+    with agregados_service.trava(db, exclusiva=True):
+        resultado = agregados_service.reconstruir(db)
+        db.commit()
+
+    assert resultado == {"eventos": 3, "buckets_hora": 1, "buckets_dia": 1}
+    # Totais refeitos a partir do access_history, não somados aos 6 anteriores
+    assert db.scalar(select(func.sum(AccessRollupHour.total))) == 3
+    assert db.scalar(select(func.sum(AccessRollupDay.total))) == 3
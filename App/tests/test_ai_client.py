@@ -0,0 +1,80 @@
+import httpx
+import pytest
+
+from core.ai_client import AIClient, AIServiceClientError, AIServiceUnavailableError, CircuitBreaker
+
+def _cliente(respostas):
+    """Cliente com transporte falso: cada chamada consome o próximo status da lista"""
+    chamadas = []
+
+    def responder(request: httpx.Request) -> httpx.Response:
+        status = respostas[min(len(chamadas), len(respostas) - 1)]
+        chamadas.append(request.url.path)
+        if status == "queda":
+            raise httpx.ConnectError("conexão recusada", request=request)
+        return httpx.Response(status, json={"ok": status == 200, "n": len(chamadas)})
+
+    cliente = AIClient(base_url="http://ia.teste", transport=httpx.MockTransport(responder))
+    cliente.retries = 2
+    cliente.breaker = CircuitBreaker(threshold=2, reset_seconds=60)
+    return cliente, chamadas
+
+def test_retenta_503_e_cacheia_a_resposta(rodar):
+    cliente, chamadas = _cliente([503, "queda", 200])
+
+    async def cenario():
+        primeira = await cliente.post("/analisar", {"teste": "retry"})
+        segunda = await cliente.post("/analisar", {"teste": "retry"})
+        await cliente.aclose()
+        return primeira, segunda
+
+    primeira, segunda = rodar(cenario())
+    assert (primeira.origem, primeira.dados["n"]) == ("servico", 3)
+    assert segunda.origem == "cache"
+    assert len(chamadas) == 3
+    assert cliente.breaker.falhas == 0
+
+def test_4xx_nao_conta_no_circuito_nem_usa_cache_expirado(rodar):
+    cliente, chamadas = _cliente([200, 422])
+    payload = {"teste": "4xx"}
+
+    async def cenario():
+        await cliente.post("/analisar", payload)
+        # Só a cópia de longa duração sobra: sem o 4xx, a chamada cairia nela
+        await cliente.cache.invalidate(cliente.chave("/analisar", payload))
+        for _ in range(3):
+            with pytest.raises(AIServiceClientError) as erro:
+                await cliente.post("/analisar", payload, fallback={"padrao": True})
+            assert erro.value.status_code == 422
+        await cliente.aclose()
+
+    rodar(cenario())
+    assert len(chamadas) == 4  # sem retentativas
+    assert cliente.breaker.estado == CircuitBreaker.FECHADO
+    assert cliente.breaker.falhas == 0
+
+def test_circuito_abre_e_serve_cache_expirado_ou_fallback(rodar):
+    cliente, chamadas = _cliente([200, 500])
+    payload = {"teste": "circuito"}
+
+    async def cenario():
+        await cliente.post("/analisar", payload)
+        await cliente.cache.invalidate(cliente.chave("/analisar", payload))
+        # 5xx contam: duas chamadas com falha abrem o circuito
+        for _ in range(2):
+            assert (await cliente.post("/analisar", payload)).origem == "cache_expirado"
+        assert cliente.breaker.estado == CircuitBreaker.ABERTO
+        enviadas = len(chamadas)
+
+        # Aberto: nada é enviado
+        expirado = await cliente.post("/analisar", payload)
+        fallback = await cliente.post("/outro", {"teste": "circuito"}, fallback={"padrao": True})
+        with pytest.raises(AIServiceUnavailableError):
+            await cliente.post("/outro", {"teste": "circuito"})
+        await cliente.aclose()
+        return enviadas, expirado, fallback
+
+    enviadas, expirado, fallback = rodar(cenario())
+    assert len(chamadas) == enviadas
+    assert expirado.origem == "cache_expirado"
+    assert (fallback.origem, fallback.dados) == ("fallback", {"padrao": True})
@@ -0,0 +1,53 @@
+from core.database import AsyncSessionLocal
+from models.admin import User
+from models.auth import Usuario
+from services.admin_service import AsyncAdminService
+from services.perfil_service import AsyncUserService, perfil_cache
+from services.token_service import AsyncTokenService
+
+def test_async_token_service_reset_de_senha(db, rodar):
+    db.add(Usuario(nome="Ana", email="ana@x.com", senha_hash="x"))
+    db.commit()
+
+    async def cenario():
+        async with AsyncSessionLocal() as sessao:
+            service = AsyncTokenService(sessao)
+            primeiro = await service.create_password_reset_token(1)
+            segundo = await service.create_password_reset_token(1)
+            # Novo token invalida os anteriores do usuário
+            assert await service.verify_password_reset_token(primeiro.token) is None
+            assert await service.use_password_reset_token(segundo.token)
+            assert not await service.use_password_reset_token(segundo.token)
+
+    rodar(cenario())
+
+def test_async_user_service_le_e_invalida_perfil_em_cache(db, rodar):
+    db.add(Usuario(nome="Ana", email="ana@x.com", senha_hash="x"))
+    db.commit()
+
+    async def cenario():
+        async with AsyncSessionLocal() as sessao:
+            service = AsyncUserService(sessao)
+            perfil = await service.get_user_profile_cached(1)
+            assert perfil["nome"] == "Ana"
+
+            from schemas.perfil_schemas import UserProfileUpdate
+            await service.update_user_profile(1, UserProfileUpdate(nome="Ana Maria"))
+            assert await perfil_cache.get(1) is None
+            assert (await service.get_user_profile_cached(1))["nome"] == "Ana Maria"
+
+    rodar(cenario())
+
+def test_async_admin_service_estatisticas_e_versao(db, rodar):
+    db.add_all([User(name="A", email="a@x.com"), User(name="B", email="b@x.com", active=False)])
+    db.commit()
+
+    async def cenario():
+        async with AsyncSessionLocal() as sessao:
+            service = AsyncAdminService(sessao)
+            assert await service.versao_usuario(1) == 1
+            assert await service.versao_usuario(99) is None
+            ativos = await service.consultar_usuarios_ativos(page=1, page_size=10)
+            assert [u["name"] for u in ativos["items"]] == ["A"]
+
+    rodar(cenario())
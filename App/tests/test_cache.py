@@ -0,0 +1,52 @@
+import time
+
+from core.cache import CacheBackend, FallbackCacheBackend, MemoryCacheBackend
+
+class RedisFora(CacheBackend):
+    name = "redis"
+
+    def __init__(self):
+        self.chamadas = 0
+
+    def _falhar(self):
+        self.chamadas += 1
+        raise ConnectionError("redis fora")
+
+    async def get(self, key):
+        self._falhar()
+
+    async def set(self, key, value, ttl):
+        self._falhar()
+
+    async def delete(self, key):
+        self._falhar()
+
+    def delete_sync(self, key):
+        self._falhar()
+
+    def get_sync(self, key):
+        self._falhar()
+
+def test_memoria_respeita_teto_de_ttl(rodar):
+    local = MemoryCacheBackend(10, max_ttl=5)
+    rodar(local.set("k", "v", 300))
+    _, expira_em = local._entries["k"]
+    assert local.get_sync("k") == "v"
+    assert expira_em <= time.monotonic() + 5
+
+def test_fallback_espera_antes_de_tentar_o_redis_de_novo(rodar):
+    redis = RedisFora()
+    cache = FallbackCacheBackend(redis, MemoryCacheBackend(10), retry_seconds=60)
+
+    async def cenario():
+        await cache.set("k", "v", 30)
+        assert await cache.get("k") == "v"
+        assert cache.get_sync("k") == "v"
+
+    rodar(cenario())
+    # Só a primeira operação foi ao Redis; as demais ficaram no LRU local
+    assert redis.chamadas == 1
+
+    cache._proxima_tentativa = 0.0
+    assert cache.get_sync("k") == "v"
+    assert redis.chamadas == 2
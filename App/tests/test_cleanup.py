@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from core.config import settings
+from models.auth import AdminSession, PasswordResetToken, RefreshToken, TokenRecuperacao, Usuario
+from services import cleanup_service
+from services.cleanup_service import executar_limpeza
+
+def _semear(db):
+    """Por tabela: 3 expirados, 2 usados e 2 válidos (tokens prefixados exp/uso/ok)"""
+    agora = datetime.utcnow()
+    passado, futuro = agora - timedelta(hours=1), agora + timedelta(hours=1)
+    db.add(Usuario(nome="Ana", email="ana@x.com", senha_hash="x"))
+
+    linhas = [("exp", passado, False)] * 3 + [("uso", futuro, True)] * 2 + [("ok", futuro, False)] * 2
+    for i, (tipo, expira, usado) in enumerate(linhas):
+        token = f"{tipo}-{i}"
+        db.add(AdminSession(session_id=token, admin_email="admin@x.com", pin_code="0000",
+                            expires_at=expira, is_used=usado))
+        db.add(RefreshToken(user_id=1, token=token, expires_at=expira, is_revoked=usado))
+        db.add(PasswordResetToken(user_id=1, token=token, expires_at=expira, is_used=usado))
+        db.add(TokenRecuperacao(id_usuario=1, token=token, data_expiracao=expira, utilizado=usado))
+    # Refresh token trocado (não revogado) fica até expirar: a detecção de reuso depende dele
+    db.add(RefreshToken(user_id=1, token="ok-trocado", expires_at=futuro, used_at=agora, replaced_by="ok-5"))
+    db.commit()
+
+def test_limpeza_remove_so_expirados_e_usados_em_lotes(db, monkeypatch):
+    _semear(db)
+    # Lote menor que as 5 linhas removíveis de cada tabela: exige várias voltas
+    monkeypatch.setattr(settings, "CLEANUP_CHUNK_SIZE", 2)
+
+    resultado = executar_limpeza()
+
+    assert resultado["removidos"] == {
+        "admin_sessions": 5,
+        "refresh_tokens": 5,
+        "password_reset_tokens": 5,
+        "tokens_recuperacao": 5,
+        "importacao_jobs": 0,
+    }
+    assert resultado["total"] == 20
+    assert cleanup_service.ultima_limpeza["total"] == 20
+
+    db.expire_all()
+    assert set(db.scalars(select(AdminSession.session_id))) == {"ok-5", "ok-6"}
+    assert set(db.scalars(select(RefreshToken.token))) == {"ok-5", "ok-6", "ok-trocado"}
+    assert set(db.scalars(select(PasswordResetToken.token))) == {"ok-5", "ok-6"}
+    assert set(db.scalars(select(TokenRecuperacao.token))) == {"ok-5", "ok-6"}
+
+    # Segunda passada não encontra mais nada
+    assert executar_limpeza()["total"] == 0
@@ -0,0 +1,74 @@
+import smtplib
+
+import pytest
+
+from core.database import SessionLocal
+from models.email import EmailOutbox
+from services import email_service
+from services.email_service import EmailOutboxWorker, EmailService
+
+class SMTPFalso:
+    """Conexão SMTP de mentira: resposta por destinatário e status visto durante o envio"""
+
+    def __init__(self, erros=None):
+        self.erros = erros or {}
+        self.enviados = []
+        self.status_durante_envio = []
+
+    def send(self, to_email, msg):
+        # Outra sessão enxerga a reserva: a transação já foi fechada antes do SMTP
+        sessao = SessionLocal()
+        try:
+            self.status_durante_envio.append(
+                sessao.query(EmailOutbox.status).filter(EmailOutbox.destinatario == to_email).scalar()
+            )
+        finally:
+            sessao.close()
+        if to_email in self.erros:
+            raise self.erros[to_email]
+        self.enviados.append(to_email)
+
+    def reset(self):
+        pass
+
+@pytest.fixture
+def smtp(monkeypatch):
+    falso = SMTPFalso({
+        "rejeitado@x.com": smtplib.SMTPDataError(550, b"mailbox unavailable"),
+        "instavel@x.com": smtplib.SMTPServerDisconnected("caiu"),
+    })
+    monkeypatch.setattr(email_service, "smtp_connection", falso)
+    return falso
+
+def _enfileirar(db, *destinatarios):
+    for destinatario in destinatarios:
+        EmailService().enqueue_email(db, destinatario, "Assunto", "Corpo")
+    db.commit()
+
+def _status(db):
+    db.expire_all()
+    return {m.destinatario: (m.status, m.tentativas) for m in db.query(EmailOutbox)}
+
+def test_outbox_envia_reagenda_e_descarta(db, smtp):
+    _enfileirar(db, "ok@x.com", "rejeitado@x.com", "instavel@x.com")
+
+    resultado = EmailOutboxWorker(batch_size=10, max_attempts=3).drenar()
+
+    assert resultado == {"enviados": 1, "reagendados": 1, "mortos": 1}
+    assert smtp.enviados == ["ok@x.com"]
+    assert smtp.status_durante_envio == ["enviando"] * 3
+    assert _status(db) == {
+        "ok@x.com": ("enviado", 0),
+        # 5xx é permanente: dead-letter na primeira tentativa
+        "rejeitado@x.com": ("morto", 1),
+        "instavel@x.com": ("pendente", 1),
+    }
+
+def test_outbox_retoma_reserva_vencida(db, smtp, monkeypatch):
+    _enfileirar(db, "ok@x.com")
+    # Worker que caiu entre a reserva e o envio
+    monkeypatch.setattr(email_service.settings, "EMAIL_OUTBOX_CLAIM_SECONDS", -1)
+    assert len(EmailOutboxWorker()._reservar()) == 1
+
+    assert EmailOutboxWorker().drenar()["enviados"] == 1
+    assert _status(db) == {"ok@x.com": ("enviado", 0)}
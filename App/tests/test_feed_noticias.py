@@ -0,0 +1,49 @@
+import asyncio
+import threading
+
+from core.database import AsyncSessionLocal, SessionLocal
+from models.noticia import Noticia
+from services.noticia_service import FeedNoticias
+
+def _publicar(db, n=3):
+    db.add_all(Noticia(titulo=f"Notícia {i}", descricao="...") for i in range(n))
+    db.commit()
+
+def test_primeiras_leituras_simultaneas_recarregam_uma_vez(db, rodar):
+    _publicar(db)
+    feed = FeedNoticias()
+
+    async def leitor():
+        async with AsyncSessionLocal() as sessao:
+            await feed.sincronizar_async(sessao)
+        return len(feed.destaques())
+
+    async def cenario():
+        return await asyncio.gather(*(leitor() for _ in range(8)))
+
+    assert all(rodar(cenario()))
+    assert (feed.recargas, feed.verificacoes) == (1, 1)
+
+def test_threads_simultaneas_recarregam_uma_vez(db):
+    _publicar(db)
+    feed = FeedNoticias()
+    largada = threading.Barrier(6)
+    vistos = []
+
+    def leitor():
+        sessao = SessionLocal()
+        try:
+            largada.wait()
+            feed.sincronizar(sessao)
+            vistos.append(len(feed.destaques()))
+        finally:
+            sessao.close()
+
+    threads = [threading.Thread(target=leitor) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(vistos) == 6 and all(vistos)
+    assert feed.recargas == 1
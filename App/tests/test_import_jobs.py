@@ -0,0 +1,60 @@
+import asyncio
+import tempfile
+
+from services import import_service
+from services.import_service import ImportJobRegistry, StudentImportService
+
+def _arquivo(conteudo: str) -> str:
+    with tempfile.NamedTemporaryFile("w", suffix=".upload", delete=False, encoding="utf-8") as f:
+        f.write(conteudo)
+        return f.name
+
+def test_progresso_visivel_em_outro_worker(rodar, monkeypatch):
+    registro = ImportJobRegistry()
+    monkeypatch.setattr(import_service, "import_jobs", registro)
+
+    async def hash_falso(self, senha, limite):
+        return "hash-" + senha
+
+    monkeypatch.setattr(StudentImportService, "_hash", hash_falso)
+    caminho = _arquivo(
+        "nome,email,senha\n"
+        "Ana Souza,ana@exemplo.com,Senha@123\n"
+        "Bruno Lima,email-invalido,Senha@123\n"
+        "Ana Souza,ana@exemplo.com,Senha@123\n"
+    )
+
+    async def cenario():
+        job = await registro.criar("csv", "adm")
+        registro.iniciar(job, caminho)
+        await asyncio.gather(*registro._tasks.values())
+        # Outro processo: registro vazio, estado lido do banco
+        return await ImportJobRegistry().obter(job.id)
+
+    job = rodar(cenario())
+    assert job.status == "concluido"
+    assert (job.linhas_lidas, job.importados, job.rejeitados) == (3, 1, 2)
+    assert [e["mensagem"] for e in job.erros] == ["Email inválido", "Email duplicado no arquivo"]
+    assert job.finalizado_em is not None
+
+def test_shutdown_interrompe_e_grava_estado(rodar, monkeypatch):
+    registro = ImportJobRegistry()
+    monkeypatch.setattr(import_service, "import_jobs", registro)
+
+    async def lote_lento(self, job, lote, vistos):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(StudentImportService, "_processar_lote", lote_lento)
+    caminho = _arquivo("nome,email,senha\nAna Souza,ana@exemplo.com,Senha@123\n")
+
+    async def cenario():
+        job = await registro.criar("csv", "adm")
+        registro.iniciar(job, caminho)
+        await asyncio.sleep(0.2)
+        await registro.encerrar(timeout=0.1)
+        assert registro.em_execucao() == 0
+        return await ImportJobRegistry().obter(job.id)
+
+    job = rodar(cenario())
+    assert job.status == "falhou"
+    assert job.mensagem == "Importação interrompida"
@@ -0,0 +1,31 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from core.security import criar_token
+from models.auth import Usuario
+from services.perfil_service import perfil_cache
+
+def test_etag_do_me_vem_do_banco_e_nao_do_cache(db):
+    from main import app
+
+    db.add(Usuario(nome="Ana", email="ana@x.com", senha_hash="x"))
+    db.commit()
+    perfil_cache.invalidate_sync(1)
+
+    token = criar_token({"sub": "ana@x.com", "user_id": 1, "role": "student"})
+    client = TestClient(app)
+    cabecalhos = {"Authorization": f"Bearer {token}"}
+
+    primeira = client.get("/api/api/perfil/me", headers=cabecalhos)
+    assert primeira.status_code == 200
+    etag = primeira.headers["etag"]
+    assert client.get("/api/api/perfil/me", headers={**cabecalhos, "If-None-Match": etag}).status_code == 304
+
+    # Escrita por outro worker: o perfil em cache aqui não foi invalidado
+    db.execute(update(Usuario).where(Usuario.id_usuario == 1).values(nome="Ana Maria"))
+    db.commit()
+
+    segunda = client.get("/api/api/perfil/me", headers={**cabecalhos, "If-None-Match": etag})
+    assert segunda.status_code == 200
+    assert segunda.headers["etag"] != etag
+    assert segunda.json()["data"]["nome"] == "Ana Maria"
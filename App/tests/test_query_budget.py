@@ -0,0 +1,44 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from core.query_counter import QueryBudgetExceeded, assert_query_budget, query_budget
+from core.security import criar_token
+from models.admin import AccessHistory, User
+from services.admin_service import AdminService
+from services.stats_service import estatisticas_snapshot
+
+@pytest.fixture
+def historico(db):
+    db.add_all(User(name=f"U{i}", email=f"u{i}@x.com") for i in range(5))
+    db.commit()
+    db.add_all(AccessHistory(user_id=1 + i % 5) for i in range(30))
+    db.commit()
+    estatisticas_snapshot.invalidar()
+
+def test_historico_sem_n_mais_1(db, historico):
+    service = AdminService(db)
+    service.consultar_historico_acessos(page=1, page_size=10)  # aquece o snapshot
+
+    # Página + nomes via join: uma query, independente do número de linhas
+    with query_budget(1) as stats:
+        pagina = service.consultar_historico_acessos(page=1, page_size=20)
+    assert len(pagina["items"]) == 20
+    assert stats.count == 1
+
+def test_orcamento_estourado_lista_os_statements(db, historico):
+    with pytest.raises(QueryBudgetExceeded) as erro:
+        with query_budget(2):
+            for user_id in range(1, 5):
+                db.get(User, user_id)
+    assert "4 queries executadas (orçamento: 2)" in str(erro.value)
+
+def test_orcamento_por_rota():
+    from main import app
+
+    token = criar_token({"sub": "adm", "user_id": 1, "role": "admin", "username": "adm"})
+    client = TestClient(app)
+    resposta = client.get("/api/api/admin/stats", headers={"Authorization": f"Bearer {token}"})
+    assert resposta.status_code == 200
+    assert assert_query_budget(resposta, 4) >= 1
+    with pytest.raises(QueryBudgetExceeded):
+        assert_query_budget(resposta, 0)
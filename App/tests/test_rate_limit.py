@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from core import rate_limit
+from core.rate_limit import LoginRateLimiter, MemoryRateLimitBackend
+
+def _request(ip: str) -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/login", "headers": [], "client": (ip, 5000)})
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setattr(rate_limit.settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit.settings, "LOGIN_RATE_LIMIT_GLOBAL", "10/60")
+    monkeypatch.setattr(rate_limit.settings, "LOGIN_RATE_LIMIT_IP", "3/60")
+    monkeypatch.setattr(rate_limit.settings, "LOGIN_RATE_LIMIT_IDENTIFIER", "100/60")
+    return LoginRateLimiter(MemoryRateLimitBackend())
+
+async def _tentar(limiter: LoginRateLimiter, ip: str, email: str) -> bool:
+    try:
+        await limiter.verificar(_request(ip), "login", email)
+        return True
+    except HTTPException as e:
+        assert e.status_code == 429 and int(e.headers["Retry-After"]) >= 1
+        return False
+
+def test_tentativas_negadas_nao_consomem_cota_global(limiter):
+    async def cenario():
+        # Um IP insistindo muito além do seu limite...
+        resultados = [await _tentar(limiter, "10.0.0.1", f"alvo{i}@x.com") for i in range(30)]
+        assert resultados.count(True) == 3
+        # ...não esgota o limite global para os demais usuários
+        outros = [await _tentar(limiter, f"10.0.1.{i}", f"u{i}@x.com") for i in range(7)]
+        assert all(outros)
+        # Agora sim o global (10) acabou
+        assert not await _tentar(limiter, "10.0.2.1", "novo@x.com")
+
+    asyncio.run(cenario())
+
+def test_negacao_por_identificador_nao_consome_cota_do_ip(limiter, monkeypatch):
+    monkeypatch.setattr(rate_limit.settings, "LOGIN_RATE_LIMIT_IDENTIFIER", "1/60")
+
+    async def cenario():
+        assert await _tentar(limiter, "10.0.0.1", "maria@x.com")
+        assert not await _tentar(limiter, "10.0.0.1", "maria@x.com")
+        assert not await _tentar(limiter, "10.0.0.1", "maria@x.com")
+        # O IP usou 1 de 3: ainda tem cota para outros identificadores
+        assert await _tentar(limiter, "10.0.0.1", "joao@x.com")
+        assert await _tentar(limiter, "10.0.0.1", "ana@x.com")
+
+    asyncio.run(cenario())
+
+def test_redis_fora_usa_contadores_locais(limiter, monkeypatch):
+    # `limiter` só aplica as regras do teste ao settings
+    pytest.importorskip("redis")
+    from core.rate_limit import FallbackRateLimitBackend, RedisRateLimitBackend
+
+    # Porta sem servidor: conexão recusada em vez de login pendurado ou 500
+    redis = RedisRateLimitBackend("redis://127.0.0.1:1/0", timeout=0.2)
+    backend = FallbackRateLimitBackend(redis, MemoryRateLimitBackend(), retry_seconds=60)
+    com_reserva = LoginRateLimiter(backend)
+    chamadas = []
+    original = redis.hit_all
+
+    async def contar(regras):
+        chamadas.append(regras)
+        return await original(regras)
+
+    monkeypatch.setattr(redis, "hit_all", contar)
+
+    async def cenario():
+        resultados = [await _tentar(com_reserva, "10.0.0.1", "ana@x.com") for _ in range(5)]
+        # Limite por IP (3) continua valendo nos contadores locais
+        assert resultados == [True, True, True, False, False]
+
+    asyncio.run(cenario())
+    # Só a primeira tentativa foi ao Redis; as demais esperam o retry
+    assert len(chamadas) == 1
@@ -0,0 +1,26 @@
+import asyncio
+
+import numpy as np
+
+from services.recomendacao_service import MicroBatcher
+
+def test_encerrar_dispara_pendentes_e_aguarda_lotes(rodar):
+    lotes = []
+
+    def dobrar(matriz):
+        lotes.append(len(matriz))
+        return matriz * 2
+
+    # Timer longo: sem o shutdown os pedidos ficariam parados esperando o lote
+    batcher = MicroBatcher(dobrar, max_batch=2, max_wait_ms=60_000)
+
+    async def cenario():
+        pedidos = [asyncio.ensure_future(batcher.submit(np.array([float(i)]))) for i in range(3)]
+        await asyncio.sleep(0)
+        await asyncio.wait_for(batcher.encerrar(), timeout=5)
+        assert all(p.done() for p in pedidos)
+        assert not batcher._execucoes
+        return [float(p.result()[0]) for p in pedidos]
+
+    assert rodar(cenario()) == [0.0, 2.0, 4.0]
+    assert sorted(lotes) == [1, 2]
@@ -0,0 +1,86 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from core.database import SessionLocal
+from models.auth import Usuario
+from services import refresh_token_store
+from services.refresh_token_store import MemoryRefreshTokenStore
+from services.token_service import TokenService
+
+@pytest.fixture(params=["sql", "memory"])
+def backend(request, monkeypatch):
+    """Os testes de rotação rodam contra os dois RefreshTokenStore"""
+    monkeypatch.setattr(refresh_token_store.settings, "REFRESH_TOKEN_STORE", request.param)
+    monkeypatch.setattr(refresh_token_store, "_memory_store", MemoryRefreshTokenStore())
+    return request.param
+
+def test_rotacao_troca_o_token_na_mesma_familia(db, backend):
+    service = TokenService(db)
+    primeiro = service.create_refresh_token(1)
+    segundo = service.rotate_refresh_token(primeiro.token)
+
+    assert segundo is not None and segundo.token != primeiro.token
+    assert segundo.family_id == primeiro.family_id
+    assert service.verify_refresh_token(primeiro.token) is None
+    assert service.verify_refresh_token(segundo.token).user_id == 1
+    assert service.store.get(primeiro.token).replaced_by == segundo.token
+
+def test_reuso_revoga_a_familia(db, backend):
+    service = TokenService(db)
+    primeiro = service.create_refresh_token(1)
+    segundo = service.rotate_refresh_token(primeiro.token)
+
+    # Token já trocado apresentado de novo: família inteira revogada
+    assert service.rotate_refresh_token(primeiro.token) is None
+    assert service.verify_refresh_token(segundo.token) is None
+    assert service.rotate_refresh_token(segundo.token) is None
+
+def test_novo_login_revoga_familias_anteriores(db, backend):
+    service = TokenService(db)
+    antigo = service.create_refresh_token(1)
+    service.create_refresh_token(1)
+    assert service.verify_refresh_token(antigo.token) is None
+
+def test_consume_concorrente_perde_a_corrida(db, backend):
+    service = TokenService(db)
+    primeiro = service.create_refresh_token(1)
+    outra_sessao = SessionLocal()
+    concorrente = TokenService(outra_sessao)
+    vencedor = []
+    get_original = service.store.get
+
+    def get_e_perde_a_corrida(token):
+        record = get_original(token)
+        # Outra requisição troca o mesmo token entre a leitura e o consume
+        # (no backend memory o store é compartilhado: só a primeira leitura cede)
+        if not vencedor:
+            vencedor.append(None)
+            vencedor[0] = concorrente.rotate_refresh_token(token)
+        return record
+
+    service.store.get = get_e_perde_a_corrida
+    try:
+        assert service.rotate_refresh_token(primeiro.token) is None
+    finally:
+        del service.store.get
+        outra_sessao.close()
+
+    # Uso paralelo também conta como roubo: o token do vencedor é revogado
+    assert vencedor[0] is not None
+    assert TokenService(db).verify_refresh_token(vencedor[0].token) is None
+
+def test_rota_refresh_responde_401_no_reuso(db, backend):
+    from main import app
+
+    db.add(Usuario(nome="Ana", email="ana@x.com", senha_hash="x"))
+    db.commit()
+    token = TokenService(db).create_refresh_token(1).token
+    client = TestClient(app)
+
+    renovado = client.post("/api/api/auth/refresh", json={"token": token})
+    assert renovado.status_code == 200
+    novo = renovado.json()["data"]["refresh_token"]
+
+    assert client.post("/api/api/auth/refresh", json={"token": token}).status_code == 401
+    # Reuso revogou a família: o token emitido na troca também morreu
+    assert client.post("/api/api/auth/refresh", json={"token": novo}).status_code == 401
@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+
+from core import database
+from core.config import settings
+from core.database import Base
+from core.replica import leitura_primario, replica_monitor
+
+@pytest.fixture
+def replica(monkeypatch, rodar):
+    """
+    Segundo SQLite como réplica: mesmas tabelas, sem replicação. O que só
+    existe no primário aparece como 404 se a leitura for à réplica.
+    """
+    caminho = os.path.join(tempfile.mkdtemp(prefix="upath-replica-"), "replica.db")
+    monkeypatch.setattr(settings, "DATABASE_READ_URL", f"sqlite:///{caminho}")
+    monkeypatch.setattr(database, "_read_engine", None)
+    monkeypatch.setattr(database, "_async_read_engine", None)
+    monkeypatch.setattr(replica_monitor, "disponivel", True)
+    Base.metadata.create_all(database.get_read_engine())
+    yield
+    database.get_read_engine().dispose()
+
+    async def fechar():
+        await database.get_async_read_engine().dispose()
+
+    rodar(fechar())
+
+def test_cadastro_login_e_me_leem_do_primario(replica):
+    from main import app
+
+    client = TestClient(app)
+    cadastro = client.post("/api/api/auth/register", json={
+        "nome": "Ana Souza", "email": "ana@exemplo.com", "senha": "Senha@123", "confirmar_senha": "Senha@123",
+    })
+    assert cadastro.status_code == 200
+    id_usuario = cadastro.json()["data"]["id_usuario"]
+    # Cadastro sem token fixa o novo usuário no primário
+    assert leitura_primario.get_sync(id_usuario) is not None
+
+    leitura_primario.invalidate_sync(id_usuario)
+    login = client.post("/api/api/auth/login", json={"email": "ana@exemplo.com", "senha": "Senha@123"})
+    assert login.status_code == 200
+    cabecalhos = {"Authorization": f"Bearer {login.json()['data']['access_token']}"}
+
+    assert client.get("/api/api/perfil/me", headers=cabecalhos).json()["data"]["email"] == "ana@exemplo.com"
+
+    # Sem a fixação a leitura vai à réplica, que não tem o usuário
+    leitura_primario.invalidate_sync(id_usuario)
+    assert client.get("/api/api/perfil/me", headers=cabecalhos).status_code == 404
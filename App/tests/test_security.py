@@ -0,0 +1,82 @@
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+
+from core import security
+from core.config import settings
+from core.security import VerifiedTokenCache, criar_token, get_current_user
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Cache novo por teste no lugar do global do módulo"""
+    novo = VerifiedTokenCache(8)
+    monkeypatch.setattr(security, "token_cache", novo)
+    return novo
+
+def _autenticar(token: str) -> dict:
+    return get_current_user(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+
+def test_segunda_leitura_do_token_vem_do_cache(cache, monkeypatch):
+    token = criar_token({"sub": "ana@x.com", "user_id": 1, "role": "admin"})
+    decodificacoes = []
+    decode_original = jwt.decode
+
+    def decode_contado(*args, **kwargs):
+        decodificacoes.append(1)
+        return decode_original(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", decode_contado)
+
+    primeira = _autenticar(token)
+    segunda = _autenticar(token)
+
+    assert primeira == segunda and segunda["role"] == "admin"
+    assert len(decodificacoes) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_entrada_sai_do_cache_quando_o_exp_passa(cache, monkeypatch):
+    agora = time.time()
+    cache.set("token", {"user_id": 1}, agora + 60)
+    assert cache.get("token") == {"user_id": 1}
+
+    monkeypatch.setattr(security.time, "time", lambda: agora + 61)
+    assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
+
+def test_lru_descarta_o_menos_usado_no_limite():
+    cache = VerifiedTokenCache(2)
+    exp = time.time() + 60
+    cache.set("a", {"id": "a"}, exp)
+    cache.set("b", {"id": "b"}, exp)
+    # Leitura de "a" o torna o mais recente: "b" é o descartado
+    assert cache.get("a") is not None
+    cache.set("c", {"id": "c"}, exp)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["size"] == 2
+    assert cache.evictions == 1
+
+@pytest.mark.parametrize("token", [
+    # Assinatura adulterada
+    criar_token({"sub": "ana@x.com", "user_id": 1})[:-4] + "AAAA",
+    # Segredo errado
+    jwt.encode({"sub": "ana@x.com", "user_id": 1, "role": "admin"}, "outro-segredo", algorithm=settings.JWT_ALGORITHM),
+    # Já expirado
+    criar_token({"sub": "ana@x.com", "user_id": 1}, expires_delta=timedelta(seconds=-5)),
+    # Sem user_id
+    criar_token({"sub": "ana@x.com"}),
+    "nao-e-um-jwt",
+])
+def test_token_invalido_nunca_entra_no_cache(cache, token):
+    for _ in range(2):
+        with pytest.raises(HTTPException) as erro:
+            _autenticar(token)
+        assert erro.value.status_code == 401
+
+    assert cache.stats()["size"] == 0
+    assert cache.hits == 0
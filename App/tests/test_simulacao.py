@@ -0,0 +1,32 @@
+from services.simulacao_service import IndiceNotasCorte, SimulacaoService
+
+CABECALHO = (
+    "curso,instituicao,uf,regiao,ano,modalidade,nota_corte,"
+    "peso_linguagens,peso_humanas,peso_natureza,peso_matematica,peso_redacao\n"
+)
+
+def _indice(tmp_path) -> IndiceNotasCorte:
+    caminho = tmp_path / "notas_corte.csv"
+    caminho.write_text(
+        CABECALHO
+        + "Direito,UFMG,MG,Sudeste,2023,ampla,700,1,1,1,1,1\n"
+        + "direito,USP,sp,Sudeste,2023,ampla,720,1,1,1,1,1\n"
+        + "Medicina,UFMG,MG,Sudeste,2023,ampla,800,1,1,1,1,1\n",
+        encoding="utf-8",
+    )
+    return IndiceNotasCorte(str(caminho)).carregar()
+
+def test_variacoes_de_caixa_sao_a_mesma_chave(tmp_path):
+    indice = _indice(tmp_path)
+    assert sorted(indice.por_curso) == ["direito", "medicina"]
+    assert indice.por_curso["direito"].tolist() == [0, 1]
+    assert indice.elegiveis(cursos=["DIREITO"]).tolist() == [0, 1]
+
+def test_filtro_repetido_nao_duplica_ofertas(tmp_path):
+    indice = _indice(tmp_path)
+    assert indice.elegiveis(cursos=["Direito", "direito"], ufs=["MG", "mg", "SP"]).tolist() == [0, 1]
+
+    notas = dict(linguagens=700, humanas=700, natureza=700, matematica=700, redacao=700)
+    resultado = SimulacaoService(indice).simular(notas, cursos=["Direito", "direito "])
+    assert resultado["total_elegiveis"] == 2
+    assert len(resultado["resultados"]) == 2